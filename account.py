@@ -0,0 +1,67 @@
+import sys
+
+FIELDS = ('Name', 'Browser_ID', 'Token', 'Proxy', 'UID')
+PROXY_SCHEMES = ("http://", "https://", "socks4://", "socks5://")
+
+# 每个账户的常驻内存预算(字节): 账户对象, 请求模板, 调度任务和代理/指标登记合计.
+# 空闲时实测约 5.5 KB, 运行中的请求另有开销; 按预算 100k 账户不超过 1 GB 内存的容器.
+# benchmark.py 在 10k 及以上规模检查 RSS 增量是否超出.
+MEMORY_BUDGET = 8 * 1024
+
+
+def normalize_proxy(proxy):
+    """补全代理协议前缀, 没有协议时按 http 处理"""
+    if not proxy:
+        return None
+    if not proxy.startswith(PROXY_SCHEMES):
+        proxy = f"http://{proxy}"
+    # 大量账户共用同一代理时只保留一份字符串
+    return sys.intern(proxy)
+
+
+class Account:
+    """accounts.csv 中的一个账户, 加载时计算好派生字段, 所有任务共用同一个对象"""
+
+    __slots__ = ("name", "browser_id", "token", "proxy", "uid", "proxy_url", "trained", "template", "points", "idle_polls",
+                 "reward_day")
+
+    def __init__(self, name: str, browser_id: str, token: str, proxy: str, uid: str, trained=False):
+        self.name = name
+        self.browser_id = browser_id
+        self.token = token
+        self.proxy = sys.intern(proxy) if proxy else ""
+        self.uid = uid
+        # 规范化后的代理地址, 用作连接池和代理健康度的 key
+        self.proxy_url = normalize_proxy(proxy)
+        self.trained = trained
+        # request_template.RequestTemplate, 首次调度时构造, Token/Browser_ID 变化时原地重建
+        self.template = None
+        # 上次查询到的总积分, 以及积分连续没有变化的查询次数
+        self.points = None
+        self.idle_polls = 0
+        # 最近一次领取(或确认已领取)每日奖励的 UTC 日期
+        self.reward_day = None
+
+    @classmethod
+    def from_row(cls, row: dict):
+        return cls(*(row.get(field) or "" for field in FIELDS))
+
+    def values(self):
+        return (self.name, self.browser_id, self.token, self.proxy, self.uid)
+
+    def row(self):
+        """CSV 列名 -> 值, 用于写入暂停记录和状态库"""
+        return dict(zip(FIELDS, self.values()))
+
+    def update(self, other: "Account"):
+        """用 CSV 中新读到的同一账户更新字段, 返回变化的列名"""
+        changed = [field for field, old, new in zip(FIELDS, self.values(), other.values()) if old != new]
+        self.name = other.name
+        self.browser_id = other.browser_id
+        self.token = other.token
+        self.proxy = other.proxy
+        self.proxy_url = other.proxy_url
+        return changed
+
+    def __repr__(self):
+        return f"Account({self.name!r}, uid={self.uid!r}, proxy={self.proxy_url!r})"
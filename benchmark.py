@@ -0,0 +1,243 @@
+from datetime import datetime
+import argparse, asyncio, csv, json, os, sys, tempfile, time
+from account import MEMORY_BUDGET
+import mock_api
+
+# 账户数较少时固定开销占比大, 只在此规模以上检查每账户内存预算
+BUDGET_MIN_ACCOUNTS = 10000
+
+
+def rss_bytes():
+    """当前进程的常驻内存, Linux 读 /proc, 其它系统退回到峰值 RSS"""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节, Linux 为 KB
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def write_accounts(path: str, count: int):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Browser_ID", "Token", "Proxy", "UID"])
+        for i in range(count):
+            writer.writerow([f"bench{i}", f"bench-browser-{i:08d}", f"bench-token-{i:08d}", "", str(10_000_000 + i)])
+
+
+async def sample_loop_lag(samples: list, interval=0.1):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+async def steady_pings(bot, interval: float):
+    """启动爬坡结束且至少过了一个 ping 间隔后的 (时间, 成功 ping 数), 之后的 ping 不包括每个账户启动时的首次 ping"""
+    await asyncio.sleep(interval)
+    while bot.ramp.snapshot()['running']:
+        await asyncio.sleep(0.5)
+    return time.monotonic(), bot.stats['pings_ok']
+
+
+async def run_child(args):
+    """在临时目录中对 N 个账户运行 AiGaea, 结果写入 args.child 指定的 JSON 文件"""
+    from bot import AiGaea
+    from log_pipeline import pipeline
+
+    pipeline.start(log_file="benchmark.log", quiet=True)
+    write_accounts("accounts.csv", args.accounts)
+    baseline = rss_bytes()
+    bot = AiGaea(watch=False, max_initial_delay=args.max_initial_delay, ramp_rate=args.ramp_rate)
+    bot.ping_interval = args.ping_interval
+    bot.earning_interval = args.earning_interval
+
+    lags = []
+    sampler = asyncio.create_task(sample_loop_lag(lags))
+    start = time.monotonic()
+    task = asyncio.create_task(bot.main(use_proxy=False, trained=args.train, test_mode=False))
+    steady = asyncio.create_task(steady_pings(bot, args.ping_interval))
+    done, _ = await asyncio.wait([task], timeout=args.duration)
+    end = time.monotonic()
+    elapsed = end - start
+    rss = rss_bytes()
+    pings_per_second = None
+    if steady.done() and end > steady.result()[0]:
+        steady_start, steady_pings_ok = steady.result()
+        pings_per_second = (bot.stats['pings_ok'] - steady_pings_ok) / (end - steady_start)
+    for pending in (task, sampler, steady):
+        pending.cancel()
+    await asyncio.gather(task, sampler, steady, return_exceptions=True)
+    pipeline.stop()
+    if done:
+        # main() 提前结束说明运行出错
+        task.result()
+
+    latency = bot.metrics.request_latency
+    lateness = bot.metrics.job_lateness
+    endpoints = sorted({labels[0] for labels in latency.values})
+    ramp = bot.ramp.snapshot()
+    result = {
+        'accounts': args.accounts,
+        'duration': round(elapsed, 3),
+        'pings_ok': bot.stats['pings_ok'],
+        'pings_failed': bot.stats['pings_failed'],
+        # 稳定阶段的 ping 速率; 运行时间不足爬坡加一个 ping 间隔时为 None
+        'pings_per_second': pings_per_second,
+        # 全部账户启动后每秒应有的 ping 数, 用于判断是否跟得上
+        'expected_pings_per_second': args.accounts / args.ping_interval,
+        'latency_p50': latency.quantile(0.5),
+        'latency_p99': latency.quantile(0.99),
+        'endpoint_latency': {
+            endpoint: {'p50': latency.quantile(0.5, endpoint=endpoint), 'p99': latency.quantile(0.99, endpoint=endpoint)}
+            for endpoint in endpoints
+        },
+        'on_time_ping_ratio': lateness.ratio_below(args.on_time, job="send_ping"),
+        'ping_lateness_p99': lateness.quantile(0.99, job="send_ping"),
+        'rss_bytes': rss,
+        'rss_per_account': (rss - baseline) / args.accounts,
+        'rss_budget': MEMORY_BUDGET,
+        'loop_lag_p50': percentile(lags, 0.5),
+        'loop_lag_p99': percentile(lags, 0.99),
+        'loop_lag_max': max(lags, default=None),
+        'startup_seconds': bot.startup_seconds,
+        'time_to_first_ping': bot.first_ping_seconds,
+        'ramp_seconds': None if ramp['running'] else ramp['elapsed'],
+        'ramp_admitted': ramp['admitted'],
+        'paused_accounts': len(bot.paused_uids())
+    }
+    with open(args.child, 'w') as f:
+        json.dump(result, f)
+
+
+def child_argv(args, accounts: int, result_file: str):
+    argv = [sys.executable, os.path.abspath(__file__), "--child", result_file, "--accounts", str(accounts)]
+    for name in ("duration", "ping_interval", "earning_interval", "max_initial_delay", "ramp_rate", "on_time"):
+        argv += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    if args.train:
+        argv.append("--train")
+    return argv
+
+
+async def run_size(args, api: mock_api.MockApi, accounts: int):
+    before = api.snapshot()
+    with tempfile.TemporaryDirectory(prefix=f"aigaea-bench-{accounts}-") as workdir:
+        result_file = os.path.join(workdir, "result.json")
+        env = {**os.environ, "AIGAEA_API_BASE": f"http://127.0.0.1:{args.port}/api"}
+        # 每个规模单独一个进程, RSS 和事件循环互不影响
+        process = await asyncio.create_subprocess_exec(*child_argv(args, accounts, result_file), cwd=workdir, env=env)
+        if await process.wait() != 0:
+            raise SystemExit(f"Benchmark with {accounts} accounts failed (exit code {process.returncode})")
+        with open(result_file, 'r') as f:
+            result = json.load(f)
+    after = api.snapshot()
+    result['server_requests'] = {
+        path: count - before['requests'].get(path, 0) for path, count in after['requests'].items()
+        if count - before['requests'].get(path, 0)
+    }
+    result['server_responses'] = {
+        status: count - before['responses'].get(status, 0) for status, count in after['responses'].items()
+        if count - before['responses'].get(status, 0)
+    }
+    return result
+
+
+def format_value(value, scale=1, unit="", digits=1):
+    return "-" if value is None else f"{value * scale:.{digits}f}{unit}"
+
+
+def over_budget(result):
+    return result['accounts'] >= BUDGET_MIN_ACCOUNTS and result['rss_per_account'] > result['rss_budget']
+
+
+def print_result(result, previous=None):
+    rows = [
+        ("Pings/s", 'pings_per_second', 1, "", 1),
+        ("Latency p50", 'latency_p50', 1000, " ms", 1),
+        ("Latency p99", 'latency_p99', 1000, " ms", 1),
+        ("On-time pings", 'on_time_ping_ratio', 100, "%", 1),
+        ("RSS/account", 'rss_per_account', 1 / 1024, " KB", 1),
+        ("Loop lag p99", 'loop_lag_p99', 1000, " ms", 1),
+        ("Loop lag max", 'loop_lag_max', 1000, " ms", 1)
+    ]
+    print(f"{result['accounts']} accounts ({result['duration']:.0f}s, expected {result['expected_pings_per_second']:.1f} pings/s)")
+    for label, key, scale, unit, digits in rows:
+        line = f"  {label:<14} {format_value(result.get(key), scale, unit, digits):>12}"
+        if previous is not None:
+            line += f"   was {format_value(previous.get(key), scale, unit, digits):>12}"
+        print(line)
+    if result['pings_per_second'] is None:
+        print("  Pings/s needs a run longer than the start-up ramp plus one ping interval (--duration)")
+    if over_budget(result):
+        print(f"  Memory per account exceeds the budget of {result['rss_budget'] / 1024:.1f} KB")
+
+
+async def run_benchmark(args):
+    api = mock_api.from_args(args)
+    await api.start("127.0.0.1", args.port)
+    try:
+        results = []
+        for accounts in args.accounts:
+            print(f"Running {accounts} accounts for {args.duration:.0f}s...", flush=True)
+            results.append(await run_size(args, api, accounts))
+    finally:
+        await api.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AiGaea against a local mock API")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1000, 10000, 50000], help="Fleet sizes to run")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to run each fleet size")
+    parser.add_argument("--ping-interval", type=float, default=60, help="Ping interval in seconds (10 minutes in production)")
+    parser.add_argument("--earning-interval", type=float, default=90, help="Earning query interval in seconds (15 minutes in production)")
+    parser.add_argument("--max-initial-delay", type=float, default=10, help="Minimum start-up ramp window in seconds")
+    parser.add_argument("--ramp-rate", type=float, default=1000, help="Maximum accounts started per second")
+    parser.add_argument("--on-time", type=float, default=1.0, help="A ping started within this many seconds of its due time is on time")
+    parser.add_argument("--train", action="store_true", help="Also run the AI training job")
+    parser.add_argument("--port", type=int, default=8766, help="Port for the mock API")
+    parser.add_argument("--output", help="Result JSON file (default: benchmark-YYYYmmdd-HHMMSS.json)")
+    parser.add_argument("--compare", help="Previous result JSON to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    mock_api.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        args.accounts = args.accounts[0]
+        asyncio.run(run_child(args))
+        return
+
+    results = asyncio.run(run_benchmark(args))
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'options': {key: value for key, value in vars(args).items() if key not in ('child', 'output', 'compare')},
+        'results': results
+    }
+    output = args.output or f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = {result['accounts']: result for result in json.load(f)['results']}
+    for result in results:
+        print_result(result, previous.get(result['accounts']) if args.compare else None)
+    print(f"Results saved to {output}")
+    if any(over_budget(result) for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,109 +1,358 @@
-from aiohttp import (
-    ClientResponseError,
-    ClientSession,
-    ClientTimeout
-)
-from aiohttp_socks import ProxyConnector
-from fake_useragent import FakeUserAgent
+import time
+# 进程启动时间, 用于统计启动耗时和首次 ping 耗时
+STARTED_AT = time.monotonic()
+
 from datetime import datetime, timedelta
 from colorama import *
-import asyncio, time, os, pytz, csv, random, json, logging
+from session_pool import SessionPool
+from scheduler import Scheduler
+from request_engine import EndpointPolicy, Outcome, RequestEngine, Result, read_data
+from journal import Journal
+from rate_limit import RateLimiter
+from request_template import RequestTemplate
+from account import Account, normalize_proxy
+import codec
+import clock
+from metrics import Metrics, MetricsServer, proxy_label
+from proxy_pool import ProxyPool, load_proxy_list
+from file_watcher import FileWatcher
+from ramp import RampController, admission_limit
+from ttl_cache import SingleFlightCache
+from dashboard import Dashboard, WindowCounter
+from checkpoint import Checkpoint
+from earnings_history import EarningsHistory
+from daily_planner import DailyPlanner
+from profiling import Profiler
+from log_pipeline import pipeline
+from functools import partial
+from collections import Counter, deque
+import argparse, asyncio, glob, os, pytz, csv, random, json, logging, signal, zlib
 
 wib = pytz.timezone('Asia/Jakarta')
 
-# 配置日志记录
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('aigaea.log', encoding='utf-8'),
-        logging.StreamHandler()  # 同时输出到控制台
-    ]
-)
+# 可通过环境变量指向本地模拟服务器
+API_BASE_URL = os.environ.get("AIGAEA_API_BASE", "https://api.aigaea.net/api")
+
+# 写入检查点的任务, 重启后恢复它们的下次执行时间
+CHECKPOINT_JOBS = ("send_ping", "user_earning", "daily_reward", "complete_training")
+
+def shard_of(uid: str, count: int):
+    return zlib.crc32(uid.encode()) % count
+
+def paused_state(reason: str):
+    return "forbidden" if '403' in reason else "paused"
 
 class AiGaea:
-    def __init__(self) -> None:
-        self.headers = {
-            "Accept": "*/*",
-            "Accept-Language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Origin": "https://app.aigaea.net",
-            "Referer": "https://app.aigaea.net/",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-site",
-            "User-Agent": FakeUserAgent().random
-        }
+    def __init__(self, state_db=None, shard=None, limits=None, metrics_port=None, spare_proxies=None, max_accounts_per_proxy=10,
+                 watch=True, max_initial_delay=100, ramp_rate=50, dashboard_interval=None,
+                 checkpoint_interval=60, daily_capacity=None, validate=False, validate_only=False, validate_concurrency=50,
+                 profile=False, profile_dir="profiles", profile_seconds=30, session_pool=None, history_interval=60) -> None:
+        self.accounts_file = "accounts.csv"
         self.accounts = []
-        self.paused_accounts_file = "paused_accounts.json"
-        self.training_records_file = "training_records.json"
+        # accounts.csv 中属于本进程的所有账户(包括已暂停的), 用于热加载时比较差异
+        self.account_index = {}
+        self.use_proxy = False
+        self.trained = False
+        # 运行中检测 accounts.csv / paused_accounts.json 的修改
+        self.watch = watch
+        self.watcher = FileWatcher()
+        # 账户启动至少分散到 max_initial_delay 秒内, 避免所有账户同时发请求
+        self.max_initial_delay = max_initial_delay
+        self.startup_seconds = None
+        # 启动前批量检查 Token; validate_only 时检查完即退出
+        self.validate = validate or validate_only
+        self.validate_only = validate_only
+        self.validate_concurrency = validate_concurrency
+        self.first_ping_seconds = None
+        # 同一代理的所有账户共享连接池, 复用 TCP/TLS/SOCKS 连接
+        self.session_pool = session_pool or SessionPool()
+        # 所有账户的 ping/收益/奖励/训练任务共用一个调度器, 到期时间随机错开 0~3 秒
+        self.scheduler = Scheduler(jitter={job: 3.0 for job in CHECKPOINT_JOBS})
+        # ping 和收益查询的间隔(秒), 积分长期不变的账户收益查询间隔逐步加倍到上限
+        self.ping_interval = 10 * 60
+        self.earning_interval = 15 * 60
+        self.max_earning_interval = 60 * 60
+        # 收益数据按账户缓存, 训练前的余额检查和定时查询共用同一个请求
+        self.earnings = SingleFlightCache(5 * 60, accept=lambda result: result.ok)
+        # 全局/按接口令牌桶限速, 以及每个代理的并发上限
+        self.limiter = RateLimiter(**(limits or {}))
+        # 全部账户的领奖/训练时间由同一个计划按小时容量分散, 并为截止前的重试预留时段
+        self.planner = DailyPlanner(hourly_capacity=daily_capacity, fleet_size=lambda: len(self.accounts), on_risk=self.report_daily_risk)
+        # 启动准入: 激活速率不超过 ramp_rate 和限速额度, 启动阶段错误率升高时降速
+        max_rate = min((rate for rate in (ramp_rate, admission_limit(limits)) if rate), default=50)
+        self.ramp = RampController(self.scheduler, max_rate=max_rate, min_window=max_initial_delay, on_progress=self.report_ramp)
+        # 指标始终在内存中更新, 指定 metrics_port 时才启动 HTTP 服务
+        self.metrics = Metrics()
+        self.metrics_port = metrics_port
+        self.scheduler.on_lateness = lambda job, seconds: self.metrics.job_lateness.observe(seconds, job)
+        self.metrics.gauge("aigaea_accounts", "Accounts by state", self.account_states, ("state",))
+        self.metrics.gauge("aigaea_scheduler_backlog", "Jobs due but not started", lambda: {(): self.scheduler.backlog()})
+        self.metrics.gauge("aigaea_ramp_rate", "Accounts activated per second during start-up",
+            lambda: {(): self.ramp.snapshot()['rate']})
+        self.metrics.gauge("aigaea_ramp_error_ratio", "Request error ratio seen by the start-up admission controller",
+            lambda: {(): self.ramp.error_rate})
+        self.metrics.gauge("aigaea_earning_cache_lookups", "Earning lookups by cache result",
+            lambda: {(result,): count for result, count in self.earnings.snapshot().items() if result in ("hits", "misses", "shared")},
+            ("result",))
+        self.metrics.gauge("aigaea_daily_plan", "Accounts planned per UTC hour today by daily job", lambda: {
+            (job, str(hour)): count for job, plan in self.planner.snapshot().items() for hour, count in enumerate(plan['hours'])},
+            ("job", "hour"))
+        self.metrics.gauge("aigaea_daily_jobs", "Daily jobs today by state", lambda: {
+            (job, state): plan[state] for job, plan in self.planner.snapshot().items()
+            for state in ("planned", "done", "skipped", "at_risk", "missed", "tomorrow")}, ("job", "state"))
+        self.metrics.gauge("aigaea_scheduler_jobs", "Scheduled jobs", lambda: {(): len(self.scheduler.jobs)})
+        self.metrics.gauge("aigaea_startup_seconds", "Seconds from process start until jobs were scheduled",
+            lambda: {(): self.startup_seconds} if self.startup_seconds is not None else {})
+        self.metrics.gauge("aigaea_time_to_first_ping_seconds", "Seconds from process start until the first successful ping",
+            lambda: {(): self.first_ping_seconds} if self.first_ping_seconds is not None else {})
+        # 可选的诊断: 循环延迟监控, SIGUSR1 采样调用栈, SIGUSR2 输出任务统计和内存分配
+        self.profiler = Profiler(self.report_profile, profile_dir, profile_seconds,
+            unwrap=("Scheduler._worker", "AiGaea.with_proxy"), gauge=self.metrics.loop_lag) if profile else None
+        # 后台探测代理, 账户的代理不健康时切换到备用代理
+        self.proxy_pool = ProxyPool(self.session_pool, [self.check_proxy_schemes(proxy) for proxy in spare_proxies or ()],
+            max_accounts=max_accounts_per_proxy, probe_url=API_BASE_URL.rsplit('/api', 1)[0] + '/', on_failover=self.report_failover)
+        self.metrics.gauge("aigaea_proxy_healthy", "Proxy health (1 healthy, 0 unhealthy)", lambda: {
+            (proxy_label(proxy),): int(health['healthy']) for proxy, health in self.proxy_pool.snapshot().items()}, ("proxy",))
+        self.metrics.gauge("aigaea_proxy_latency_seconds", "Proxy EWMA latency", lambda: {
+            (proxy_label(proxy),): health['latency'] for proxy, health in self.proxy_pool.snapshot().items()}, ("proxy",))
+        # 统一请求层: GET/ping 可安全重试, 领奖和训练只在请求未发出时重试
+        self.engine = RequestEngine(self.session_pool, limiter=self.limiter, metrics=self.metrics, proxy_pool=self.proxy_pool,
+            ramp=self.ramp, policies={
+            "/earn/info": EndpointPolicy(retries=5),
+            "/network/ping": EndpointPolicy(retries=2),
+            "/ai/list": EndpointPolicy(retries=2),
+            "/reward/daily-list": EndpointPolicy(retries=2),
+            "/reward/daily-complete": EndpointPolicy(retries=2, idempotent=False),
+            "/ai/complete": EndpointPolicy(retries=2, idempotent=False)
+        })
+        # 多进程模式下 shard = (index, count), 每个 worker 只处理并写入自己分片的账户
+        self.shard = shard
+        suffix = f".shard{shard[0]}of{shard[1]}" if shard else ""
+        self.paused_accounts_file = f"paused_accounts{suffix}.json"
+        self.training_records_file = f"training_records{suffix}.json"
+        # 定期保存调度状态, 重启后等待剩余的间隔而不是立即重新请求
+        self.checkpoint = Checkpoint(f"checkpoint{suffix}.json", self.checkpoint_state, checkpoint_interval) if checkpoint_interval else None
+        self.resume = {}
+        # 收益历史按分片写入 earnings{suffix}/ 目录, 旧数据自动降采样
+        self.history = EarningsHistory(f"earnings{suffix}", history_interval) if history_interval else None
+        self.stats = Counter()
+        self.today_points = {}
+        # 终端面板使用的内存计数: 最近 10 分钟的 ping 数和最近的错误
+        self.recent_pings = {'ok': WindowCounter(10 * 60), 'failed': WindowCounter(10 * 60)}
+        self.recent_errors = deque(maxlen=8)
+        self.dashboard = Dashboard(self.dashboard_snapshot, dashboard_interval) if dashboard_interval else None
+        # 训练记录只保留最近 N 天
+        self.training_retention_days = 7
+        # 状态变更追加写入 journal, 后台批量 fsync 并定期压缩回 JSON 快照
+        self.paused_journal = Journal(self.paused_accounts_file,
+            import_path=self.shard_import_paths("paused_accounts"), import_filter=self.owns)
+        self.training_journal = Journal(self.training_records_file, prune=self.prune_training_records,
+            import_path=self.shard_import_paths("training_records"), import_filter=self.owns)
+        # 可选的 SQLite 状态存储, 启用后暂停/训练状态只写入数据库
+        self.store = None
+        if state_db:
+            from state_store import StateStore
+            self.store = StateStore(state_db)
+        # 暂停/训练记录在 main() 中才读取, 只用于交互提问的实例不需要加载
+        # 使用状态库时 paused_accounts 也在内存中维护, 不受写入任务提交延迟的影响
+        self.paused_accounts = {}
+        self.paused_snapshot = {}
+        self.training_records = {}
+        self.state_loaded = False
+        # 暂停账户 uid -> "paused"/"forbidden", 以及两类的计数
+        self.paused_states = {}
+        self.paused_counts = Counter()
+
+    def load_state(self):
+        if self.state_loaded:
+            return
+        if self.store:
+            # 暂停记录只在启动时从数据库载入, 之后在内存中同步更新; 数据库写入由后台任务稍后提交
+            self.paused_accounts = self.store.paused_accounts()
+            self.state_loaded = True
+            return
         self.paused_accounts = self.load_paused_accounts()
+        self.paused_snapshot = self.read_paused_snapshot()
         self.training_records = self.load_training_records()
+        self.state_loaded = True
 
     def load_paused_accounts(self):
         try:
-            if os.path.exists(self.paused_accounts_file):
-                with open(self.paused_accounts_file, 'r') as f:
-                    return json.load(f)
-            return {}
+            return self.paused_journal.load()
         except Exception as e:
             print(f"Error loading paused accounts: {e}")
-            return {}
+            return self.paused_journal.data
 
     def load_training_records(self):
         try:
-            if os.path.exists(self.training_records_file):
-                with open(self.training_records_file, 'r') as f:
-                    return json.load(f)
-            return {}
+            return self.training_journal.load()
         except Exception as e:
             print(f"Error loading training records: {e}")
-            return {}
+            return self.training_journal.data
 
-    def save_paused_account(self, account_data):
-        self.paused_accounts[account_data['UID']] = {
-            'Name': account_data['Name'],
-            'Browser_ID': account_data['Browser_ID'],
-            'Token': account_data['Token'],
-            'Proxy': account_data['Proxy'],
-            'UID': account_data['UID'],
-            'paused_at': datetime.now().astimezone(wib).strftime('%x %X %Z'),
-            'reason': 'Token Expired (401)'
+    def prune_training_records(self, records):
+        cutoff = (clock.utcnow() - timedelta(days=self.training_retention_days)).strftime('%Y-%m-%d')
+        for uid in list(records):
+            days = records[uid]
+            for day in [day for day in days if day < cutoff]:
+                del days[day]
+            if not days:
+                del records[uid]
+
+    def shard_import_paths(self, name: str):
+        # 首次以分片运行(或分片数变化)时, 从主文件和其它分片文件导入本分片的记录
+        if not self.shard:
+            return None
+        return [f"{name}.json"] + sorted(path for path in glob.glob(f"{name}.shard*of*.json") if not path.endswith(f"of{self.shard[1]}.json"))
+
+    def owns(self, uid: str):
+        return self.shard is None or shard_of(uid, self.shard[1]) == self.shard[0]
+
+    def paused_uids(self):
+        return set(self.paused_accounts)
+
+    def paused_token(self, uid: str):
+        record = self.paused_accounts.get(uid)
+        return record.get('Token') if record else None
+
+    def resume_account(self, uid: str):
+        if self.store:
+            self.store.record_resume(uid)
+            self.paused_accounts.pop(uid, None)
+        else:
+            self.paused_journal.delete([uid])
+        self.stats['resumed'] += 1
+        state = self.paused_states.pop(uid, None)
+        if state:
+            self.paused_counts[state] -= 1
+
+    def load_paused_counts(self):
+        """启动时统计一次暂停账户, 之后随暂停/恢复增减, 面板和指标不再查询数据库或遍历记录"""
+        reasons = {uid: record.get('reason', 'Token Expired (401)') for uid, record in self.paused_accounts.items()}
+        self.paused_states = {uid: paused_state(reason) for uid, reason in reasons.items()}
+        self.paused_counts = Counter(self.paused_states.values())
+
+    def account_states(self):
+        return {
+            ("active",): self.active_accounts(),
+            ("starting",): len(self.ramp.pending),
+            ("paused",): self.paused_counts['paused'],
+            ("forbidden",): self.paused_counts['forbidden']
         }
-        with open(self.paused_accounts_file, 'w') as f:
-            json.dump(self.paused_accounts, f, indent=4)
 
-    def save_training_record(self, account_data):
-        uid = account_data['UID']
-        current_date = datetime.now(pytz.UTC).strftime('%Y-%m-%d')
-        
-        if uid not in self.training_records:
-            self.training_records[uid] = {}
-            
-        self.training_records[uid][current_date] = {
-            'Name': account_data['Name'],
-            'Browser_ID': account_data['Browser_ID'],
-            'Token': account_data['Token'],
-            'Proxy': account_data['Proxy'],
-            'UID': uid,
+    def active_accounts(self):
+        # 准入任务也在调度器中, 不计入账户数
+        return len(self.scheduler.account_jobs) - (self.ramp.KEY in self.scheduler.account_jobs)
+
+    def save_paused_account(self, account: Account, reason='Token Expired (401)'):
+        # 暂停后停止该账户的所有调度任务
+        self.scheduler.cancel(account.uid)
+        self.earnings.invalidate(account.uid)
+        self.planner.discard(account.uid)
+        self.stats['paused'] += 1
+        self.today_points.pop(account.uid, None)
+        if account.uid not in self.paused_states:
+            self.paused_states[account.uid] = paused_state(reason)
+            self.paused_counts[self.paused_states[account.uid]] += 1
+        if self.store:
+            self.store.record_pause(account.row(), reason)
+            if account.uid not in self.paused_accounts:
+                self.paused_accounts[account.uid] = {'Token': account.token, 'reason': reason}
+            return
+        self.paused_journal.set([account.uid], {
+            **account.row(),
+            'paused_at': datetime.now().astimezone(wib).strftime('%x %X %Z'),
+            'reason': reason
+        })
+
+    def save_training_record(self, account: Account):
+        uid = account.uid
+        current_date = clock.utc_date()
+        if self.store:
+            self.store.record_training(uid, current_date)
+            return
+        # 只记录训练时间, 不再为每天重复保存 token 和代理
+        self.training_journal.set([uid, current_date], {
+            'Name': account.name,
             'trained_at': datetime.now().astimezone(wib).strftime('%x %X %Z')
-        }
-        
-        with open(self.training_records_file, 'w') as f:
-            json.dump(self.training_records, f, indent=4)
+        })
+
+    async def close(self):
+        await self.session_pool.close()
+        if self.store:
+            self.store.close()
+            return
+        for journal in (self.paused_journal, self.training_journal):
+            try:
+                await journal.close()
+            except Exception as e:
+                print(f"Error writing journal {journal.journal_path}: {e}")
 
     def check_training_status(self, uid):
-        current_date = datetime.now(pytz.UTC).strftime('%Y-%m-%d')
+        current_date = clock.utc_date()
+        if self.store:
+            return self.store.trained_on(uid, current_date)
         return uid in self.training_records and current_date in self.training_records[uid]
 
+    def check_reward_status(self, account: Account):
+        current_date = clock.utc_date()
+        if account.reward_day == current_date:
+            return True
+        return bool(self.store) and self.store.claimed_on(account.uid, current_date)
+
+    def checkpoint_state(self):
+        """每个账户已调度任务的到期时间(换算为时间戳)和积分/领奖状态"""
+        offset = clock.time() - self.scheduler.time()
+        # 还在等待准入, 或已准入但 start 任务尚未执行的账户沿用上次检查点中的状态
+        accounts = {
+            uid: saved for uid, saved in self.resume.items()
+            if uid in self.ramp.pending or (uid, "start") in self.scheduler.jobs
+        }
+        for (uid, job), (_, due, _) in self.scheduler.jobs.items():
+            if job in CHECKPOINT_JOBS:
+                accounts.setdefault(uid, {'due': {}})['due'][job] = round(due + offset, 1)
+        for uid, saved in accounts.items():
+            account = self.account_index.get(uid)
+            if account is not None and account.points is not None:
+                saved['points'] = account.points
+                saved['idle_polls'] = account.idle_polls
+            if account is not None and account.reward_day:
+                saved['reward_day'] = account.reward_day
+        return accounts
+
+    def restore_account(self, account: Account, saved: dict):
+        account.points = saved.get('points')
+        account.idle_polls = saved.get('idle_polls', 0)
+        account.reward_day = saved.get('reward_day')
+
+    def resume_delays(self, uid: str):
+        """检查点中尚未到期的任务 -> 剩余秒数, 只在账户首次启动时使用一次"""
+        saved = self.resume.pop(uid, None)
+        if not saved:
+            return {}
+        now = clock.time()
+        return {job: due - now for job, due in saved.get('due', {}).items() if due > now}
+
     def clear_terminal(self):
         os.system('cls' if os.name == 'nt' else 'clear')
 
-    def log(self, message):
-        print(
-            f"{Fore.CYAN + Style.BRIGHT}[ {datetime.now().astimezone(wib).strftime('%x %X %Z')} ]{Style.RESET_ALL}"
-            f"{Fore.WHITE + Style.BRIGHT} | {Style.RESET_ALL}{message}",
-            flush=True
-        )
+    def log(self, message, level=logging.INFO, end="\n", event=None):
+        # 控制台消息经日志线程输出, 不阻塞事件循环; 带 event 的消息同时写入日志文件
+        console = None
+        if pipeline.show(level, event):
+            console = (
+                f"{Fore.CYAN + Style.BRIGHT}[ {pipeline.timestamp(time.time())} ]{Style.RESET_ALL}"
+                f"{Fore.WHITE + Style.BRIGHT} | {Style.RESET_ALL}{message}"
+            )
+        elif event is None:
+            return
+        # 终端面板模式下控制台不输出, 带 event 的消息仍由 emit 写入日志文件
+        pipeline.emit(level, message, console, end=end, to_file=event is not None, event=event)
+
+    def progress(self, message):
+        # 进度提示只在控制台覆盖当前行, quiet 模式下不输出
+        if not pipeline.quiet:
+            self.log(f"{Fore.BLUE + Style.BRIGHT}{message}{Style.RESET_ALL}", end="\r")
 
     def welcome(self):
         print(
@@ -120,45 +369,162 @@ class AiGaea:
         minutes, seconds = divmod(remainder, 60)
         return f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}"
     
-    def load_accounts(self):
-        filename = "accounts.csv"
+    def read_accounts_file(self):
+        """读取 accounts.csv 中属于本进程的账户, 文件无效时返回 None"""
+        filename = self.accounts_file
         try:
             if not os.path.exists(filename):
                 self.log(f"{Fore.RED}File {filename} Not Found.{Style.RESET_ALL}")
-                return
+                return None
 
             with open(filename, 'r', newline='') as file:
                 reader = csv.DictReader(file)
                 expected_fields = ['Name', 'Browser_ID', 'Token', 'Proxy', 'UID']
                 if reader.fieldnames != expected_fields:
                     self.log(f"{Fore.RED}Invalid CSV format. Required fields: {', '.join(expected_fields)}{Style.RESET_ALL}")
-                    return
-                self.accounts = [acc for acc in reader if acc['UID'] not in self.paused_accounts]
+                    return None
+                return {row['UID']: Account.from_row(row) for row in reader if row['UID'] and self.owns(row['UID'])}
         except Exception as e:
             self.log(f"{Fore.RED}Error loading accounts: {e}{Style.RESET_ALL}")
+            return None
+
+    def load_accounts(self):
+        rows = self.read_accounts_file()
+        if rows is None:
             return
+        self.account_index = rows
+        paused = self.paused_uids()
+        self.accounts = []
+        for uid, account in rows.items():
+            if uid in paused:
+                # 暂停后在 CSV 中换了新 Token 的账户自动恢复
+                if account.token == self.paused_token(uid):
+                    continue
+                self.resume_account(uid)
+            self.accounts.append(account)
+        if self.store:
+            for account in rows.values():
+                self.store.upsert_account(account.row())
 
-    def check_proxy_schemes(self, proxy):
-        if not proxy:
+    def read_paused_snapshot(self):
+        if self.store or not os.path.exists(self.paused_accounts_file):
+            return {}
+        try:
+            with open(self.paused_accounts_file, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            # 文件正在被编辑, 下次变化时再读取
             return None
-        schemes = ["http://", "https://", "socks4://", "socks5://"]
-        if any(proxy.startswith(scheme) for scheme in schemes):
-            return proxy
-        return f"http://{proxy}"
+
+    def reload_accounts(self):
+        """比较 accounts.csv 的差异: 新增账户启动任务, 删除的账户取消任务, 修改的账户原地更新"""
+        rows = self.read_accounts_file()
+        if rows is None:
+            return
+        paused = self.paused_uids()
+        for uid, row in rows.items():
+            account = self.account_index.get(uid)
+            if account is None:
+                self.account_index[uid] = row
+                if uid not in paused or self.revive_account(row, row.token):
+                    self.start_account(row)
+                continue
+            if row.values() == account.values():
+                continue
+            if uid in paused:
+                account.update(row)
+                self.revive_account(account, row.token)
+                continue
+            self.update_account(account, row)
+        for uid in [uid for uid in self.account_index if uid not in rows]:
+            self.stop_account(uid)
+        if self.store:
+            for account in rows.values():
+                self.store.upsert_account(account.row())
+
+    def reload_paused_accounts(self):
+        """paused_accounts.json 被手动修改时, 恢复换了 Token 或被删除记录的账户"""
+        snapshot = self.read_paused_snapshot()
+        if snapshot is None:
+            return
+        previous, self.paused_snapshot = self.paused_snapshot or {}, snapshot
+        for uid, record in list(self.paused_accounts.items()):
+            edited = snapshot.get(uid)
+            if edited is None:
+                # 只处理用户删除的记录, 尚未压缩进快照的新暂停不算
+                if uid in previous:
+                    self.resume_account(uid)
+                    if uid in self.account_index:
+                        self.start_account(self.account_index[uid], "Removed From Paused List")
+            elif edited.get('Token') and edited.get('Token') != record.get('Token'):
+                account = self.account_index.get(uid) or Account.from_row(edited)
+                account.token = edited['Token']
+                self.account_index[uid] = account
+                self.revive_account(account, edited['Token'])
+
+    def revive_account(self, account: Account, token: str):
+        if token == self.paused_token(account.uid):
+            return False
+        account.token = token
+        self.resume_account(account.uid)
+        self.start_account(account, "Token Updated")
+        return True
+
+    def start_account(self, account: Account, reason="Account Added"):
+        account.trained = self.trained
+        if reason != "Account Added":
+            # 恢复的账户可能在暂停前已经在列表中
+            self.accounts = [acc for acc in self.accounts if acc.uid != account.uid]
+        self.accounts.append(account)
+        self.print_message(account.name, account.proxy_url if self.use_proxy else None,
+            Fore.GREEN, f"{reason} - Starting", event="account_started")
+        self.process_accounts(account, self.use_proxy)
+
+    def stop_account(self, uid: str):
+        account = self.account_index.pop(uid)
+        self.ramp.discard(uid)
+        self.scheduler.cancel(uid)
+        self.proxy_pool.unregister(uid)
+        self.earnings.invalidate(uid)
+        self.planner.discard(uid)
+        self.today_points.pop(uid, None)
+        self.accounts = [acc for acc in self.accounts if acc.uid != uid]
+        self.print_message(account.name, None, Fore.YELLOW, "Account Removed - Stopped", event="account_removed")
+
+    def update_account(self, account: Account, row: Account):
+        """修改的账户原地更新, 已调度任务的到期时间保持不变"""
+        changed = account.update(row)
+        uid = account.uid
+        proxy = account.proxy_url if self.use_proxy else None
+        # Token/Browser_ID 变化时模板原地重建, 已调度的任务直接使用新值
+        self.template_for(account)
+        if 'Name' in changed or 'Proxy' in changed:
+            self.proxy_pool.register(uid, proxy)
+            jobs = self.account_job_funcs(account, proxy)
+            jobs["start"] = partial(self.start_account_jobs, account, proxy)
+            for name, func in jobs.items():
+                self.scheduler.replace(uid, name, func)
+            self.ramp.replace(uid, partial(self.admit_account, account, proxy))
+        self.print_message(account.name, proxy, Fore.GREEN, f"Account Updated ({', '.join(changed)})", event="account_updated")
+
+    def check_proxy_schemes(self, proxy):
+        return normalize_proxy(proxy)
 
     def mask_account(self, account):
         mask_account = account[:3] + '*' * 3 + account[-3:]
         return mask_account
 
-    def print_message(self, account, proxy, color, message):
+    def print_message(self, account, proxy, color, message, event=None, error=None):
         proxy_display = proxy if proxy else "No Proxy"
+        level = logging.ERROR if color == Fore.RED else logging.INFO
         log_message = f"[ Account: {account} - Proxy: {proxy_display} - Status: {message} ]"
-        self.log(log_message)
-        # 同时记录到日志文件
-        logging.info(log_message)
-        # 打印彩色消息到控制台
-        print(
-            f"{Fore.CYAN + Style.BRIGHT}[ {datetime.now().astimezone(wib).strftime('%x %X %Z')} ]{Style.RESET_ALL}"
+        if level >= logging.ERROR:
+            self.recent_errors.append((time.time(), account, proxy_display, message))
+        console = None
+        if pipeline.show(level, event):
+            # 只有控制台会显示时才拼接彩色消息
+            console = (
+            f"{Fore.CYAN + Style.BRIGHT}[ {pipeline.timestamp(time.time())} ]{Style.RESET_ALL}"
             f"{Fore.WHITE + Style.BRIGHT} | {Style.RESET_ALL}"
             f"{Fore.CYAN + Style.BRIGHT}[ Account:{Style.RESET_ALL}"
             f"{Fore.WHITE + Style.BRIGHT} {account} {Style.RESET_ALL}"
@@ -169,7 +535,9 @@ class AiGaea:
             f"{Fore.CYAN + Style.BRIGHT}Status:{Style.RESET_ALL}"
             f"{color + Style.BRIGHT} {message} {Style.RESET_ALL}"
             f"{Fore.CYAN + Style.BRIGHT}]{Style.RESET_ALL}"
-        )
+            )
+        # error 为异常文本, 作为结构化字段写入同一条日志记录
+        pipeline.emit(level, log_message, console, event=event, account=account, proxy=proxy_display, error=error)
 
     def print_question(self):
         while True:
@@ -203,571 +571,358 @@ class AiGaea:
             except ValueError:
                 print(f"{Fore.RED + Style.BRIGHT}Invalid input. Enter a number (1 or 2).{Style.RESET_ALL}")
 
-    async def user_earning(self, token: str, username: str, proxy=None, retries=5):
-        url = "https://api.aigaea.net/api/earn/info"
-        headers = {
-            **self.headers,
-            "Accept-Language": "he",
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Priority": "u=1, i"
-        }
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.get(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        if result.get("success") is not True:
-                            raise ValueError(f"API returned unsuccessful response: {result.get('msg')}")
-                        return result['data']
-            except ClientResponseError as e:
-                if e.status == 401:
-                    return "TOKEN_EXPIRED"
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                return self.print_message(username, proxy, Fore.RED, f"GET Earning Data Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-            except Exception as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                return self.print_message(username, proxy, Fore.RED, f"GET Earning Data Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
+    def report_failure(self, result, username: str, proxy, action: str):
+        if result.outcome in (Outcome.TRANSIENT, Outcome.FATAL):
+            self.print_message(username, proxy, Fore.RED, f"{action} Failed: {Fore.YELLOW+Style.BRIGHT}{result.error}")
+        return result
 
-    async def process_user_earning(self, token: str, username: str, account_data: dict, proxy=None):
-        while True:
-            try:
-                earning = await self.user_earning(token, username, proxy)
-                if earning == "TOKEN_EXPIRED":
-                    self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Pausing Account")
-                    self.save_paused_account(account_data)
-                    return
-                if earning:
-                    total_points = earning['era_gaea']  # Use era_gaea for Earning Total
-                    today_points = earning['today_gaea']  # Use today_gaea for Today Total
-                    uptime_minutes = earning['today_uptime']  # Uptime in minutes
-                    uptime_hours = uptime_minutes / 60  # Convert to hours
-                    self.print_message(username, proxy, Fore.WHITE,
-                        f"Earning Total {total_points} PTS "
-                        f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
-                        f"{Fore.CYAN + Style.BRIGHT} Today Total: {Style.RESET_ALL}"
-                        f"{Fore.WHITE + Style.BRIGHT}{today_points} PTS "
-                        f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
-                        f"{Fore.CYAN + Style.BRIGHT} Uptime: {Style.RESET_ALL}"
-                        f"{Fore.WHITE + Style.BRIGHT}{uptime_hours:.2f} Hours{Style.RESET_ALL}"
-                    )
-            except Exception as e:
-                logging.error("User Earning Failed", extra={"account": username, "proxy": proxy if proxy else "No Proxy", "message": str(e)})
-                self.print_message(username, proxy, Fore.RED, f"User Earning Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-
-            await asyncio.sleep(15 * 60)
-
-    async def send_ping(self, token: str, browser_id: str, username: str, user_id: str, proxy=None, retries=2, ping_type="extension"):
-        url = "https://api.aigaea.net/api/network/ping"
-        version = "3.0.19"
-        data = json.dumps({
-            "browser_id": browser_id,
-            "timestamp": int(time.time()),  
-            "uid": user_id,
-            "version": version
-        })
-        headers = {
-            "Accept": "*/*",
-            "Accept-Language": "en-US",
-            "Authorization": f"Bearer {token}",
-            "Content-Length": str(len(data)),
-            "Content-Type": "application/json",
-            "Origin": "chrome-extension://cpjicfogbgognnifjgmenmaldnmeeeib" if ping_type == "extension" else "https://app.aigaea.net",
-            "Priority": "u=1, i",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "none" if ping_type == "extension" else "same-site",
-            "User-Agent": FakeUserAgent().random
-        }
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.post(url=url, headers=headers, data=data) as response:
-                        response.raise_for_status()
-                        content_type = response.headers.get('Content-Type', '')
-                        text = await response.text(encoding=None)
-                        self.log(f"{Fore.YELLOW}Raw response for {username} ({ping_type}): {text[:100]}{Style.RESET_ALL}")
-                        if 'application/json' not in content_type.lower():
-                            raise ValueError(f"Response is not JSON: {text[:100]}")
-                        try:
-                            result = json.loads(text)
-                        except UnicodeDecodeError as e:
-                            self.log(f"{Fore.YELLOW}UTF-8 decode failed, trying Latin-1 for {username} ({ping_type}){Style.RESET_ALL}")
-                            text = await response.text(encoding='latin-1')
-                            result = json.loads(text)
-                        if result.get("code") == 401:  # 检查响应中的code是否为401
-                            return "TOKEN_EXPIRED"
-                        return result['data']
-            except ClientResponseError as e:
-                if e.status == 401:  # 检查HTTP状态码是否为401
-                    return "TOKEN_EXPIRED"
-                if e.status == 403:  # 检查HTTP状态码是否为403
-                    return "ACCOUNT_FORBIDDEN"
-                if attempt < retries - 1:
-                    self.log(f"{Fore.YELLOW}Retrying {ping_type} ping for {username} (attempt {attempt + 1}/{retries})...{Style.RESET_ALL}")
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"{ping_type.upper()} PING Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                return None
-            except Exception as e:
-                if attempt < retries - 1:
-                    self.log(f"{Fore.YELLOW}Retrying {ping_type} ping for {username} (attempt {attempt + 1}/{retries})...{Style.RESET_ALL}")
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"{ping_type.upper()} PING Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
+    def pause_on_auth_failure(self, result, username: str, proxy, account: Account, suffix=""):
+        if result.outcome is Outcome.TOKEN_EXPIRED:
+            reason = "Token Expired (401)"
+        elif result.outcome is Outcome.FORBIDDEN:
+            reason = "Account Forbidden (403)"
+        else:
+            return False
+        self.print_message(username, proxy, Fore.RED, f"{reason} - Pausing Account{suffix}", event="paused")
+        self.save_paused_account(account, reason)
+        return True
+
+    async def user_earning(self, template: RequestTemplate, username: str, proxy=None):
+        url = f"{API_BASE_URL}/earn/info"
+        result = await self.engine.execute("GET", url, proxy, template.earning, parse=read_data)
+        return self.report_failure(result, username, proxy, "GET Earning Data")
+
+    async def account_earning(self, account: Account, proxy=None):
+        # 缓存命中时不发请求, 并发的查询共享同一个请求
+        return await self.earnings.get(account.uid, partial(self.user_earning, account.template, account.name, proxy))
+
+    def refresh_earning(self, account: Account):
+        """训练或领奖后积分会变化, 丢弃缓存并立即查询收益"""
+        self.earnings.invalidate(account.uid)
+        account.idle_polls = 0
+        self.scheduler.reschedule(account.uid, "user_earning")
+
+    def earning_delay(self, account: Account):
+        return min(self.max_earning_interval, self.earning_interval * 2 ** min(account.idle_polls, 8))
+
+    async def process_user_earning(self, account: Account, proxy=None):
+        username = account.name
+        try:
+            earning = await self.account_earning(account, proxy)
+            if self.pause_on_auth_failure(earning, username, proxy, account):
                 return None
+            if earning.ok:
+                earning = earning.data
+                if self.store:
+                    self.store.record_earnings(account.uid, earning)
+                if self.history:
+                    self.history.record(account.uid, earning)
+                total_points = earning['era_gaea']  # Use era_gaea for Earning Total
+                today_points = earning['today_gaea']  # Use today_gaea for Today Total
+                uptime_minutes = earning['today_uptime']  # Uptime in minutes
+                uptime_hours = uptime_minutes / 60  # Convert to hours
+                self.today_points[account.uid] = today_points
+                # 积分没有变化的账户逐步降低查询频率
+                account.idle_polls = account.idle_polls + 1 if total_points == account.points else 0
+                account.points = total_points
+                self.print_message(username, proxy, Fore.WHITE,
+                    f"Earning Total {total_points} PTS "
+                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+                    f"{Fore.CYAN + Style.BRIGHT} Today Total: {Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT}{today_points} PTS "
+                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+                    f"{Fore.CYAN + Style.BRIGHT} Uptime: {Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT}{uptime_hours:.2f} Hours{Style.RESET_ALL}"
+                )
+        except Exception as e:
+            self.print_message(username, proxy, Fore.RED, f"User Earning Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}", error=str(e))
 
-    async def process_send_ping(self, token: str, browser_id: str, username: str, user_id: str, account_data: dict, proxy=None, ping_type="extension"):
-        while True:
-            try:
-                print(
-                    f"{Fore.CYAN + Style.BRIGHT}[ {datetime.now().astimezone(wib).strftime('%x %X %Z')} ]{Style.RESET_ALL}"
-                    f"{Fore.WHITE + Style.BRIGHT} | {Style.RESET_ALL}"
-                    f"{Fore.BLUE + Style.BRIGHT}Try to Send {ping_type.capitalize()} Ping...{Style.RESET_ALL}",
-                    end="\r",
-                    flush=True
+        return self.earning_delay(account)
+
+    async def read_ping(self, response, username: str, ping_type: str):
+        body = await response.read()
+        if pipeline.debug:
+            # 只在 --debug 时格式化原始响应
+            self.log(f"{Fore.YELLOW}Raw response for {username} ({ping_type}): {body[:100].decode('latin-1')}{Style.RESET_ALL}",
+                level=logging.DEBUG)
+        result = codec.decode(body)
+        if result.get("code") == 401:  # 检查响应中的code是否为401
+            return Result(Outcome.TOKEN_EXPIRED, error="Token Expired (401)")
+        return Result(Outcome.OK, result['data'])
+
+    async def send_ping(self, template: RequestTemplate, username: str, proxy=None, ping_type="extension"):
+        url = f"{API_BASE_URL}/network/ping"
+        # 请求头和请求体在账户加载时已构造好, 每次只替换 timestamp
+        data = template.ping_body(int(clock.time()))
+        result = await self.engine.execute("POST", url, proxy, template.ping_headers(ping_type), data,
+            parse=partial(self.read_ping, username=username, ping_type=ping_type))
+        return self.report_failure(result, username, proxy, f"{ping_type.upper()} PING")
+
+    async def process_send_ping(self, account: Account, proxy=None, ping_type="extension"):
+        template = account.template
+        username = account.name
+        try:
+            self.progress(f"Try to Send {ping_type.capitalize()} Ping...")
+
+            ping = await self.send_ping(template, username, proxy, ping_type=ping_type)
+            if self.pause_on_auth_failure(ping, username, proxy, account, f" ({ping_type})"):
+                return None
+            if not ping.ok:
+                self.stats['pings_failed'] += 1
+                self.recent_pings['failed'].add()
+                self.metrics.pings.inc(proxy_label(proxy), "failed")
+            else:
+                self.stats['pings_ok'] += 1
+                self.recent_pings['ok'].add()
+                if self.first_ping_seconds is None:
+                    self.first_ping_seconds = time.monotonic() - STARTED_AT
+                    self.log(f"{Fore.GREEN + Style.BRIGHT}Time To First Ping: {Style.RESET_ALL}"
+                        f"{Fore.WHITE + Style.BRIGHT}{self.first_ping_seconds:.2f}s{Style.RESET_ALL}", event="first_ping")
+                self.metrics.pings.inc(proxy_label(proxy), "ok")
+                score = ping.data['score']
+                self.print_message(username, proxy, Fore.GREEN,
+                    f"{ping_type.upper()} PING Success"
+                    f"{Fore.MAGENTA + Style.BRIGHT} - {Style.RESET_ALL}"
+                    f"{Fore.CYAN + Style.BRIGHT}Network Score:{Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT} {score} {Style.RESET_ALL}"
                 )
+        except Exception as e:
+            self.stats['pings_failed'] += 1
+            self.recent_pings['failed'].add()
+            self.metrics.pings.inc(proxy_label(proxy), "failed")
+            self.print_message(username, proxy, Fore.RED, f"Send {ping_type.upper()} Ping Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}", error=str(e))
+
+        wait_time = self.ping_interval
+        self.progress(f"Wait For {self.format_seconds(wait_time)} For Next {ping_type.capitalize()} Ping...")
+        return wait_time
+
+    async def read_training(self, response):
+        result = codec.decode(await response.read())
+        # 如果是训练已完成的情况，直接返回结果
+        if result.get("success") is not True and result.get("msg") != "Training already completed":
+            return Result(Outcome.TRANSIENT, result, f"API returned unsuccessful response: {result.get('msg')}")
+        return Result(Outcome.OK, result)
+
+    async def complete_training(self, template: RequestTemplate, username: str, proxy=None):
+        url = f"{API_BASE_URL}/ai/complete"
+        result = await self.engine.execute("POST", url, proxy, template.claim, codec.TRAINING_BODY, parse=self.read_training)
+        return self.report_failure(result, username, proxy, "Complete Training")
+
+    async def get_soul_balance(self, template: RequestTemplate, username: str, proxy=None):
+        url = f"{API_BASE_URL}/ai/list"
+        result = await self.engine.execute("GET", url, proxy, template.api)
+        return self.report_failure(result, username, proxy, "Get Soul Balance")
+
+    async def get_daily_rewards(self, template: RequestTemplate, username: str, proxy=None):
+        url = f"{API_BASE_URL}/reward/daily-list"
+        result = await self.engine.execute("GET", url, proxy, template.api, parse=read_data)
+        return self.report_failure(result, username, proxy, "Get Daily Rewards")
 
-                ping = await self.send_ping(token, browser_id, username, user_id, proxy, ping_type=ping_type)
-                if ping == "TOKEN_EXPIRED":
-                    self.print_message(username, proxy, Fore.RED, f"Token Expired (401) - Pausing Account ({ping_type})")
-                    self.save_paused_account(account_data)
-                    return
-                if ping == "ACCOUNT_FORBIDDEN":
-                    self.print_message(username, proxy, Fore.RED, f"Account Forbidden (403) - Pausing Account ({ping_type})")
-                    self.save_paused_account(account_data)
-                    return
-                if ping:
-                    score = ping['score']
+    async def claim_daily_reward(self, template: RequestTemplate, username: str, reward_id: int, proxy=None):
+        url = f"{API_BASE_URL}/reward/daily-complete"
+        result = await self.engine.execute("POST", url, proxy, template.claim, codec.reward_body(reward_id), parse=read_data)
+        return self.report_failure(result, username, proxy, "Claim Daily Reward")
+
+    def daily_wait(self, at: float):
+        return max(0.0, at - clock.time())
+
+    def plan_daily_delay(self, account: Account, proxy, job: str):
+        # 由全局计划按小时容量分配今天(今天已完成或已来不及时为明天)的执行时间
+        at = self.planner.plan(account.uid, job)
+        self.print_message(account.name, proxy, Fore.BLUE,
+            f"Waiting for {job} time: {datetime.fromtimestamp(at, pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+        return self.daily_wait(at)
+
+    def retry_daily_delay(self, account: Account, proxy, job: str, reason: str, color=Fore.BLUE):
+        # 在当天截止前的剩余容量中安排重试, 来不及时计划会报告并排到明天
+        at = self.planner.retry(account.uid, job)
+        self.print_message(account.name, proxy, color,
+            f"{reason}, will retry at {datetime.fromtimestamp(at, pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+        return self.daily_wait(at)
+
+    def skip_day_delay(self, account: Account, proxy, job: str, reason: str):
+        # 今天无法执行但不是故障(例如积分不足), 不占用重试容量也不报告风险, 明天再试
+        at = self.planner.skip(account.uid, job)
+        self.print_message(account.name, proxy, Fore.YELLOW,
+            f"{reason}, will try again at {datetime.fromtimestamp(at, pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+        return self.daily_wait(at)
+
+    def next_day_delay(self, account: Account, job: str):
+        # 今天已完成, 排入明天的计划
+        return self.daily_wait(self.planner.complete(account.uid, job))
+
+    def report_daily_risk(self, uid: str, job: str, reason: str):
+        account = self.account_index.get(uid)
+        self.print_message(account.name if account else uid, None, Fore.RED,
+            f"Daily {job} at risk: {reason}", event="daily_at_risk")
+
+    async def process_daily_reward(self, account: Account, proxy=None):
+        template = account.template
+        username = account.name
+        try:
+            # 检查点或状态库中今天已领取过, 不再请求
+            if self.check_reward_status(account):
+                self.print_message(username, proxy, Fore.YELLOW, "Daily Reward Already Claimed Today (Local Record)")
+                return self.next_day_delay(account, "reward")
+
+            # 到达随机时间后，获取每日奖励列表
+            self.print_message(username, proxy, Fore.BLUE, "Getting Daily Rewards...")
+            daily_rewards = await self.get_daily_rewards(template, username, proxy)
+            if self.pause_on_auth_failure(daily_rewards, username, proxy, account):
+                return None
+
+            if not daily_rewards.ok:
+                return self.retry_daily_delay(account, proxy, "reward", "Getting daily rewards failed")
+            daily_rewards = daily_rewards.data
+
+            # 检查今天是否已经领取过奖励
+            if daily_rewards.get('today') == 1:
+                self.print_message(username, proxy, Fore.YELLOW, "Daily reward already claimed today")
+                account.reward_day = clock.utc_date()
+                if self.store:
+                    self.store.record_reward(account.uid)
+            else:
+                # 找到未领取的奖励
+                available_rewards = [reward for reward in daily_rewards['list'] if not reward['reward']]
+                if not available_rewards:
+                    self.print_message(username, proxy, Fore.YELLOW, "No Available Daily Rewards")
+                else:
+                    # 随机选择一个未领取的奖励
+                    selected_reward = random.choice(available_rewards)
+                    reward_id = selected_reward['daily']
+
+                    self.print_message(username, proxy, Fore.BLUE, f"Claiming Daily Reward (ID: {reward_id})...")
+                    reward_data = await self.claim_daily_reward(template, username, reward_id, proxy)
+                    if self.pause_on_auth_failure(reward_data, username, proxy, account):
+                        return None
+                    if not reward_data.ok:
+                        return self.retry_daily_delay(account, proxy, "reward", "Claiming daily reward failed")
+                    reward_data = reward_data.data or {}
+                    account.reward_day = clock.utc_date()
+                    if self.store:
+                        self.store.record_reward(account.uid, reward_id)
+                    self.refresh_earning(account)
+
+                    soul = reward_data.get('soul', 0)
+                    core = reward_data.get('core', 0)
+                    blindbox = reward_data.get('blindbox', 0)
                     self.print_message(username, proxy, Fore.GREEN,
-                        f"{ping_type.upper()} PING Success"
+                        "Daily Reward Claimed "
+                        f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+                        f"{Fore.CYAN + Style.BRIGHT} Reward: {Style.RESET_ALL}"
+                        f"{Fore.WHITE + Style.BRIGHT}{soul} Soul PTS{Style.RESET_ALL}"
                         f"{Fore.MAGENTA + Style.BRIGHT} - {Style.RESET_ALL}"
-                        f"{Fore.CYAN + Style.BRIGHT}Network Score:{Style.RESET_ALL}"
-                        f"{Fore.WHITE + Style.BRIGHT} {score} {Style.RESET_ALL}"
+                        f"{Fore.WHITE + Style.BRIGHT}{core} Core{Style.RESET_ALL}"
+                        f"{Fore.MAGENTA + Style.BRIGHT} - {Style.RESET_ALL}"
+                        f"{Fore.WHITE + Style.BRIGHT}{blindbox} Blindbox{Style.RESET_ALL}",
+                        event="reward_claimed"
                     )
-            except Exception as e:
-                logging.error(f"Send {ping_type.capitalize()} Ping Failed", extra={"account": username, "proxy": proxy if proxy else "No Proxy", "message": str(e)})
-                self.print_message(username, proxy, Fore.RED, f"Send {ping_type.upper()} Ping Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-
-            wait_time = 10 * 60
-            print(
-                f"{Fore.CYAN + Style.BRIGHT}[ {datetime.now().astimezone(wib).strftime('%x %X %Z')} ]{Style.RESET_ALL}"
-                f"{Fore.WHITE + Style.BRIGHT} | {Style.RESET_ALL}"
-                f"{Fore.BLUE + Style.BRIGHT}Wait For {self.format_seconds(wait_time)} For Next {ping_type.capitalize()} Ping...{Style.RESET_ALL}",
-                end="\r",
-                flush=True
-            )
-            await asyncio.sleep(wait_time)
-
-    async def complete_training(self, token: str, username: str, proxy=None, retries=2):
-        url = "https://api.aigaea.net/api/ai/complete"
-        data = json.dumps({"detail":"3_0_1"})
-        headers = {
-            **self.headers,
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Content-Length": str(len(data))
-        }
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.post(url=url, headers=headers, data=data) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        if result.get("success") is not True:
-                            # 如果是训练已完成的情况，直接返回结果
-                            if result.get("msg") == "Training already completed":
-                                return result
-                            raise ValueError(f"API returned unsuccessful response: {result.get('msg')}")
-                        return result
-            except ClientResponseError as e:
-                if e.status == 401:
-                    return "TOKEN_EXPIRED"
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Complete Training Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                return None
-            except Exception as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Complete Training Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                return None
 
-    async def get_soul_balance(self, token: str, username: str, proxy=None, retries=2):
-        url = "https://api.aigaea.net/api/ai/list"
-        headers = {
-            **self.headers,
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Priority": "u=1, i"
-        }
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.get(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        if result.get("success") is not True:
-                            raise ValueError(f"API returned unsuccessful response: {result.get('msg')}")
-                        return result
-            except ClientResponseError as e:
-                if e.status == 401:
-                    return "TOKEN_EXPIRED"
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Get Soul Balance Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                return None
-            except Exception as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Get Soul Balance Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                return None
+            # 已领取或无可用奖励，第二天再随机选择时间
+            wait_seconds = self.next_day_delay(account, "reward")
+            self.print_message(username, proxy, Fore.BLUE,
+                f"Next daily reward check will be in {self.format_seconds(wait_seconds)}")
+            return wait_seconds
 
-    async def get_daily_rewards(self, token: str, username: str, proxy=None, retries=2):
-        url = "https://api.aigaea.net/api/reward/daily-list"
-        headers = {
-            **self.headers,
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Priority": "u=1, i"
-        }
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.get(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        if result.get("success") is not True:
-                            raise ValueError(f"API returned unsuccessful response: {result.get('msg')}")
-                        return result['data']
-            except ClientResponseError as e:
-                if e.status == 401:
-                    return "TOKEN_EXPIRED"
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Get Daily Rewards Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                return None
-            except Exception as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Get Daily Rewards Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                return None
+        except Exception as e:
+            # 处理未预期的异常（如网络错误、连接超时等）
+            self.print_message(username, proxy, Fore.RED, f"Daily Reward Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}", error=str(e))
+            # 发生未预期错误时在截止前重新安排
+            return self.retry_daily_delay(account, proxy, "reward", "Error occurred")
 
-    async def claim_daily_reward(self, token: str, username: str, reward_id: int, proxy=None, retries=2):
-        url = "https://api.aigaea.net/api/reward/daily-complete"
-        data = json.dumps({"id": reward_id})
-        headers = {
-            **self.headers,
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Content-Length": str(len(data))
-        }
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.post(url=url, headers=headers, data=data) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        if result.get("success") is not True:
-                            raise ValueError(f"API returned unsuccessful response: {result.get('msg')}")
-                        return result['data']
-            except ClientResponseError as e:
-                if e.status == 401:
-                    return "TOKEN_EXPIRED"
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Claim Daily Reward Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
+    async def process_complete_training(self, account: Account, proxy=None):
+        template = account.template
+        username = account.name
+        try:
+            # 检查今天是否已经训练过
+            if self.check_training_status(account.uid):
+                self.print_message(username, proxy, Fore.YELLOW, "Training Already Completed Today (Local Record)")
+                self.print_message(username, proxy, Fore.BLUE, "Waiting for next day's training")
+                return self.next_day_delay(account, "training")
+
+            # 检查积分余额
+            self.print_message(username, proxy, Fore.BLUE, "Checking Points Balance...")
+            earning = await self.account_earning(account, proxy)
+            if self.pause_on_auth_failure(earning, username, proxy, account):
                 return None
-            except Exception as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(username, proxy, Fore.RED, f"Claim Daily Reward Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
+
+            if not earning.ok:
+                return self.retry_daily_delay(account, proxy, "training", "Checking points balance failed")
+
+            total_points = earning.data['era_gaea']
+            self.print_message(username, proxy, Fore.WHITE,
+                f"Current Points Balance: {total_points} PTS"
+            )
+
+            if total_points < 2500:
+                self.print_message(username, proxy, Fore.YELLOW,
+                    f"Points Balance ({total_points}) is less than 2500")
+                return self.skip_day_delay(account, proxy, "training", "Not enough points")
+
+            # 执行训练
+            self.print_message(username, proxy, Fore.BLUE, "Starting Training...")
+            train = await self.complete_training(template, username, proxy)
+            if self.pause_on_auth_failure(train, username, proxy, account):
                 return None
 
-    async def process_daily_reward(self, token: str, username: str, account_data: dict, proxy=None):
-        while True:
-            try:
-                # 获取当前UTC时间
-                current_utc = datetime.now(pytz.UTC)
-                # 计算今天的UTC 0:00
-                today_utc = current_utc.replace(hour=0, minute=0, second=0, microsecond=0)
-                # 计算下一个UTC 0:00
-                next_utc = today_utc + timedelta(days=1)
-                
-                # 生成今天的随机领取时间（UTC 0-24点之间）
-                random_hour = random.randint(0, 23)
-                random_minute = random.randint(0, 59)
-                random_second = random.randint(0, 59)
-                today_reward_time = today_utc.replace(hour=random_hour, minute=random_minute, second=random_second)
-                
-                # 如果当前时间已经过了今天的随机时间，在当前时间和24点之间生成新的随机时间
-                # 但是要排除当前时间是UTC 0:00的情况
-                if current_utc >= today_reward_time and current_utc != today_utc:
-                    # 计算当前时间到24点的秒数
-                    remaining_seconds = (next_utc - current_utc).total_seconds()
-                    # 生成一个0到剩余秒数之间的随机等待时间
-                    random_wait_seconds = random.randint(0, int(remaining_seconds))
-                    # 计算新的随机时间点
-                    new_reward_time = current_utc + timedelta(seconds=random_wait_seconds)
-                    self.print_message(username, proxy, Fore.BLUE, 
-                        f"Original reward time ({today_reward_time.strftime('%H:%M:%S')} UTC) has passed, "
-                        f"will try at {new_reward_time.strftime('%H:%M:%S')} UTC")
-                    await asyncio.sleep(random_wait_seconds)
-                else:
-                    # 计算到随机领取时间的等待时间
-                    wait_seconds = (today_reward_time - current_utc).total_seconds()
-                    self.print_message(username, proxy, Fore.BLUE, 
-                        f"Waiting for reward time: {today_reward_time.strftime('%H:%M:%S')} UTC")
-                    await asyncio.sleep(wait_seconds)
-
-                # 到达随机时间后，获取每日奖励列表
-                self.print_message(username, proxy, Fore.BLUE, "Getting Daily Rewards...")
-                daily_rewards = await self.get_daily_rewards(token, username, proxy)
-                if daily_rewards == "TOKEN_EXPIRED":
-                    self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Pausing Account")
-                    self.save_paused_account(account_data)
-                    return
-
-                if daily_rewards:
-                    # 检查今天是否已经领取过奖励
-                    if daily_rewards.get('today') == 1:
-                        self.print_message(username, proxy, Fore.YELLOW, "Daily reward already claimed today")
-                        # 如果已经领取过奖励，等待到下一个UTC 0:00
-                        wait_seconds = (next_utc - current_utc).total_seconds()
-                        self.print_message(username, proxy, Fore.BLUE, 
-                            f"Next daily reward check will be in {self.format_seconds(wait_seconds)}")
-                        await asyncio.sleep(wait_seconds)
-                        continue
-                    else:
-                        # 找到未领取的奖励
-                        available_rewards = [reward for reward in daily_rewards['list'] if not reward['reward']]
-                        if available_rewards:
-                            # 随机选择一个未领取的奖励
-                            selected_reward = random.choice(available_rewards)
-                            reward_id = selected_reward['daily']
-                            
-                            self.print_message(username, proxy, Fore.BLUE, f"Claiming Daily Reward (ID: {reward_id})...")
-                            reward_data = await self.claim_daily_reward(token, username, reward_id, proxy)
-                            if reward_data == "TOKEN_EXPIRED":
-                                self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Pausing Account")
-                                self.save_paused_account(account_data)
-                                return
-
-                            if reward_data:
-                                soul = reward_data.get('soul', 0)
-                                core = reward_data.get('core', 0)
-                                blindbox = reward_data.get('blindbox', 0)
-                                self.print_message(username, proxy, Fore.GREEN,
-                                    "Daily Reward Claimed "
-                                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
-                                    f"{Fore.CYAN + Style.BRIGHT} Reward: {Style.RESET_ALL}"
-                                    f"{Fore.WHITE + Style.BRIGHT}{soul} Soul PTS{Style.RESET_ALL}"
-                                    f"{Fore.MAGENTA + Style.BRIGHT} - {Style.RESET_ALL}"
-                                    f"{Fore.WHITE + Style.BRIGHT}{core} Core{Style.RESET_ALL}"
-                                    f"{Fore.MAGENTA + Style.BRIGHT} - {Style.RESET_ALL}"
-                                    f"{Fore.WHITE + Style.BRIGHT}{blindbox} Blindbox{Style.RESET_ALL}"
-                                )
-                                # 领取奖励后等待到下一个UTC 0:00
-                                wait_seconds = (next_utc - current_utc).total_seconds()
-                                self.print_message(username, proxy, Fore.BLUE, 
-                                    f"Next daily reward check will be in {self.format_seconds(wait_seconds)}")
-                                await asyncio.sleep(wait_seconds)
-                                continue
-                        else:
-                            self.print_message(username, proxy, Fore.YELLOW, "No Available Daily Rewards")
-                            # 如果没有可用奖励，等待到下一个UTC 0:00
-                            wait_seconds = (next_utc - current_utc).total_seconds()
-                            self.print_message(username, proxy, Fore.BLUE, 
-                                f"Next daily reward check will be in {self.format_seconds(wait_seconds)}")
-                            await asyncio.sleep(wait_seconds)
-                            continue
+            if train.data is None:
+                # 如果没有响应，在截止前重新安排训练时间
+                return self.retry_daily_delay(account, proxy, "training", "No response from training API", Fore.YELLOW)
 
-            except Exception as e:
-                # 处理未预期的异常（如网络错误、连接超时等）
-                logging.error("Daily Reward Failed", extra={"account": username, "proxy": proxy if proxy else "No Proxy", "message": str(e)})
-                self.print_message(username, proxy, Fore.RED, f"Unexpected Error: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                await asyncio.sleep(60)  # 发生未预期错误时等待1分钟后重试
+            train = train.data
+            if train.get("code") == 200 and train.get("success") is True:
+                data = train.get("data", {})
+                burned_points = data.get('burned_points', 0)
+                soul = data.get('soul', 0)
+                blindbox = data.get('blindbox', 0)
+                self.print_message(username, proxy, Fore.GREEN,
+                    "Training Completed "
+                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT} Burned {burned_points} PTS {Style.RESET_ALL}"
+                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+                    f"{Fore.CYAN + Style.BRIGHT} Reward: {Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT}{soul} Soul PTS{Style.RESET_ALL}"
+                    f"{Fore.MAGENTA + Style.BRIGHT} - {Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT}{blindbox} Blindbox{Style.RESET_ALL}",
+                    event="training_completed"
+                )
+                # 记录训练完成
+                self.save_training_record(account)
+                self.refresh_earning(account)
+                self.print_message(username, proxy, Fore.BLUE, "Training completed successfully, waiting for next day")
+                return self.next_day_delay(account, "training")
 
-    async def process_complete_training(self, token: str, username: str, account_data: dict, proxy=None):
-        while True:
-            try:
-                # 检查今天是否已经训练过
-                if self.check_training_status(account_data['UID']):
-                    current_utc = datetime.now(pytz.UTC)
-                    today_utc = current_utc.replace(hour=0, minute=0, second=0, microsecond=0)
-                    next_utc = today_utc + timedelta(days=1)
-                    wait_seconds = (next_utc - current_utc).total_seconds()
-                    self.print_message(username, proxy, Fore.YELLOW, "Training Already Completed Today (Local Record)")
-                    self.print_message(username, proxy, Fore.BLUE, 
-                        f"Waiting for next day's training")
-                    await asyncio.sleep(wait_seconds)
-                    continue
+            if train.get("msg") == "Training already completed":
+                self.print_message(username, proxy, Fore.YELLOW, "Training Already Completed Today")
+                # 记录训练完成
+                self.save_training_record(account)
+                self.print_message(username, proxy, Fore.BLUE, "Waiting for next day's training")
+                return self.next_day_delay(account, "training")
 
-                # 获取当前UTC时间
-                current_utc = datetime.now(pytz.UTC)
-                # 计算今天的UTC 0:00
-                today_utc = current_utc.replace(hour=0, minute=0, second=0, microsecond=0)
-                # 计算下一个UTC 0:00
-                next_utc = today_utc + timedelta(days=1)
-                
-                # 生成今天的随机训练时间（UTC 0-12点之间）
-                random_hour = random.randint(0, 11)
-                random_minute = random.randint(0, 59)
-                random_second = random.randint(0, 59)
-                today_training_time = today_utc.replace(hour=random_hour, minute=random_minute, second=random_second)
-                
-                # 如果当前时间已经过了今天的训练时间，在当前时间到24点之间生成新的随机时间
-                if current_utc >= today_training_time:
-                    # 计算当前时间到24点的秒数
-                    remaining_seconds = (next_utc - current_utc).total_seconds()
-                    # 生成一个0到剩余秒数之间的随机等待时间
-                    random_wait_seconds = random.randint(0, int(remaining_seconds))
-                    # 计算新的随机时间点
-                    new_training_time = current_utc + timedelta(seconds=random_wait_seconds)
-                    self.print_message(username, proxy, Fore.BLUE, 
-                        f"Original training time ({today_training_time.strftime('%H:%M:%S')} UTC) has passed, "
-                        f"will try at {new_training_time.strftime('%H:%M:%S')} UTC")
-                    await asyncio.sleep(random_wait_seconds)
-                else:
-                    # 计算到随机训练时间的等待时间
-                    wait_seconds = (today_training_time - current_utc).total_seconds()
-                    self.print_message(username, proxy, Fore.BLUE, 
-                        f"Waiting for training time: {today_training_time.strftime('%H:%M:%S')} UTC")
-                    await asyncio.sleep(wait_seconds)
-                
-                # 检查积分余额
-                self.print_message(username, proxy, Fore.BLUE, "Checking Points Balance...")
-                earning = await self.user_earning(token, username, proxy)
-                if earning == "TOKEN_EXPIRED":
-                    self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Pausing Account")
-                    self.save_paused_account(account_data)
-                    return
-                
-                if earning:
-                    total_points = earning['era_gaea']
-                    
-                    self.print_message(username, proxy, Fore.WHITE,
-                        f"Current Points Balance: {total_points} PTS"
-                    )
-                    
-                    if total_points < 2500:
-                        self.print_message(username, proxy, Fore.YELLOW, 
-                            f"Points Balance ({total_points}) is less than 2500, skipping training today")
-                    else:
-                        # 执行训练
-                        self.print_message(username, proxy, Fore.BLUE, "Starting Training...")
-                        train = await self.complete_training(token, username, proxy)
-                        if train == "TOKEN_EXPIRED":
-                            self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Pausing Account")
-                            self.save_paused_account(account_data)
-                            return
-                        
-                        if train:
-                            if train.get("code") == 200 and train.get("success") is True:
-                                data = train.get("data", {})
-                                burned_points = data.get('burned_points', 0)
-                                soul = data.get('soul', 0)
-                                blindbox = data.get('blindbox', 0)
-                                self.print_message(username, proxy, Fore.GREEN,
-                                    "Training Completed "
-                                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
-                                    f"{Fore.WHITE + Style.BRIGHT} Burned {burned_points} PTS {Style.RESET_ALL}"
-                                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
-                                    f"{Fore.CYAN + Style.BRIGHT} Reward: {Style.RESET_ALL}"
-                                    f"{Fore.WHITE + Style.BRIGHT}{soul} Soul PTS{Style.RESET_ALL}"
-                                    f"{Fore.MAGENTA + Style.BRIGHT} - {Style.RESET_ALL}"
-                                    f"{Fore.WHITE + Style.BRIGHT}{blindbox} Blindbox{Style.RESET_ALL}"
-                                )
-                                # 记录训练完成
-                                self.save_training_record(account_data)
-                                # 训练成功后等待到下一个UTC 0:00
-                                wait_seconds = (next_utc - current_utc).total_seconds()
-                                self.print_message(username, proxy, Fore.BLUE, 
-                                    f"Training completed successfully, waiting for next day")
-                                await asyncio.sleep(wait_seconds)
-                                continue
-                            elif train.get("msg") == "Training already completed":
-                                self.print_message(username, proxy, Fore.YELLOW, "Training Already Completed Today")
-                                # 记录训练完成
-                                self.save_training_record(account_data)
-                                # 训练已完成时等待到下一个UTC 0:00
-                                wait_seconds = (next_utc - current_utc).total_seconds()
-                                self.print_message(username, proxy, Fore.BLUE, 
-                                    f"Waiting for next day's training")
-                                await asyncio.sleep(wait_seconds)
-                                continue
-                            else:
-                                # 处理其他API响应错误
-                                error_msg = train.get('msg', 'Unknown error')
-                                self.print_message(username, proxy, Fore.RED, f"Training API Error: {error_msg}")
-                                # 生成新的随机训练时间（从当前时间到UTC 24:00）
-                                remaining_seconds = (next_utc - current_utc).total_seconds()
-                                new_wait_seconds = random.randint(0, int(remaining_seconds))
-                                new_training_time = current_utc + timedelta(seconds=new_wait_seconds)
-                                self.print_message(username, proxy, Fore.BLUE, 
-                                    f"Training failed, will retry at {new_training_time.strftime('%H:%M:%S')} UTC")
-                                await asyncio.sleep(new_wait_seconds)
-                                continue
-                        else:
-                            # 如果没有响应，生成新的随机训练时间
-                            remaining_seconds = (next_utc - current_utc).total_seconds()
-                            new_wait_seconds = random.randint(0, int(remaining_seconds))
-                            new_training_time = current_utc + timedelta(seconds=new_wait_seconds)
-                            self.print_message(username, proxy, Fore.YELLOW, 
-                                f"No response from training API, will retry at {new_training_time.strftime('%H:%M:%S')} UTC")
-                            await asyncio.sleep(new_wait_seconds)
-                            continue
+            # 处理其他API响应错误，在截止前重新安排训练时间
+            error_msg = train.get('msg', 'Unknown error')
+            self.print_message(username, proxy, Fore.RED, f"Training API Error: {error_msg}")
+            return self.retry_daily_delay(account, proxy, "training", "Training failed")
 
-            except Exception as e:
-                # 处理未预期的异常（如网络错误、连接超时等）
-                logging.error("Complete Training Failed", extra={"account": username, "proxy": proxy if proxy else "No Proxy", "message": str(e)})
-                self.print_message(username, proxy, Fore.RED, f"Unexpected Error: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
-                # 发生错误时也生成新的随机训练时间
-                remaining_seconds = (next_utc - current_utc).total_seconds()
-                new_wait_seconds = random.randint(0, int(remaining_seconds))
-                new_training_time = current_utc + timedelta(seconds=new_wait_seconds)
-                self.print_message(username, proxy, Fore.BLUE, 
-                    f"Error occurred, will retry at {new_training_time.strftime('%H:%M:%S')} UTC")
-                await asyncio.sleep(new_wait_seconds)
-
-    async def test_training(self, token: str, username: str, proxy=None):
+        except Exception as e:
+            # 处理未预期的异常（如网络错误、连接超时等）
+            self.print_message(username, proxy, Fore.RED, f"Complete Training Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}", error=str(e))
+            # 发生错误时也在截止前重新安排训练时间
+            return self.retry_daily_delay(account, proxy, "training", "Error occurred")
+
+    async def test_training(self, template: RequestTemplate, username: str, proxy=None):
         """测试训练功能的方法"""
         self.print_message(username, proxy, Fore.BLUE, "Starting Training Test...")
         
         # 1. 首先检查积分余额
         self.print_message(username, proxy, Fore.BLUE, "Checking Points Balance...")
-        earning = await self.user_earning(token, username, proxy)
-        if earning == "TOKEN_EXPIRED":
-            self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Test Failed")
+        earning = await self.user_earning(template, username, proxy)
+        if earning.outcome in (Outcome.TOKEN_EXPIRED, Outcome.FORBIDDEN):
+            self.print_message(username, proxy, Fore.RED, f"{earning.error} - Test Failed")
             return False
         
-        if earning:
-            total_points = earning['era_gaea']
+        if earning.ok:
+            total_points = earning.data['era_gaea']
             self.print_message(username, proxy, Fore.WHITE,
                 f"Current Points Balance: {total_points} PTS"
             )
@@ -779,24 +934,25 @@ class AiGaea:
         
         # 2. 检查 Soul 余额
         self.print_message(username, proxy, Fore.BLUE, "Checking Soul Balance...")
-        soul_balance = await self.get_soul_balance(token, username, proxy)
-        if soul_balance == "TOKEN_EXPIRED":
-            self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Test Failed")
+        soul_balance = await self.get_soul_balance(template, username, proxy)
+        if soul_balance.outcome in (Outcome.TOKEN_EXPIRED, Outcome.FORBIDDEN):
+            self.print_message(username, proxy, Fore.RED, f"{soul_balance.error} - Test Failed")
             return False
             
-        if soul_balance:
+        if soul_balance.ok:
             self.print_message(username, proxy, Fore.WHITE,
-                f"Current Soul Balance: {soul_balance.get('data', {}).get('soul', 0)} PTS"
+                f"Current Soul Balance: {soul_balance.data.get('data', {}).get('soul', 0)} PTS"
             )
         
         # 3. 执行训练
         self.print_message(username, proxy, Fore.BLUE, "Testing Training...")
-        train = await self.complete_training(token, username, proxy)
-        if train == "TOKEN_EXPIRED":
-            self.print_message(username, proxy, Fore.RED, "Token Expired (401) - Test Failed")
+        train = await self.complete_training(template, username, proxy)
+        if train.outcome in (Outcome.TOKEN_EXPIRED, Outcome.FORBIDDEN):
+            self.print_message(username, proxy, Fore.RED, f"{train.error} - Test Failed")
             return False
         
-        if train:
+        if train.data:
+            train = train.data
             if train.get("code") == 200 and train.get("success") is True:
                 data = train.get("data", {})
                 burned_points = data.get('burned_points', 0)
@@ -824,13 +980,13 @@ class AiGaea:
             self.print_message(username, proxy, Fore.RED, "Training Test Failed: No Response")
             return False
 
-    async def test_account(self, account: dict, use_proxy: bool):
+    async def test_account(self, account: Account, use_proxy: bool):
         """测试单个账户的所有功能"""
-        browser_id = account.get('Browser_ID')
-        token = account.get('Token')
-        proxy = self.check_proxy_schemes(account.get('Proxy')) if use_proxy else None
-        username = account.get('Name')
-        user_id = account.get('UID')
+        browser_id = account.browser_id
+        token = account.token
+        proxy = account.proxy_url if use_proxy else None
+        username = account.name
+        user_id = account.uid
         
         if not (token and browser_id and username and user_id):
             self.log(f"{Fore.RED}Missing required fields (Token, Browser_ID, Name, or UID) for account {username or 'unknown'}{Style.RESET_ALL}")
@@ -839,103 +995,536 @@ class AiGaea:
         self.print_message(username, proxy, Fore.BLUE, "Starting Account Test...")
         
         # 测试训练功能
-        training_result = await self.test_training(token, username, proxy)
+        training_result = await self.test_training(self.template_for(account), username, proxy)
         
         if training_result:
             self.print_message(username, proxy, Fore.GREEN, "Account Test Completed Successfully")
         else:
             self.print_message(username, proxy, Fore.RED, "Account Test Failed")
 
-    async def process_accounts(self, account: dict, use_proxy: bool):
-        browser_id = account.get('Browser_ID')
-        token = account.get('Token')
-        proxy = self.check_proxy_schemes(account.get('Proxy')) if use_proxy else None
-        username = account.get('Name')
-        user_id = account.get('UID')
+    async def validate_tokens(self, accounts, use_proxy: bool, concurrency=50):
+        """启动前并发查询每个账户的收益数据, Token 过期/封禁的账户直接暂停, 返回其余账户
+
+        查询结果写入收益缓存, 账户启动后的首次收益查询不再重复请求.
+        """
+        counts = Counter()
+        latencies = []
+        started = time.monotonic()
+        next_report = started + 5
+        # 所有 worker 共用一个迭代器, 同时进行的查询不超过 concurrency 个
+        queue = iter(accounts)
+        # 本次检查暂停的账户; 使用状态库时暂停记录由写入任务稍后提交, 不能立即从数据库读到
+        paused = set()
+
+        async def worker():
+            nonlocal next_report
+            for account in queue:
+                if not (account.token and account.browser_id and account.name and account.uid):
+                    counts['skipped'] += 1
+                    continue
+                proxy = account.proxy_url if use_proxy else None
+                template = self.template_for(account)
+                start = time.monotonic()
+                try:
+                    result = await self.earnings.get(account.uid, partial(self.user_earning, template, account.name, proxy))
+                except Exception as e:
+                    counts['errors'] += 1
+                    self.print_message(account.name, proxy, Fore.RED, f"Token Check Failed: {Fore.YELLOW+Style.BRIGHT}{str(e)}")
+                    continue
+                latencies.append(time.monotonic() - start)
+                if self.pause_on_auth_failure(result, account.name, proxy, account, " (Token Check)"):
+                    paused.add(account.uid)
+                    counts['forbidden' if result.outcome is Outcome.FORBIDDEN else 'expired'] += 1
+                else:
+                    counts['valid' if result.ok else 'errors'] += 1
+                if time.monotonic() >= next_report:
+                    next_report = time.monotonic() + 5
+                    self.report_validation(counts, len(accounts), time.monotonic() - started)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(accounts))))))
+        self.report_validation(counts, len(accounts), time.monotonic() - started, latencies)
+        return [account for account in accounts if account.uid not in paused]
+
+    def report_validation(self, counts: Counter, total: int, elapsed: float, latencies=None):
+        checked = sum(counts.values())
+        message = (
+            f"{Fore.CYAN + Style.BRIGHT}[ Token Check ]{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} {checked}/{total} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.GREEN + Style.BRIGHT} Valid: {counts['valid']} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.YELLOW + Style.BRIGHT} Expired: {counts['expired']} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.RED + Style.BRIGHT} Forbidden: {counts['forbidden']} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Errors: {counts['errors'] + counts['skipped']} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} {self.format_seconds(elapsed)} ({checked / elapsed if elapsed else 0:.1f}/s){Style.RESET_ALL}"
+        )
+        if latencies is None:
+            self.log(message, event="token_check")
+            return
+        latencies.sort()
+        if latencies:
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            message += f"{Fore.WHITE + Style.BRIGHT} - Latency p50 {p50 * 1000:.0f} ms p99 {p99 * 1000:.0f} ms{Style.RESET_ALL}"
+        self.log(message, event="token_check_finished")
+
+    def template_for(self, account: Account):
+        # Token/Browser_ID 变化时原地重建, 同一 UID 的 User-Agent 不变
+        template = account.template
+        if template is None:
+            template = account.template = RequestTemplate(account.token, account.browser_id, account.uid)
+        elif template.token != account.token or template.browser_id != account.browser_id:
+            template.build(account.token, account.browser_id, account.uid)
+        return template
+
+    def process_accounts(self, account: Account, use_proxy: bool):
+        browser_id = account.browser_id
+        token = account.token
+        proxy = account.proxy_url if use_proxy else None
+        username = account.name
+        user_id = account.uid
         
         if not (token and browser_id and username and user_id):
             self.log(f"{Fore.RED}Missing required fields (Token, Browser_ID, Name, or UID) for account {username or 'unknown'}{Style.RESET_ALL}")
             return
 
-        # Add random initial delay (0-100 seconds)
-        initial_delay = random.uniform(0, 100)
-        self.log(f"{Fore.YELLOW}Initial delay for {username}: {self.format_seconds(initial_delay)}{Style.RESET_ALL}")
-        await asyncio.sleep(initial_delay)
+        self.proxy_pool.register(user_id, proxy)
 
-        try:
-            tasks = []
-            tasks.append(self.process_user_earning(token, username, account, proxy))
-            tasks.append(self.process_send_ping(token, browser_id, username, user_id, account, proxy, ping_type="extension"))
-            # 添加训练任务
-            if account.get('trained', False):  # 如果账户启用了训练
-                tasks.append(self.process_complete_training(token, username, account, proxy))
-            # 添加每日奖励任务
-            tasks.append(self.process_daily_reward(token, username, account, proxy))
-            await asyncio.gather(*tasks)
-        except Exception as e:
-            logging.error("Process Account Failed", extra={"account": username, "proxy": proxy if proxy else "No Proxy", "message": str(e)})
-            self.log(f"{Fore.RED}Error processing account {username}: {e}{Style.RESET_ALL}")
+        saved = self.resume.get(user_id)
+        if saved:
+            self.restore_account(account, saved)
+            due = saved.get('due', {})
+            now = clock.time()
+            if all(due.get(job, 0) > now for job in ("send_ping", "user_earning")):
+                # 检查点中的 ping 和收益查询都还没到期, 首批请求本身已经分散, 不占用启动准入
+                self.admit_account(account, proxy, 0)
+                return
+
+        # 由准入控制按速率激活, 不再各自随机延迟
+        self.ramp.add(user_id, partial(self.admit_account, account, proxy))
+
+    def admit_account(self, account: Account, proxy, delay: float):
+        self.scheduler.schedule(account.uid, "start", partial(self.start_account_jobs, account, proxy), delay)
+
+    def report_ramp(self, ramp: RampController, finished: bool):
+        snapshot = ramp.snapshot()
+        if finished:
+            self.log(
+                f"{Fore.CYAN + Style.BRIGHT}[ Ramp ]{Style.RESET_ALL}"
+                f"{Fore.GREEN + Style.BRIGHT} Started {snapshot['admitted']} Accounts in {self.format_seconds(snapshot['elapsed'])}{Style.RESET_ALL}",
+                event="ramp_finished")
+            return
+        self.log(
+            f"{Fore.CYAN + Style.BRIGHT}[ Ramp ]{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Started {snapshot['admitted']}/{snapshot['admitted'] + snapshot['pending']} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Rate: {snapshot['rate']:.1f}/s {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Errors: {snapshot['error_rate'] * 100:.0f}% {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} ETA: {self.format_seconds(ramp.eta())}{Style.RESET_ALL}",
+            event="ramp")
+
+    async def with_proxy(self, user_id: str, func, *args, **kwargs):
+        # 每次执行时使用当前分配的代理, 代理故障时由 proxy_pool 切换
+        return await func(*args, proxy=self.proxy_pool.current(user_id), **kwargs)
+
+    def account_job(self, user_id: str, proxy, func, *args, **kwargs):
+        if proxy:
+            return partial(self.with_proxy, user_id, func, *args, **kwargs)
+        return partial(func, *args, **kwargs)
+
+    def report_failover(self, user_id: str, old_proxy, new_proxy):
+        self.stats['proxy_failovers'] += 1
+        self.print_message(user_id, new_proxy, Fore.YELLOW,
+            f"Proxy {proxy_label(old_proxy)} Unhealthy - Switched to {proxy_label(new_proxy)}", event="proxy_failover")
+
+    def account_job_funcs(self, account: Account, proxy=None):
+        self.template_for(account)
+        job = partial(self.account_job, account.uid, proxy)
+        jobs = {
+            "user_earning": job(self.process_user_earning, account),
+            "send_ping": job(self.process_send_ping, account),
+            "daily_reward": job(self.process_daily_reward, account)
+        }
+        if account.trained:  # 如果账户启用了训练
+            jobs["complete_training"] = job(self.process_complete_training, account)
+        return jobs
+
+    async def start_account_jobs(self, account: Account, proxy=None):
+        user_id = account.uid
+        jobs = self.account_job_funcs(account, proxy)
+        # 重启后沿用检查点中未到期的时间; 已过期的 ping/收益查询立即执行, 每日任务重新随机
+        resumed = self.resume_delays(user_id)
+
+        self.scheduler.schedule(user_id, "user_earning", jobs["user_earning"], resumed.get("user_earning", 0))
+        self.scheduler.schedule(user_id, "send_ping", jobs["send_ping"], resumed.get("send_ping", 0))
+        # 添加训练任务
+        if "complete_training" in jobs:
+            delay = resumed.get("complete_training")
+            if delay is None:
+                delay = self.plan_daily_delay(account, proxy, "training")
+            else:
+                self.planner.restore(user_id, "training", clock.time() + delay)
+            self.scheduler.schedule(user_id, "complete_training", jobs["complete_training"], delay)
+        # 添加每日奖励任务
+        delay = resumed.get("daily_reward")
+        if delay is not None:
+            self.planner.restore(user_id, "reward", clock.time() + delay)
+        elif self.check_reward_status(account):
+            delay = self.next_day_delay(account, "reward")
+        else:
+            delay = self.plan_daily_delay(account, proxy, "reward")
+        self.scheduler.schedule(user_id, "daily_reward", jobs["daily_reward"], delay)
+        return None
 
-    async def main(self):
+    def ask_test_mode(self):
+        # 询问是否要运行测试
+        while True:
+            try:
+                test_mode = input("Run in test mode? (y/n) -> ").strip().lower()
+                if test_mode in ["y", "n"]:
+                    return test_mode == "y"
+                else:
+                    print(f"{Fore.RED + Style.BRIGHT}Please enter 'y' for test mode or 'n' for normal mode.{Style.RESET_ALL}")
+            except ValueError:
+                print(f"{Fore.RED + Style.BRIGHT}Invalid input. Please enter 'y' or 'n'.{Style.RESET_ALL}")
+
+    def stats_snapshot(self):
+        queue_stats = self.limiter.snapshot().values()
+        return {
+            **self.stats,
+            'accounts': len(self.accounts),
+            'active': self.active_accounts(),
+            'points_today': sum(self.today_points.values()),
+            'queue_waits': sum(stats['count'] for stats in queue_stats),
+            'queue_wait_total': sum(stats['total'] for stats in queue_stats)
+        }
+
+    def dashboard_snapshot(self):
+        states = self.account_states()
+        return {
+            'time': pipeline.timestamp(time.time()),
+            'states': {state: count for (state,), count in states.items()},
+            'pings_ok': self.recent_pings['ok'].total(),
+            'pings_failed': self.recent_pings['failed'].total(),
+            'points_today': sum(self.today_points.values()),
+            'backlog': self.scheduler.backlog(),
+            'ramp': self.ramp.snapshot(),
+            'proxies': self.proxy_pool.summary(),
+            'daily': self.planner.snapshot(),
+            'errors': list(self.recent_errors)
+        }
+
+    def report_profile(self, message: str, event: str):
+        level = logging.WARNING if event == "loop_lag" else logging.INFO
+        self.log(f"{Fore.CYAN + Style.BRIGHT}[ Profile ]{Style.RESET_ALL}{Fore.WHITE + Style.BRIGHT} {message}{Style.RESET_ALL}",
+            level=level, event=event)
+
+    async def report_limiter(self, interval=10 * 60):
+        # 输出限速排队时间, 用于区分是本地限速还是上游 API 变慢
+        while True:
+            await asyncio.sleep(interval)
+            for endpoint, stats in sorted(self.limiter.snapshot().items()):
+                average = stats['total'] / stats['count'] if stats['count'] else 0
+                self.log(
+                    f"{Fore.CYAN + Style.BRIGHT}[ Limiter ]{Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT} {endpoint} {Style.RESET_ALL}"
+                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT} Requests: {stats['count']} {Style.RESET_ALL}"
+                    f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT} Queue Avg: {average * 1000:.0f} ms Max: {stats['max'] * 1000:.0f} ms{Style.RESET_ALL}"
+                )
+
+    async def report_stats(self, report, interval=30):
+        # 多进程模式下定期把计数器汇报给 supervisor
+        while True:
+            await asyncio.sleep(interval)
+            report.put((self.shard[0], os.getpid(), self.stats_snapshot()))
+
+    async def main(self, use_proxy=None, trained=None, test_mode=None, report=None):
+        self.load_state()
+        self.load_paused_counts()
+        if self.store:
+            background = [asyncio.create_task(self.store.run())]
+        else:
+            background = [
+                asyncio.create_task(self.paused_journal.run()),
+                asyncio.create_task(self.training_journal.run())
+            ]
+        if self.history:
+            background.append(asyncio.create_task(self.history.run()))
+        metrics_server = None
         try:
+            if self.metrics_port:
+                metrics_server = MetricsServer(self.metrics, self.metrics_port)
+                await metrics_server.start()
+                if not self.profiler:
+                    background.append(asyncio.create_task(self.metrics.measure_loop_lag()))
+                self.log(f"{Fore.GREEN + Style.BRIGHT}Metrics: {Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT}http://127.0.0.1:{self.metrics_port}/metrics{Style.RESET_ALL}")
+            if self.profiler:
+                background.append(asyncio.create_task(self.profiler.lag.run()))
+                if self.profiler.install():
+                    self.log(f"{Fore.GREEN + Style.BRIGHT}Profiling: {Style.RESET_ALL}"
+                        f"{Fore.WHITE + Style.BRIGHT}kill -USR1 {os.getpid()} (stack sample) / kill -USR2 {os.getpid()} (tasks and memory){Style.RESET_ALL}", event="profiling")
+                else:
+                    self.log(f"{Fore.YELLOW + Style.BRIGHT}Profiling signals are not supported on this platform, only loop lag is monitored{Style.RESET_ALL}")
             self.load_accounts()
-            if not self.accounts:
+            if not self.accounts and not (self.watch and self.account_index):
                 self.log(f"{Fore.RED+Style.BRIGHT}No Accounts Loaded.{Style.RESET_ALL}")
                 return
             
-            use_proxy_choice, trained = self.print_question()
-            use_proxy = use_proxy_choice == 1
+            interactive = use_proxy is None
+            if interactive:
+                use_proxy_choice, trained = self.print_question()
+                use_proxy = use_proxy_choice == 1
 
+            self.use_proxy = use_proxy
+            self.trained = trained
             # 更新账户的训练状态
             for account in self.accounts:
-                account['trained'] = trained
+                account.trained = trained
 
-            self.clear_terminal()
-            self.welcome()
+            if interactive:
+                self.clear_terminal()
+                self.welcome()
             self.log(
                 f"{Fore.GREEN + Style.BRIGHT}Account's Total: {Style.RESET_ALL}"
                 f"{Fore.WHITE + Style.BRIGHT}{len(self.accounts)}{Style.RESET_ALL}"
             )
             self.log(
                 f"{Fore.YELLOW + Style.BRIGHT}Paused Accounts: {Style.RESET_ALL}"
-                f"{Fore.WHITE + Style.BRIGHT}{len(self.paused_accounts)}{Style.RESET_ALL}"
+                f"{Fore.WHITE + Style.BRIGHT}{len(self.paused_uids())}{Style.RESET_ALL}"
             )
 
             self.log(f"{Fore.CYAN + Style.BRIGHT}-{Style.RESET_ALL}"*75)
 
-            # 询问是否要运行测试
-            while True:
-                try:
-                    test_mode = input("Run in test mode? (y/n) -> ").strip().lower()
-                    if test_mode in ["y", "n"]:
-                        break
-                    else:
-                        print(f"{Fore.RED + Style.BRIGHT}Please enter 'y' for test mode or 'n' for normal mode.{Style.RESET_ALL}")
-                except ValueError:
-                    print(f"{Fore.RED + Style.BRIGHT}Invalid input. Please enter 'y' or 'n'.{Style.RESET_ALL}")
-
-            if test_mode == "y":
+            if test_mode is None:
+                test_mode = self.ask_test_mode()
+
+            if report is not None:
+                background.append(asyncio.create_task(self.report_stats(report)))
+            else:
+                background.append(asyncio.create_task(self.report_limiter()))
+
+            if test_mode:
                 # 测试模式：只测试第一个账户
                 if self.accounts:
                     await self.test_account(self.accounts[0], use_proxy)
             else:
-                # 正常模式：运行所有账户
-                tasks = []
+                # 正常模式：所有账户的任务由调度器统一执行
+                if self.validate:
+                    self.accounts = await self.validate_tokens(self.accounts, use_proxy, self.validate_concurrency)
+                    if self.validate_only:
+                        return
+                if self.checkpoint:
+                    self.resume = self.checkpoint.load()
+                    if self.resume:
+                        self.log(f"{Fore.GREEN + Style.BRIGHT}Resuming Schedule For: {Style.RESET_ALL}"
+                            f"{Fore.WHITE + Style.BRIGHT}{len(self.resume)} Accounts{Style.RESET_ALL}", event="resume")
+                    background.append(asyncio.create_task(self.checkpoint.run()))
                 for account in self.accounts:
-                    tasks.append(self.process_accounts(account, use_proxy))
-                await asyncio.gather(*tasks)
+                    self.process_accounts(account, use_proxy)
+                if use_proxy:
+                    background.append(asyncio.create_task(self.proxy_pool.run()))
+                if self.watch:
+                    # 热加载: 账户文件变化时增量更新, 所有账户都暂停后也继续等待新 Token
+                    self.watcher.watch(self.accounts_file, self.reload_accounts)
+                    if not self.store:
+                        self.watcher.watch(self.paused_accounts_file, self.reload_paused_accounts)
+                    background.append(asyncio.create_task(self.watcher.run()))
+                if self.dashboard:
+                    background.append(asyncio.create_task(self.dashboard.run()))
+                self.startup_seconds = time.monotonic() - STARTED_AT
+                self.log(f"{Fore.GREEN + Style.BRIGHT}Startup: {Style.RESET_ALL}"
+                    f"{Fore.WHITE + Style.BRIGHT}{self.startup_seconds:.2f}s - First pings within "
+                    f"{self.format_seconds(self.ramp.eta())}{Style.RESET_ALL}", event="startup")
+                try:
+                    await self.scheduler.run(stop_when_idle=not self.watch)
+                finally:
+                    if self.checkpoint:
+                        # 退出(包括 Ctrl+C)时保存最后的调度状态
+                        self.checkpoint.save()
+                if report is not None:
+                    report.put((self.shard[0], os.getpid(), self.stats_snapshot()))
 
         except Exception as e:
             self.log(f"{Fore.RED+Style.BRIGHT}Error: {e}{Style.RESET_ALL}")
             raise e
+        finally:
+            if self.store:
+                await self.store.stop()
+                # 只等待写入任务提交剩余的语句, 其它后台任务不会自行结束
+                await asyncio.gather(background[0], return_exceptions=True)
+            for task in background:
+                task.cancel()
+            if self.history:
+                self.history.save()
+            if metrics_server:
+                await metrics_server.stop()
+            if self.profiler:
+                self.profiler.uninstall()
+            await self.close()
+
+    async def run(self, **options):
+        """运行 main(), 收到 SIGTERM 时取消它, 与 Ctrl+C 一样在退出前保存检查点, 压缩 journal, 提交状态库"""
+        task = asyncio.create_task(self.main(**options))
+        loop = asyncio.get_running_loop()
+        terminated = False
+
+        def terminate():
+            nonlocal terminated
+            # 重复的 SIGTERM 不再打断正在进行的清理
+            if not terminated:
+                terminated = True
+                task.cancel()
+
+        if hasattr(signal, "SIGTERM"):
+            try:
+                loop.add_signal_handler(signal.SIGTERM, terminate)
+            except NotImplementedError:
+                # Windows 事件循环不支持信号处理
+                pass
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not terminated:
+                raise
+            self.log(f"{Fore.YELLOW + Style.BRIGHT}Received SIGTERM, state saved{Style.RESET_ALL}", event="terminated")
+        finally:
+            if hasattr(signal, "SIGTERM"):
+                try:
+                    loop.remove_signal_handler(signal.SIGTERM)
+                except NotImplementedError:
+                    pass
+
+def parse_shard(text: str):
+    index, count = (int(part) for part in text.split('/'))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard must be INDEX/COUNT with 0 <= INDEX < COUNT")
+    return index, count
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Auto Ping AI Gaea - BOT")
+    parser.add_argument("--config", help="TOML/YAML/JSON file with the same options as the command line flags")
+    parser.add_argument("--daemon", action="store_true", help="Never prompt; unset options use defaults (no proxy, no training, normal mode)")
+    parser.add_argument("--proxy", choices=["private", "none"], help="Run with the private proxies from accounts.csv or without proxy")
+    parser.add_argument("--train", action=argparse.BooleanOptionalAction, help="Run daily AI training")
+    parser.add_argument("--test", action=argparse.BooleanOptionalAction, help="Only test the first account")
+    parser.add_argument("--shard", type=parse_shard, help="Run only shard INDEX/COUNT of the accounts in this process")
+    parser.add_argument("--max-initial-delay", type=float, default=100, help="Spread account start-up over at least this many seconds")
+    parser.add_argument("--ramp-rate", type=float, default=50, help="Maximum accounts started per second (lowered by --rate-limit and on errors)")
+    parser.add_argument("--checkpoint-interval", type=float, default=60,
+        help="Save each account's next ping/earning/reward times every N seconds and resume from them after a restart (0 disables)")
+    parser.add_argument("--history-interval", type=float, default=60,
+        help="Append earnings snapshots to earnings/ every N seconds for python earnings_history.py (0 disables)")
+    parser.add_argument("--daily-capacity", type=int,
+        help="Maximum accounts planned per UTC hour for daily reward claims and training (default: spread evenly with headroom)")
+    parser.add_argument("--validate", action="store_true", help="Check every token against /earn/info before starting and pause expired/forbidden accounts")
+    parser.add_argument("--validate-only", action="store_true", help="Only run the token check, then exit")
+    parser.add_argument("--validate-concurrency", type=int, default=50, help="Concurrent requests during the token check")
+    parser.add_argument("--state-db", help="Use the SQLite state store at this path (import old files with: python state_store.py migrate)")
+    parser.add_argument("--workers", type=int, default=1, help="Shard accounts across this many worker processes")
+    parser.add_argument("--rate-limit", type=float, help="Global limit for API requests per second")
+    parser.add_argument("--ping-rate", type=float, help="Requests per second for /network/ping")
+    parser.add_argument("--earn-rate", type=float, help="Requests per second for /earn/info")
+    parser.add_argument("--reward-rate", type=float, help="Requests per second for /reward/*")
+    parser.add_argument("--ai-rate", type=float, help="Requests per second for /ai/*")
+    parser.add_argument("--proxy-concurrency", type=int, help="Maximum concurrent requests per proxy")
+    parser.add_argument("--quiet", action="store_true", help="Only print errors and state changes to the console")
+    parser.add_argument("--debug", action="store_true", help="Log raw API responses")
+    parser.add_argument("--dashboard", action="store_true", help="Show a live fleet dashboard instead of per-event console lines (events still go to the log file)")
+    parser.add_argument("--dashboard-interval", type=float, default=2, help="Dashboard refresh interval in seconds")
+    parser.add_argument("--log-file", default="aigaea.log", help="Log file path (rotated at 50 MB)")
+    parser.add_argument("--proxy-pool", help="File with spare proxies (one per line) used when an account's proxy is unhealthy")
+    parser.add_argument("--max-accounts-per-proxy", type=int, default=10, help="Maximum accounts failed over to one spare proxy")
+    parser.add_argument("--no-watch", action="store_true", help="Do not reload accounts.csv / paused_accounts.json while running")
+    parser.add_argument("--profile", action="store_true",
+        help="Monitor event loop lag and enable SIGUSR1 (stack sample) / SIGUSR2 (task census, tracemalloc) dumps")
+    parser.add_argument("--profile-dir", default="profiles", help="Directory for profile and state dumps")
+    parser.add_argument("--profile-seconds", type=float, default=30, help="Stack sampling duration after SIGUSR1")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics (workers use PORT+N)")
+
+    # 配置文件中的值作为默认值, 命令行参数优先
+    config_path = parser.parse_known_args(argv)[0].config
+    if config_path:
+        from config import load_config
+        config = load_config(config_path)
+        known = {action.dest for action in parser._actions}
+        unknown = sorted(set(config) - known)
+        if unknown:
+            parser.error(f"Unknown option(s) in {config_path}: {', '.join(unknown)}")
+        if isinstance(config.get('shard'), str):
+            config['shard'] = parse_shard(config['shard'])
+        parser.set_defaults(**config)
+    args = parser.parse_args(argv)
+    if args.dashboard and args.workers > 1:
+        parser.error("--dashboard is not supported with --workers > 1 (the supervisor prints the fleet view)")
+    if args.daemon:
+        args.proxy = args.proxy or "none"
+        args.train = bool(args.train)
+        args.test = bool(args.test)
+    return args
 
 if __name__ == "__main__":
+    args = parse_args()
+    pipeline.start(log_file=args.log_file, quiet=args.quiet, debug=args.debug, console=not args.dashboard)
+    limits = {
+        'global_rate': args.rate_limit,
+        'endpoint_rates': {
+            "/network/ping": args.ping_rate,
+            "/earn/info": args.earn_rate,
+            "/reward/*": args.reward_rate,
+            "/ai/*": args.ai_rate
+        },
+        'proxy_concurrency': args.proxy_concurrency
+    }
+    bot_options = {
+        'state_db': args.state_db,
+        'limits': limits,
+        'metrics_port': args.metrics_port,
+        'spare_proxies': load_proxy_list(args.proxy_pool) if args.proxy_pool else None,
+        'max_accounts_per_proxy': args.max_accounts_per_proxy,
+        'watch': not args.no_watch,
+        'max_initial_delay': args.max_initial_delay,
+        'ramp_rate': args.ramp_rate,
+        'dashboard_interval': args.dashboard_interval if args.dashboard else None,
+        'checkpoint_interval': args.checkpoint_interval,
+        'history_interval': args.history_interval,
+        'daily_capacity': args.daily_capacity,
+        'validate': args.validate,
+        'validate_only': args.validate_only,
+        'validate_concurrency': args.validate_concurrency,
+        'profile': args.profile,
+        'profile_dir': args.profile_dir,
+        'profile_seconds': args.profile_seconds
+    }
+    # 问题已由参数/配置给出时不再交互提问
+    use_proxy = args.proxy == "private" if args.proxy else None
+    trained = args.train if use_proxy is not None else None
+    if use_proxy is not None and trained is None:
+        trained = False
     try:
-        bot = AiGaea()
-        asyncio.run(bot.main())
+        if args.workers > 1:
+            from supervisor import run_supervisor
+            bot = AiGaea(watch=bot_options['watch'])
+            run_supervisor(bot, args.workers, bot_options,
+                logging_options={'log_file': args.log_file, 'quiet': args.quiet, 'debug': args.debug},
+                use_proxy=use_proxy, trained=trained, test_mode=args.test)
+        else:
+            bot = AiGaea(**bot_options, shard=args.shard)
+            asyncio.run(bot.run(use_proxy=use_proxy, trained=trained, test_mode=args.test))
     except KeyboardInterrupt:
+        # 先输出队列中剩余的日志
+        pipeline.stop()
         print(
             f"{Fore.CYAN + Style.BRIGHT}[ {datetime.now().astimezone(wib).strftime('%x %X %Z')} ]{Style.RESET_ALL}"
             f"{Fore.WHITE + Style.BRIGHT} | {Style.RESET_ALL}"
             f"{Fore.RED + Style.BRIGHT}[ EXIT ] AI Gaea - BOT{Style.RESET_ALL}                                       "                              
-        )
\ No newline at end of file
+        )
+    finally:
+        pipeline.stop()
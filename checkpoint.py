@@ -0,0 +1,48 @@
+import asyncio, json, os, time
+import codec
+
+
+class Checkpoint:
+    """定期保存每个账户的下次执行时间和每日任务状态, 重启后据此恢复调度
+
+    collect() 返回 {uid: 账户状态}, 在事件循环中调用; 序列化和写文件在后台线程中完成.
+    文件格式: {"saved_at": 时间戳, "accounts": {uid: {"due": {任务名: 时间戳}, ...}}}
+    """
+
+    def __init__(self, path, collect, interval=60):
+        self.path = path
+        self.collect = collect
+        self.interval = interval
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            # 检查点损坏时按全新启动处理, 不影响运行
+            print(f"Error loading checkpoint {self.path}: {e}")
+            return {}
+        return data.get('accounts', {})
+
+    def _write(self, accounts: dict, saved_at: float):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(codec.dumps({'saved_at': saved_at, 'accounts': accounts}))
+        os.replace(tmp_path, self.path)
+
+    def save(self):
+        """同步写入, 用于退出时保存最后一次状态"""
+        try:
+            self._write(self.collect(), time.time())
+        except Exception as e:
+            print(f"Error writing checkpoint {self.path}: {e}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self._write, self.collect(), time.time())
+            except Exception as e:
+                print(f"Error writing checkpoint {self.path}: {e}")
@@ -0,0 +1,36 @@
+from datetime import datetime
+import time as _time
+import pytz
+
+
+class SystemClock:
+    def time(self):
+        return _time.time()
+
+    def monotonic(self):
+        return _time.monotonic()
+
+
+# 调度相关代码通过本模块读取时间, 模拟模式(simulate.py)替换为虚拟时钟
+current = SystemClock()
+
+
+def install(clock):
+    global current
+    current = clock
+
+
+def time():
+    return current.time()
+
+
+def monotonic():
+    return current.monotonic()
+
+
+def utcnow():
+    return datetime.fromtimestamp(current.time(), pytz.UTC)
+
+
+def utc_date():
+    return utcnow().strftime('%Y-%m-%d')
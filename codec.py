@@ -0,0 +1,45 @@
+from functools import lru_cache
+import json
+
+try:
+    # 可选依赖: 安装 orjson 后编解码更快, 否则使用标准库
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+
+if orjson:
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    def loads(data):
+        # 标准库可以直接解码 bytes, 自动识别 UTF-8/16/32
+        return json.loads(data)
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+
+def decode(body: bytes):
+    """从响应字节直接解码 JSON, 非 UTF-8 的响应按 latin-1 重试, 不需要再次读取响应"""
+    try:
+        return loads(body)
+    except ValueError:
+        try:
+            return loads(body.decode('latin-1'))
+        except ValueError:
+            raise ValueError(f"Response is not JSON: {body[:100].decode('latin-1')}") from None
+
+
+# 内容固定的请求体只序列化一次
+TRAINING_BODY = dumps({"detail": "3_0_1"})
+
+
+@lru_cache(maxsize=64)
+def reward_body(reward_id) -> str:
+    return dumps({"id": reward_id})
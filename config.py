@@ -0,0 +1,37 @@
+import json, os
+
+
+def load_config(path):
+    """读取 TOML / YAML / JSON 配置文件, 返回 {参数名: 值}
+
+    key 与命令行参数同名 (横线或下划线均可), 可以按表/分组书写, 分组名会被忽略.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("PyYAML is required for YAML config files: pip install pyyaml")
+        with open(path, 'r') as f:
+            data = yaml.safe_load(f) or {}
+    elif ext == '.json':
+        with open(path, 'r') as f:
+            data = json.load(f)
+    else:
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    return flatten(data)
+
+
+def flatten(data):
+    options = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            options.update(flatten(value))
+        else:
+            options[key.replace('-', '_')] = value
+    return options
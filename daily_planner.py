@@ -0,0 +1,186 @@
+import math, random, time
+import clock
+
+DAY = 24 * 3600
+HOUR = 3600
+
+
+class DayPlan:
+    """某个 UTC 日某类每日任务的计划: 每小时已分配的账户数, 以及完成/跳过/有风险/错过的账户"""
+
+    __slots__ = ("day", "hours", "slots", "done", "skipped", "at_risk", "missed")
+
+    def __init__(self, day: int):
+        self.day = day
+        self.hours = [0] * 24
+        # uid -> 分配的小时
+        self.slots = {}
+        self.done = set()
+        self.skipped = set()
+        self.at_risk = set()
+        self.missed = set()
+
+    def release(self, uid):
+        hour = self.slots.pop(uid, None)
+        if hour is not None:
+            self.hours[hour] -= 1
+
+
+class DailyPlanner:
+    """全体账户共用的每日任务计划, 按小时容量分散领奖和训练时间
+
+    jobs 为 {任务: 首次尝试的小时窗口}, 例如训练只在 UTC 0~12 点首次尝试; 所有任务的截止时间都是 UTC 24 点.
+    每天最后 reserve 秒只留给重试. 每小时容量默认按账户数平摊到首次尝试窗口, 再留 headroom 余量;
+    在有剩余容量的小时中按剩余容量加权随机选择, 小时内的时间也是随机的.
+    on_risk(uid, job, reason) 在账户可能错过当天任务时调用.
+    """
+
+    def __init__(self, jobs=None, hourly_capacity=None, fleet_size=None, headroom=1.25, reserve=2 * HOUR,
+                 retry_delay=(10 * 60, 60 * 60), margin=5 * 60, on_risk=None):
+        self.jobs = jobs or {"reward": 24, "training": 12}
+        self.hourly_capacity = hourly_capacity
+        self.fleet_size = fleet_size
+        self.headroom = headroom
+        self.reserve = reserve
+        self.retry_delay = retry_delay
+        self.margin = margin
+        self.on_risk = on_risk
+        # job -> {day: DayPlan}
+        self.plans = {job: {} for job in self.jobs}
+
+    def first_hours(self, job):
+        # 首次尝试不使用当天最后 reserve 秒
+        return max(1, min(self.jobs[job], 24 - math.ceil(self.reserve / HOUR)))
+
+    def capacity(self, job):
+        if self.hourly_capacity:
+            return self.hourly_capacity
+        accounts = self.fleet_size() if self.fleet_size else 0
+        return max(1, math.ceil(accounts * self.headroom / self.first_hours(job)))
+
+    def day_plan(self, job, day: int):
+        plans = self.plans[job]
+        plan = plans.get(day)
+        if plan is None:
+            plan = plans[day] = DayPlan(day)
+            # 只保留昨天及以后的计划
+            for old in [old for old in plans if old < day - 1]:
+                del plans[old]
+        return plan
+
+    def assign(self, job, uid, day: int, first_hour: int, last_hour: int, now: float, latest=None):
+        """在 [first_hour, last_hour) 中尚未过去的小时里选一个时间, 没有可用小时返回 None"""
+        plan = self.day_plan(job, day)
+        plan.release(uid)
+        start = day * DAY
+        end = min(start + last_hour * HOUR, latest or math.inf)
+        hours = [hour for hour in range(max(0, first_hour), last_hour)
+                 if start + (hour + 1) * HOUR > now and start + hour * HOUR < end]
+        if not hours:
+            return None
+        capacity = self.capacity(job)
+        free = [hour for hour in hours if plan.hours[hour] < capacity]
+        if free:
+            hour = random.choices(free, [capacity - plan.hours[hour] for hour in free])[0]
+        else:
+            # 所有小时都已满时放入最空的小时
+            hour = min(hours, key=lambda hour: plan.hours[hour])
+        low = max(now, start + hour * HOUR)
+        high = min(start + (hour + 1) * HOUR, end)
+        plan.hours[hour] += 1
+        plan.slots[uid] = hour
+        return random.uniform(low, max(low, high))
+
+    def plan(self, uid, job, now=None):
+        """首次尝试的时间: 今天还没完成时排在今天, 否则排在明天"""
+        now = now or clock.time()
+        day = int(now // DAY)
+        if uid not in self.day_plan(job, day).done:
+            at = self.assign(job, uid, day, 0, self.first_hours(job), now)
+            if at is None:
+                # 首次尝试窗口已过(例如中午后才启动), 在今天剩余时间内尽快执行
+                at = self.assign(job, uid, day, 0, 24, now, latest=(day + 1) * DAY - self.margin)
+            if at is not None:
+                return at
+        return self.assign(job, uid, day + 1, 0, self.first_hours(job), now)
+
+    def retry(self, uid, job, now=None):
+        """失败后的重试时间, 在截止前的剩余时间(包括预留时段)中选择; 来不及时标记为错过并排到明天"""
+        now = now or clock.time()
+        day = int(now // DAY)
+        plan = self.day_plan(job, day)
+        deadline = (day + 1) * DAY - self.margin
+        earliest = now + random.uniform(*self.retry_delay)
+        if earliest >= deadline:
+            earliest = now + self.retry_delay[0]
+        at = None
+        if earliest < deadline:
+            at = self.assign(job, uid, day, int((earliest - day * DAY) // HOUR), 24, earliest, latest=deadline)
+        if at is None:
+            plan.release(uid)
+            plan.at_risk.discard(uid)
+            plan.missed.add(uid)
+            self.report(uid, job, "missed today, planned for tomorrow")
+            return self.assign(job, uid, day + 1, 0, self.first_hours(job), now)
+        if now >= (day + 1) * DAY - self.reserve and uid not in plan.at_risk:
+            # 已进入预留的重试时段仍然失败
+            plan.at_risk.add(uid)
+            self.report(uid, job, f"still failing {(deadline - now) / 60:.0f} min before the deadline")
+        return at
+
+    def complete(self, uid, job, now=None):
+        """记录今天已完成, 返回明天首次尝试的时间"""
+        now = now or clock.time()
+        day = int(now // DAY)
+        plan = self.day_plan(job, day)
+        plan.done.add(uid)
+        plan.at_risk.discard(uid)
+        return self.assign(job, uid, day + 1, 0, self.first_hours(job), now)
+
+    def skip(self, uid, job, now=None):
+        """今天不需要执行(例如积分不足), 不算完成也不算风险, 不占用今天的重试容量, 返回明天首次尝试的时间"""
+        now = now or clock.time()
+        day = int(now // DAY)
+        plan = self.day_plan(job, day)
+        plan.release(uid)
+        plan.at_risk.discard(uid)
+        plan.skipped.add(uid)
+        return self.assign(job, uid, day + 1, 0, self.first_hours(job), now)
+
+    def restore(self, uid, job, at: float):
+        """登记从检查点恢复的执行时间"""
+        day = int(at // DAY)
+        plan = self.day_plan(job, day)
+        plan.release(uid)
+        hour = int((at - day * DAY) // HOUR)
+        plan.hours[hour] += 1
+        plan.slots[uid] = hour
+
+    def discard(self, uid):
+        for plans in self.plans.values():
+            for plan in plans.values():
+                plan.release(uid)
+
+    def report(self, uid, job, reason):
+        if self.on_risk is not None:
+            self.on_risk(uid, job, reason)
+
+    def snapshot(self, now=None):
+        """今天每类任务的每小时计划数和完成情况, 以及明天已排入的账户数"""
+        day = int((now or clock.time()) // DAY)
+        result = {}
+        for job, plans in self.plans.items():
+            plan = plans.get(day) or DayPlan(day)
+            tomorrow = plans.get(day + 1)
+            result[job] = {
+                'day': time.strftime('%Y-%m-%d', time.gmtime(day * DAY)),
+                'capacity': self.capacity(job),
+                'hours': list(plan.hours),
+                'planned': len(plan.slots),
+                'done': len(plan.done),
+                'skipped': len(plan.skipped),
+                'at_risk': len(plan.at_risk),
+                'missed': len(plan.missed),
+                'tomorrow': len(tomorrow.slots) if tomorrow else 0
+            }
+        return result
@@ -0,0 +1,120 @@
+from colorama import Fore, Style
+from metrics import proxy_label
+import asyncio, heapq, re, shutil, sys, time
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class WindowCounter:
+    """最近 window 秒内的计数, 按 resolution 秒分桶, 计数和查询的开销与账户数无关"""
+
+    def __init__(self, window=600, resolution=10):
+        self.resolution = resolution
+        self.buckets = [0] * (int(window // resolution) or 1)
+        self.current = int(time.monotonic() // resolution)
+
+    def advance(self):
+        slot = int(time.monotonic() // self.resolution)
+        if slot != self.current:
+            # 清空从上次计数到现在之间已过期的桶
+            for i in range(self.current + 1, min(slot, self.current + len(self.buckets)) + 1):
+                self.buckets[i % len(self.buckets)] = 0
+            self.current = slot
+
+    def add(self, amount=1):
+        self.advance()
+        self.buckets[self.current % len(self.buckets)] += amount
+
+    def total(self):
+        self.advance()
+        return sum(self.buckets)
+
+
+class Dashboard:
+    """按固定间隔重绘的终端面板, 替代逐条输出的控制台日志
+
+    snapshot 返回的数据全部来自内存中的计数器, 每帧输出的行数固定, 不随账户数增长.
+    """
+
+    def __init__(self, snapshot, interval=2.0, max_proxies=5, stream=None):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.max_proxies = max_proxies
+        self.stream = stream or sys.stdout
+        self.started = time.monotonic()
+
+    def format_duration(self, seconds):
+        hours, remainder = divmod(int(seconds), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+
+    def label(self, text, value, color=Fore.WHITE):
+        return f"{Fore.CYAN + Style.BRIGHT}{text}{Style.RESET_ALL} {color + Style.BRIGHT}{value}{Style.RESET_ALL}"
+
+    def slowest_proxies(self, proxies: dict):
+        return heapq.nlargest(self.max_proxies, proxies.items(), key=lambda item: item[1]['latency'])
+
+    def render(self, data: dict, width=120):
+        states = data['states']
+        lines = [
+            f"{Fore.GREEN + Style.BRIGHT}AI Gaea - BOT{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} | {data['time']} | Uptime {self.format_duration(time.monotonic() - self.started)}{Style.RESET_ALL}",
+            "",
+            "   ".join((
+                self.label("Active:", states['active'], Fore.GREEN),
+                self.label("Starting:", states['starting'], Fore.BLUE),
+                self.label("Paused:", states['paused'], Fore.YELLOW),
+                self.label("Forbidden:", states['forbidden'], Fore.RED)
+            )),
+            "   ".join((
+                self.label("Pings (10m):", data['pings_ok'], Fore.GREEN),
+                self.label("Failed:", data['pings_failed'], Fore.RED if data['pings_failed'] else Fore.WHITE),
+                self.label("Points Today:", data['points_today'])
+            )),
+            "   ".join((
+                self.label("Scheduler Backlog:", data['backlog']),
+                self.label("Proxies:", f"{data['proxies']['healthy']} healthy, {data['proxies']['unhealthy']} unhealthy",
+                    Fore.RED if data['proxies']['unhealthy'] else Fore.WHITE),
+                self.label("Start-up:", f"{data['ramp']['admitted']} started, {data['ramp']['pending']} waiting"
+                    if data['ramp']['running'] else "done")
+            )),
+            "   ".join(
+                self.label(f"Daily {job.capitalize()}:", f"{plan['done']}/{plan['planned']} done, {plan['at_risk']} at risk, {plan['missed']} missed",
+                    Fore.RED if plan['at_risk'] or plan['missed'] else Fore.WHITE)
+                for job, plan in data['daily'].items()
+            ),
+            "",
+            f"{Fore.CYAN + Style.BRIGHT}Slowest Proxies{Style.RESET_ALL}"
+        ]
+        proxies = self.slowest_proxies(data['proxies']['slowest'])
+        if not proxies:
+            lines.append("  -")
+        for proxy, health in proxies:
+            color = Fore.GREEN if health['healthy'] else Fore.RED
+            lines.append(
+                f"  {color + Style.BRIGHT}{proxy_label(proxy):<32}{Style.RESET_ALL}"
+                f"{Fore.WHITE + Style.BRIGHT} {health['latency'] * 1000:>8.0f} ms  errors {health['error_rate']:>4.0%}"
+                f"  accounts {health['accounts']}{Style.RESET_ALL}"
+            )
+        lines += ["", f"{Fore.CYAN + Style.BRIGHT}Recent Errors{Style.RESET_ALL}"]
+        if not data['errors']:
+            lines.append("  -")
+        for created, account, proxy, message in reversed(data['errors']):
+            text = f"  {time.strftime('%X', time.localtime(created))} {account} | {proxy} | {ANSI_ESCAPE.sub('', message)}"
+            lines.append(f"{Fore.RED}{text[:width - 1]}{Style.RESET_ALL}")
+        # 光标回到左上角覆盖上一帧, 清除行尾和屏幕剩余部分, 避免闪烁
+        return "\033[H" + "".join(f"{line}\033[K\n" for line in lines) + "\033[J"
+
+    def draw(self):
+        width = shutil.get_terminal_size().columns
+        self.stream.write(self.render(self.snapshot(), width))
+        self.stream.flush()
+
+    async def run(self):
+        self.stream.write("\033[2J")
+        while True:
+            try:
+                self.draw()
+            except Exception as e:
+                self.stream.write(f"Dashboard error: {e}\n")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,324 @@
+from datetime import datetime
+import argparse, asyncio, csv, glob, mmap, os, struct, sys, threading, time, pytz
+import clock
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# 定长记录: UID 序号, 时间戳(秒), era_gaea, today_gaea, today_uptime
+RECORD = struct.Struct("<IIdff")
+# (层级, 分桶秒数, 默认保留秒数): 超过保留时间的记录按下一层的分桶降采样, 最后一层永久保留
+TIERS = (("raw", None, 2 * DAY), ("hourly", HOUR, 14 * DAY), ("daily", DAY, None))
+
+
+def utc_time(ts):
+    return datetime.fromtimestamp(ts, pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class EarningsHistory:
+    """每个分片一个目录的收益时间序列, 每层一个只追加的定长记录文件, 查询通过 mmap 读取
+
+    record() 只在内存中打包, run() 定期在后台线程追加写入, 每小时把超过保留时间的记录降采样:
+    15 分钟的原始记录 -> 每小时 -> 每天, 每个账户每个分桶只保留最后一条(era_gaea 为累计值, 增长量不受影响).
+    uids.txt 每行为 "序号 UID", 重复写入的行不影响映射.
+    """
+
+    def __init__(self, directory="earnings", interval=60, compact_interval=HOUR, retention=None):
+        self.directory = directory
+        self.interval = interval
+        self.compact_interval = compact_interval
+        self.retention = retention or {name: keep for name, _, keep in TIERS}
+        self.uids = []
+        self.index = {}
+        self.pending = []
+        self.pending_uids = []
+        # 退出时的同步写入可能与被取消的后台写入线程重叠
+        self.lock = threading.Lock()
+        self.last_compact = 0.0
+        if os.path.isdir(directory):
+            self.load_uids()
+            self.repair()
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def load_uids(self):
+        try:
+            with open(os.path.join(self.directory, "uids.txt"), 'r') as f:
+                for line in f:
+                    number, _, uid = line.rstrip("\n").partition(" ")
+                    if not uid:
+                        continue
+                    number = int(number)
+                    if number >= len(self.uids):
+                        self.uids.extend([None] * (number + 1 - len(self.uids)))
+                    self.uids[number] = uid
+                    self.index[uid] = number
+        except FileNotFoundError:
+            pass
+
+    def repair(self):
+        # 写入中断时文件末尾可能留下不完整的记录
+        for name, _, _ in TIERS:
+            path = self.path(name)
+            if os.path.exists(path):
+                size = os.path.getsize(path)
+                if size % RECORD.size:
+                    with open(path, 'r+b') as f:
+                        f.truncate(size - size % RECORD.size)
+
+    # ---- 写入 ----
+
+    def record(self, uid: str, earning: dict, now=None):
+        number = self.index.get(uid)
+        if number is None:
+            number = self.index[uid] = len(self.uids)
+            self.uids.append(uid)
+            self.pending_uids.append(f"{number} {uid}\n")
+        self.pending.append(RECORD.pack(number, int(now or clock.time()), float(earning.get('era_gaea') or 0),
+            float(earning.get('today_gaea') or 0), float(earning.get('today_uptime') or 0)))
+
+    def take(self):
+        records, uids = self.pending, self.pending_uids
+        self.pending, self.pending_uids = [], []
+        return records, uids
+
+    def _append(self, records, uids):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if uids:
+                # 先写 UID 映射, 记录文件中不会出现未知序号
+                with open(os.path.join(self.directory, "uids.txt"), 'a') as f:
+                    f.writelines(uids)
+            if records:
+                with open(self.path("raw"), 'ab') as f:
+                    f.write(b"".join(records))
+
+    def _write(self, records, uids, compact_at=None):
+        self._append(records, uids)
+        if compact_at is not None:
+            self.compact(compact_at)
+
+    def save(self):
+        """同步写入, 用于退出时保存剩余的记录"""
+        records, uids = self.take()
+        try:
+            self._append(records, uids)
+        except Exception as e:
+            print(f"Error writing earnings history {self.directory}: {e}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            records, uids = self.take()
+            now = clock.time()
+            compact_at = None
+            if now - self.last_compact >= self.compact_interval:
+                compact_at = self.last_compact = now
+            try:
+                await asyncio.to_thread(self._write, records, uids, compact_at)
+            except Exception as e:
+                # UID 映射可以重复写入, 下次重试; 记录丢弃
+                self.pending_uids[:0] = uids
+                print(f"Error writing earnings history {self.directory}: {e}")
+
+    def compact(self, now=None):
+        """把每层超过保留时间的记录降采样后追加到下一层, 返回 {层级: 移出的记录数}"""
+        now = now or clock.time()
+        moved = {}
+        with self.lock:
+            for (name, _, _), (next_name, bucket, _) in zip(TIERS, TIERS[1:]):
+                # 截止时间对齐到下一层的分桶, 同一个分桶不会分两次降采样
+                cutoff = int((now - self.retention[name]) // bucket * bucket)
+                moved[name] = self._downsample(name, next_name, bucket, cutoff)
+        return moved
+
+    def _downsample(self, name, next_name, bucket, cutoff):
+        path = self.path(name)
+        if not os.path.exists(path) or os.path.getsize(path) < RECORD.size:
+            return 0
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # 记录按追加顺序基本有序, 过期的记录都在文件开头
+            count = len(data) // RECORD.size
+            cut = 0
+            while cut < count and RECORD.unpack_from(data, cut * RECORD.size)[1] < cutoff:
+                cut += 1
+            if not cut:
+                return 0
+            latest = {}
+            for offset in range(0, cut * RECORD.size, RECORD.size):
+                number, ts = RECORD.unpack_from(data, offset)[:2]
+                latest[(number, ts // bucket)] = data[offset:offset + RECORD.size]
+            rest = data[cut * RECORD.size:count * RECORD.size]
+        # 先追加到下一层再截断本层, 中途中断只会在下一层留下重复的记录
+        with open(self.path(next_name), 'ab') as f:
+            f.write(b"".join(sorted(latest.values(), key=lambda record: RECORD.unpack(record)[1])))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(rest)
+        os.replace(tmp_path, path)
+        return cut
+
+    # ---- 查询 ----
+
+    def _read(self, name):
+        path = self.path(name)
+        if not os.path.exists(path) or os.path.getsize(path) < RECORD.size:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)[:len(data) - len(data) % RECORD.size]
+            records = RECORD.iter_unpack(view)
+            try:
+                yield from records
+            finally:
+                # 释放对 mmap 的引用后才能关闭
+                del records
+                view.release()
+
+    def records(self, uid=None, since=None, until=None):
+        """按时间顺序(先旧层后新层)返回 (UID, 时间戳, era_gaea, today_gaea, today_uptime)"""
+        if uid is not None and uid not in self.index:
+            return
+        number = self.index.get(uid)
+        for name, _, _ in reversed(TIERS):
+            for record in self._read(name):
+                if number is not None and record[0] != number:
+                    continue
+                if since is not None and record[1] < since or until is not None and record[1] >= until:
+                    continue
+                if record[0] < len(self.uids) and self.uids[record[0]] is not None:
+                    yield (self.uids[record[0]],) + record[1:]
+
+
+def open_histories(directories=None):
+    """默认读取当前目录下所有分片的历史(earnings, earnings.shardXofN)"""
+    directories = directories or sorted(glob.glob("earnings")) + sorted(glob.glob("earnings.shard*"))
+    return [EarningsHistory(directory) for directory in directories if os.path.isdir(directory)]
+
+
+def all_records(histories, uid=None, since=None, until=None):
+    for history in histories:
+        yield from history.records(uid, since, until)
+
+
+def growth(histories, since, until=None, bucket=HOUR, uid=None):
+    """每个分桶的积分增长(只计 era_gaea 上升, 训练消耗的积分不抵扣)和上报的账户数, 以及每个账户的增长"""
+    buckets = {}
+    accounts = {}
+    last = {}
+    for account, ts, era, _, _ in all_records(histories, uid, None, until):
+        previous = last.get(account)
+        last[account] = (ts, era)
+        if ts < since:
+            continue
+        slot = ts // bucket * bucket
+        entry = buckets.setdefault(slot, [0.0, set()])
+        entry[1].add(account)
+        if previous is None:
+            continue
+        gained = max(0.0, era - previous[1])
+        entry[0] += gained
+        # [增长量, 第一段增长的起点, 最后一条记录的时间]
+        stats = accounts.setdefault(account, [0.0, previous[0], ts])
+        stats[0] += gained
+        stats[2] = ts
+    return buckets, accounts
+
+
+def stalled(histories, hours: float, now=None):
+    """最近 hours 小时内 era_gaea 没有上升的账户: (UID, 当前积分, 最后一次上升的时间, 最后一条记录的时间)"""
+    now = now or time.time()
+    state = {}
+    for account, ts, era, _, _ in all_records(histories):
+        entry = state.get(account)
+        if entry is None:
+            state[account] = [era, ts, ts, ts]
+            continue
+        if era > entry[0]:
+            entry[1] = ts
+        entry[0] = era
+        entry[3] = ts
+    window = hours * HOUR
+    result = []
+    for account, (era, grown_at, first_at, last_at) in state.items():
+        # 记录覆盖的时间不足 hours 小时的新账户不判断
+        if now - grown_at >= window and now - first_at >= window:
+            result.append((account, era, grown_at, last_at))
+    return sorted(result, key=lambda item: item[2])
+
+
+def parse_time(text):
+    if text is None:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return pytz.UTC.localize(datetime.strptime(text, fmt)).timestamp()
+        except ValueError:
+            pass
+    raise SystemExit(f"Invalid time {text!r}, expected YYYY-MM-DD or 'YYYY-MM-DD HH:MM'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the AiGaea earnings history")
+    parser.add_argument("--dir", nargs="+", help="History directories (default: earnings and earnings.shard* in the current directory)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rates = sub.add_parser("rates", help="Fleet (or one account's) points gained per hour/day")
+    rates.add_argument("--uid", help="Only this account")
+    rates.add_argument("--hours", type=float, default=24, help="Look back this many hours")
+    rates.add_argument("--bucket", choices=["hour", "day"], default="hour")
+    rates.add_argument("--per-account", action="store_true", help="Print points/hour per account instead, slowest first")
+    stall = sub.add_parser("stalled", help="Accounts whose points have not grown")
+    stall.add_argument("--hours", type=float, default=6, help="No growth for at least this many hours")
+    export = sub.add_parser("export", help="Export records as CSV")
+    export.add_argument("--uid", help="Only this account")
+    export.add_argument("--since", help="YYYY-MM-DD or 'YYYY-MM-DD HH:MM' (UTC)")
+    export.add_argument("--until", help="YYYY-MM-DD or 'YYYY-MM-DD HH:MM' (UTC)")
+    export.add_argument("--output", help="CSV file (default: stdout)")
+    sub.add_parser("compact", help="Downsample old records now, only while the bot is stopped (it does this every hour itself)")
+    args = parser.parse_args()
+
+    histories = open_histories(args.dir)
+    if not histories:
+        raise SystemExit("No earnings history found")
+
+    if args.command == "rates":
+        now = time.time()
+        since = now - args.hours * HOUR
+        bucket = DAY if args.bucket == "day" else HOUR
+        buckets, accounts = growth(histories, since, bucket=bucket, uid=args.uid)
+        if args.per_account:
+            print("uid,points,hours,points_per_hour")
+            for account, (gained, first, last) in sorted(accounts.items(), key=lambda item: item[1][0] / max(HOUR, item[1][2] - item[1][1])):
+                hours = max(1.0, last - first) / HOUR
+                print(f"{account},{gained:.0f},{hours:.1f},{gained / hours:.1f}")
+            return
+        print(f"{'Period (UTC)':<20} {'Accounts':>9} {'Points':>12} {'Points/h':>10}")
+        for slot in sorted(buckets):
+            gained, reporting = buckets[slot]
+            print(f"{utc_time(slot)[:16]:<20} {len(reporting):>9} {gained:>12.0f} {gained * HOUR / bucket:>10.1f}")
+        total = sum(gained for gained, _ in buckets.values())
+        print(f"Total {total:.0f} points in {args.hours:.0f}h ({total / args.hours:.1f}/h) from {len(accounts)} accounts")
+    elif args.command == "stalled":
+        result = stalled(histories, args.hours)
+        print("uid,era_gaea,last_growth_utc,last_sample_utc")
+        for account, era, grown_at, last_at in result:
+            print(f"{account},{era:.0f},{utc_time(grown_at)},{utc_time(last_at)}")
+        print(f"{len(result)} accounts without growth for {args.hours:g}h", file=sys.stderr)
+    elif args.command == "export":
+        f = open(args.output, 'w', newline='') if args.output else sys.stdout
+        try:
+            writer = csv.writer(f)
+            writer.writerow(["uid", "time_utc", "era_gaea", "today_gaea", "today_uptime"])
+            for account, ts, era, today, uptime in all_records(histories, args.uid, parse_time(args.since), parse_time(args.until)):
+                writer.writerow([account, utc_time(ts), f"{era:g}", f"{today:g}", f"{uptime:g}"])
+        finally:
+            if args.output:
+                f.close()
+    else:
+        for history in histories:
+            moved = history.compact(time.time())
+            print(f"{history.directory}: " + ", ".join(f"{count} {name} records downsampled" for name, count in moved.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import asyncio, os
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileWatcher:
+    """按 mtime/大小轮询文件, 变化后调用对应的回调
+
+    只依赖 os.stat, 不需要 inotify, 在 Windows 和网络文件系统上同样可用.
+    """
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.watched = {}
+
+    def watch(self, path, callback):
+        signature = file_signature(path)
+        # [回调, 已处理的签名, 上次看到的签名]
+        self.watched[path] = [callback, signature, signature]
+
+    def check(self):
+        changed = []
+        for path, entry in self.watched.items():
+            signature = file_signature(path)
+            if signature != entry[2]:
+                # 文件可能还在写入, 等下一次检查时签名不变再处理
+                entry[2] = signature
+            elif signature != entry[1]:
+                entry[1] = signature
+                changed.append((path, entry[0]))
+        return changed
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for path, callback in self.check():
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Error reloading {path}: {e}")
@@ -0,0 +1,130 @@
+import asyncio, copy, json, os
+
+
+class Journal:
+    """追加写日志 + 定期压缩为 JSON 快照
+
+    快照文件与原来的 paused_accounts.json / training_records.json 格式一致,
+    启动时先读取快照(兼容旧文件), 再重放 journal 中的增量记录.
+    """
+
+    def __init__(self, snapshot_path, journal_path=None, flush_interval=1.0, compact_every=1000, prune=None, indent=4,
+                 import_path=None, import_filter=None):
+        self.snapshot_path = snapshot_path
+        # 快照不存在时从 import_path (一个或多个文件) 导入 import_filter 接受的顶层记录
+        self.import_path = import_path
+        self.import_filter = import_filter
+        self.journal_path = journal_path or f"{snapshot_path}.journal"
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.prune = prune
+        self.indent = indent
+        self.data = {}
+        self.pending = []
+        self.journal_entries = 0
+        self._lock = None
+
+    def load(self):
+        data = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                data = json.load(f)
+        elif self.import_path:
+            paths = [self.import_path] if isinstance(self.import_path, str) else self.import_path
+            for path in paths:
+                if os.path.exists(path) or os.path.exists(f"{path}.journal"):
+                    imported = Journal(path).load()
+                    data.update((key, value) for key, value in imported.items() if self.import_filter(key))
+        self.data = data
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 崩溃时最后一行可能不完整
+                        break
+                    self._apply(entry)
+                    self.journal_entries += 1
+        if self.prune:
+            self.prune(self.data)
+        return self.data
+
+    def _apply(self, entry):
+        *parents, key = entry['path']
+        node = self.data
+        for part in parents:
+            node = node.setdefault(part, {})
+        if entry['op'] == 'set':
+            node[key] = entry['value']
+        else:
+            node.pop(key, None)
+
+    def _append(self, entry):
+        self._apply(entry)
+        self.pending.append(json.dumps(entry, separators=(',', ':')))
+
+    def set(self, path, value):
+        self._append({'op': 'set', 'path': list(path), 'value': value})
+
+    def delete(self, path):
+        self._append({'op': 'del', 'path': list(path)})
+
+    def _write(self, lines):
+        with open(self.journal_path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_snapshot(self, data):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=self.indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # 快照落盘后再清空 journal, 中途崩溃时重放是幂等的
+        with open(self.journal_path, 'w') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _take_pending(self):
+        lines, self.pending = self.pending, []
+        self.journal_entries += len(lines)
+        return lines
+
+    def _take_snapshot(self):
+        if self.prune:
+            self.prune(self.data)
+        self.journal_entries = 0
+        return copy.deepcopy(self.data)
+
+    def flush(self, compact=False):
+        """同步写入, 用于没有事件循环的场景"""
+        lines = self._take_pending()
+        if lines:
+            self._write(lines)
+        if compact or self.journal_entries >= self.compact_every:
+            self._write_snapshot(self._take_snapshot())
+
+    async def flush_async(self, compact=False):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            lines = self._take_pending()
+            if lines:
+                await asyncio.to_thread(self._write, lines)
+            if compact or self.journal_entries >= self.compact_every:
+                await asyncio.to_thread(self._write_snapshot, self._take_snapshot())
+
+    async def run(self):
+        # 按固定间隔批量写入并 fsync
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                print(f"Error writing journal {self.journal_path}: {e}")
+
+    async def close(self):
+        await self.flush_async(compact=bool(self.pending or self.journal_entries))
@@ -0,0 +1,161 @@
+from logging.handlers import QueueHandler, RotatingFileHandler
+from datetime import datetime
+import json, logging, queue, sys, threading, pytz
+
+wib = pytz.timezone('Asia/Jakarta')
+
+logger = logging.getLogger("aigaea")
+
+# 结构化事件字段, 写入日志文件时附加在消息后面
+EVENT_FIELDS = ("event", "account", "proxy", "error")
+
+
+class SecondCache:
+    """同一秒内复用已格式化的时间字符串"""
+
+    def __init__(self, fmt, tz=None):
+        self.fmt = fmt
+        self.tz = tz
+        self.second = None
+        self.text = ""
+
+    def __call__(self, timestamp):
+        second = int(timestamp)
+        if second != self.second:
+            value = datetime.fromtimestamp(second, self.tz)
+            self.text = value.strftime(self.fmt)
+            self.second = second
+        return self.text
+
+
+class FileFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - %(message)s')
+        self.cached_time = SecondCache('%Y-%m-%d %H:%M:%S')
+
+    def formatTime(self, record, datefmt=None):
+        return f"{self.cached_time(record.created)},{int(record.msecs):03d}"
+
+    def format(self, record):
+        text = super().format(record)
+        fields = {name: getattr(record, name) for name in EVENT_FIELDS if getattr(record, name, None) is not None}
+        if fields:
+            text = f"{text} {json.dumps(fields, ensure_ascii=False)}"
+        return text
+
+
+class BatchFileHandler(RotatingFileHandler):
+    """一次写入整批日志, 按大小轮转"""
+
+    def emit_batch(self, records):
+        lines = "".join(self.format(record) + self.terminator for record in records)
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes and self.stream.tell() + len(lines) >= self.maxBytes:
+            self.doRollover()
+        self.stream.write(lines)
+        self.stream.flush()
+
+
+class LogPipeline:
+    """非阻塞日志: 事件循环只把记录放入队列, 后台线程批量写控制台和日志文件
+
+    quiet 模式下控制台只输出错误和状态变化(带 event 的记录), 日志文件仍记录全部事件.
+    console=False 时(终端面板模式)控制台不输出任何记录.
+    """
+
+    def __init__(self):
+        self.queue = None
+        self.thread = None
+        self.file_handler = None
+        self.quiet = False
+        self.debug = False
+        self.console = True
+        self.batch_size = 512
+        self.console_time = SecondCache('%x %X %Z', wib)
+
+    def start(self, log_file='aigaea.log', quiet=False, debug=False, console=True, max_bytes=50 * 1024 * 1024, backup_count=5):
+        self.quiet = quiet
+        self.debug = debug
+        self.console = console
+        self.queue = queue.SimpleQueue()
+        self.file_handler = BatchFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.file_handler.setFormatter(FileFormatter())
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(QueueHandler(self.queue))
+        root.setLevel(logging.DEBUG if debug else logging.INFO)
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+        self.thread = None
+        self.file_handler.close()
+
+    def show(self, level, event=None):
+        """控制台是否会输出该记录, 不输出时调用方可以跳过彩色格式化"""
+        if not self.console:
+            return False
+        return not self.quiet or level >= logging.WARNING or event is not None
+
+    def timestamp(self, created):
+        return self.console_time(created)
+
+    def emit(self, level, message, console=None, end="\n", to_file=True, **fields):
+        """console 为控制台显示的彩色文本, to_file=False 时只输出到控制台"""
+        if level < logging.INFO and not logger.isEnabledFor(level):
+            return
+        if not self.show(level, fields.get('event')):
+            console = None
+            if not to_file:
+                return
+        if self.queue is None:
+            # 未启动后台线程时直接同步输出
+            if console is not None:
+                print(console, end=end, flush=True)
+            if to_file:
+                logger.log(level, message, extra=fields)
+            return
+        record = logging.LogRecord(logger.name, level, __file__, 0, message, None, None)
+        record.console = console
+        record.console_end = end
+        record.to_file = to_file
+        record.__dict__.update(fields)
+        self.queue.put(record)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None or None in batch:
+                stopping = True
+                batch = [record for record in batch if record is not None]
+            try:
+                self._write(batch)
+            except Exception as e:
+                sys.stderr.write(f"Log writer error: {e}\n")
+
+    def _write(self, batch):
+        console = "".join(
+            f"{record.console}{record.console_end}" for record in batch
+            if getattr(record, 'console', None) is not None
+        )
+        if console:
+            sys.stdout.write(console)
+            sys.stdout.flush()
+        records = [record for record in batch if getattr(record, 'to_file', True)]
+        if records:
+            self.file_handler.emit_batch(records)
+
+
+pipeline = LogPipeline()
@@ -0,0 +1,197 @@
+from urllib.parse import urlsplit
+from functools import lru_cache
+import asyncio, bisect
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PARSE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+LATENESS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+@lru_cache(maxsize=None)
+def proxy_label(proxy):
+    # 标签中只保留代理的主机和端口, 不暴露账号密码
+    if not proxy:
+        return "none"
+    parts = urlsplit(proxy)
+    return f"{parts.hostname}:{parts.port}" if parts.port else (parts.hostname or proxy)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Gauge:
+    """值在抓取时由 collect() 计算, 返回 {标签值元组: 数值}"""
+
+    def __init__(self, name, help, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+        self.values = {}
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        values = self.collect() if self.collect else self.values
+        for labels, value in values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # 标签值元组 -> [每个桶的计数..., 超出最大桶的计数, 总和]
+        self.values = {}
+
+    def observe(self, value, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def merged(self, **match):
+        """合并标签值匹配的所有序列, 未指定的标签不限制"""
+        index = [(self.labels.index(name), value) for name, value in match.items()]
+        total = [0] * (len(self.buckets) + 1) + [0.0]
+        for labels, series in self.values.items():
+            if all(labels[i] == value for i, value in index):
+                total = [a + b for a, b in zip(total, series)]
+        return total
+
+    def quantile(self, q: float, **match):
+        """按桶线性插值估算分位数, 与 PromQL histogram_quantile 相同"""
+        series = self.merged(**match)
+        rank = q * sum(series[:-1])
+        if not rank:
+            return None
+        cumulative, lower = 0, 0.0
+        for bound, count in zip(self.buckets, series):
+            if count and cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+    def ratio_below(self, bound: float, **match):
+        """不超过 bound 的观测值占比, bound 取不大于它的最近一个桶边界"""
+        series = self.merged(**match)
+        total = sum(series[:-1])
+        if not total:
+            return None
+        return sum(series[:bisect.bisect_right(self.buckets, bound)]) / total
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        names = (*self.labels, "le")
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                yield f"{self.name}_bucket{format_labels(names, (*labels, bound))} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, labels)} {series[-1]}"
+            yield f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}"
+
+
+class Metrics:
+    """进程内指标, 由请求层和任务直接更新, 以 Prometheus 文本格式输出"""
+
+    def __init__(self):
+        self.metrics = []
+        self.request_latency = self.add(Histogram("aigaea_request_duration_seconds",
+            "API request latency per attempt", ("endpoint", "outcome")))
+        self.parse_time = self.add(Histogram("aigaea_response_parse_seconds",
+            "Time spent reading and decoding API responses", ("endpoint",), PARSE_BUCKETS))
+        self.retries = self.add(Counter("aigaea_request_retries_total", "Retried API requests", ("endpoint", "error")))
+        self.failures = self.add(Counter("aigaea_request_failures_total", "API requests that failed after retries", ("endpoint", "error")))
+        self.pings = self.add(Counter("aigaea_pings_total", "Pings sent per proxy", ("proxy", "result")))
+        self.add(Gauge("aigaea_ping_success_ratio", "Ping success ratio per proxy", ("proxy",), self.ping_ratios))
+        self.loop_lag = self.add(Gauge("aigaea_event_loop_lag_seconds", "Event loop scheduling delay"))
+        self.job_lateness = self.add(Histogram("aigaea_job_lateness_seconds",
+            "Delay between a scheduled job's due time and its start", ("job",), LATENESS_BUCKETS))
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, collect, labels=()):
+        return self.add(Gauge(name, help, labels, collect))
+
+    def ping_ratios(self):
+        totals = {}
+        for (proxy, result), count in self.pings.values.items():
+            ok, total = totals.get(proxy, (0, 0))
+            totals[proxy] = (ok + (count if result == "ok" else 0), total + count)
+        return {(proxy,): ok / total for proxy, (ok, total) in totals.items() if total}
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def measure_loop_lag(self, interval=1.0):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.set(max(0.0, loop.time() - start - interval))
+
+
+class MetricsServer:
+    """本地 HTTP 服务, GET /metrics 返回 Prometheus 文本格式"""
+
+    def __init__(self, metrics: Metrics, port: int, host="127.0.0.1"):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.runner = None
+
+    async def handle(self, request):
+        from aiohttp import web
+        return web.Response(text=self.metrics.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        # aiohttp.web 只在启用指标服务时导入
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,116 @@
+from aiohttp import web
+from collections import Counter
+import argparse, asyncio, json, random, zlib
+
+# (方法, 路径, 成功时的 data), simulate.py 的模拟传输层使用同样的响应
+ROUTES = [
+    ("GET", "/api/earn/info", {'era_gaea': 3000, 'today_gaea': 12, 'today_uptime': 90}),
+    ("POST", "/api/network/ping", {'score': 77}),
+    ("GET", "/api/reward/daily-list", {'today': 0, 'list': [{'daily': 1, 'reward': False}]}),
+    ("POST", "/api/reward/daily-complete", {'soul': 1, 'core': 2, 'blindbox': 0}),
+    ("GET", "/api/ai/list", {'soul': 5}),
+    ("POST", "/api/ai/complete", {'burned_points': 2500, 'soul': 3, 'blindbox': 1})
+]
+
+
+class MockApi:
+    """本地模拟的 AiGaea API, 用于压测和离线调试
+
+    latency/jitter 为每个请求的基础延迟和随机附加延迟(秒), error_rate 为返回 502 的概率.
+    expired_rate/forbidden_rate 按 Token 哈希固定选中一部分账户, 这些账户的所有请求返回 401/403.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.05, error_rate=0.0, expired_rate=0.0, forbidden_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.expired_rate = expired_rate
+        self.forbidden_rate = forbidden_rate
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.responses = Counter()
+        self.runner = None
+
+    def app(self):
+        app = web.Application()
+        for method, path, data in ROUTES:
+            app.router.add_route(method, path, self.handler(path, data))
+        return app
+
+    def injected_status(self, token: str):
+        # 同一 Token 的结果固定, 模拟真实的过期/封禁账户
+        point = zlib.crc32(token.encode()) % 10000 / 10000
+        if point < self.expired_rate:
+            return 401
+        if point < self.expired_rate + self.forbidden_rate:
+            return 403
+        if self.error_rate and self.random.random() < self.error_rate:
+            return 502
+        return None
+
+    def handler(self, path: str, data: dict):
+        async def handle(request):
+            self.requests[path] += 1
+            await request.read()
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            status = self.injected_status(token)
+            self.responses[status or 200] += 1
+            if status:
+                return web.json_response({'success': False, 'code': status, 'msg': 'injected'}, status=status)
+            return web.json_response({'success': True, 'code': 200, 'msg': 'ok', 'data': data})
+        return handle
+
+    async def start(self, host="127.0.0.1", port=8766):
+        self.runner = web.AppRunner(self.app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def snapshot(self):
+        return {'requests': dict(self.requests), 'responses': {str(status): count for status, count in self.responses.items()}}
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.05, help="Base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Extra random latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 502")
+    parser.add_argument("--expired-rate", type=float, default=0.0, help="Fraction of accounts whose token returns 401")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0, help="Fraction of accounts that return 403")
+
+
+def from_args(args):
+    return MockApi(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        expired_rate=args.expired_rate, forbidden_rate=args.forbidden_rate)
+
+
+async def serve(api: MockApi, host: str, port: int):
+    await api.start(host, port)
+    print(f"Mock AiGaea API on http://{host}:{port}/api (run the bot with AIGAEA_API_BASE=http://{host}:{port}/api)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+        print(json.dumps(api.snapshot()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the AiGaea API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    add_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(from_args(args), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+from collections import Counter, deque
+import asyncio, os, signal, sys, threading, time, tracemalloc
+
+
+# 只统计本项目中的协程, 标准库/第三方库的协程不作为任务的分类
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def awaitable_name(obj):
+    code = getattr(obj, "cr_code", None) or getattr(obj, "gi_code", None)
+    if code is not None:
+        return getattr(obj, "__qualname__", code.co_name), code.co_filename.startswith(SOURCE_DIR)
+    return type(obj).__name__, False
+
+
+def await_chain(task):
+    """任务当前等待的协程链 [(名称, 是否为本项目代码)], 例如 Scheduler._worker -> AiGaea.process_send_ping -> ..."""
+    chain = []
+    obj = task.get_coro()
+    while obj is not None and len(chain) < 32:
+        chain.append(awaitable_name(obj))
+        obj = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None)
+    return chain
+
+
+def task_census(unwrap=()):
+    """按协程名统计当前所有任务; unwrap 中的外层协程(worker/包装函数)按其正在执行的本项目协程计数, 空闲时按自身计数"""
+    census = Counter()
+    for task in asyncio.all_tasks():
+        chain = await_chain(task)
+        index = 0
+        while index + 1 < len(chain) and chain[index][0] in unwrap and chain[index + 1][1]:
+            index += 1
+        census[chain[index][0] if chain else repr(task)] += 1
+    return census
+
+
+class LagMonitor:
+    """定期测量事件循环调度延迟, 保留最近的样本, 超过阈值时回调 on_lag(seconds)"""
+
+    def __init__(self, interval=0.25, window=240, threshold=0.5, on_lag=None, gauge=None):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.threshold = threshold
+        self.on_lag = on_lag
+        self.gauge = gauge
+        self.max = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.samples.append(lag)
+            self.max = max(self.max, lag)
+            if self.gauge is not None:
+                self.gauge.set(lag)
+            if lag >= self.threshold and self.on_lag is not None:
+                self.on_lag(lag)
+
+    def snapshot(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {'p50': None, 'p99': None, 'max': None}
+        return {'p50': samples[len(samples) // 2], 'p99': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+                'max': self.max}
+
+
+class StackSampler:
+    """后台线程按固定间隔采样事件循环线程的调用栈, 结果为折叠栈计数(flamegraph.pl / speedscope 可直接读取)"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration: float, on_done):
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = threading.Thread(target=self._run, args=(duration, on_done), name="stack-sampler", daemon=True)
+        self.thread.start()
+
+    def _run(self, duration, on_done):
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            del frame
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+        on_done(self)
+
+    def top(self, limit=10):
+        """按采样数排序的叶子函数(自身耗时)"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+
+class Profiler:
+    """信号触发的诊断输出, 默认关闭, 启用后只有循环延迟监控常驻
+
+    SIGUSR1: 采样 duration 秒调用栈, 写入折叠栈文件并输出最耗时的函数.
+    SIGUSR2: 输出按协程名统计的任务数和循环延迟; 第一次同时启动 tracemalloc, 之后每次输出内存分配最多的代码行.
+    report(message, event) 用于输出摘要, 完整结果写入 output_dir.
+    """
+
+    def __init__(self, report, output_dir="profiles", duration=30, unwrap=(), lag_threshold=0.5, gauge=None):
+        self.report = report
+        self.output_dir = output_dir
+        self.duration = duration
+        self.unwrap = unwrap
+        self.lag = LagMonitor(threshold=lag_threshold, on_lag=self.report_lag, gauge=gauge)
+        self.sampler = None
+        self.loop = None
+        self.memory_baseline = None
+        self.last_lag_report = 0.0
+
+    def install(self):
+        """在事件循环线程中注册信号处理, 不支持的平台返回 False"""
+        self.loop = asyncio.get_running_loop()
+        self.sampler = StackSampler(threading.get_ident())
+        if not hasattr(signal, "SIGUSR1"):
+            return False
+        self.loop.add_signal_handler(signal.SIGUSR1, self.start_sampling)
+        self.loop.add_signal_handler(signal.SIGUSR2, self.dump_state)
+        return True
+
+    def uninstall(self):
+        if self.loop is not None and hasattr(signal, "SIGUSR1"):
+            self.loop.remove_signal_handler(signal.SIGUSR1)
+            self.loop.remove_signal_handler(signal.SIGUSR2)
+
+    def output_path(self, kind):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{kind}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+
+    def report_lag(self, lag):
+        # 持续卡顿时最多每 10 秒输出一次
+        now = time.monotonic()
+        if now - self.last_lag_report >= 10:
+            self.last_lag_report = now
+            self.report(f"Event loop lag {lag * 1000:.0f} ms", "loop_lag")
+
+    def start_sampling(self):
+        if self.sampler.running:
+            self.report("Stack sampling already running", "profile")
+            return
+        self.report(f"Sampling stacks for {self.duration:.0f}s", "profile")
+        self.sampler.start(self.duration, lambda sampler: self.loop.call_soon_threadsafe(self.finish_sampling, sampler))
+
+    def finish_sampling(self, sampler: StackSampler):
+        path = self.output_path("profile")
+        with open(path, 'w') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+        top = ", ".join(f"{name} {count / sampler.samples:.0%}" for name, count in sampler.top(5)) if sampler.samples else "-"
+        self.report(f"Profile: {sampler.samples} samples written to {path} - Top: {top}", "profile")
+
+    def dump_state(self):
+        census = task_census(self.unwrap)
+        lag = self.lag.snapshot()
+        lines = [f"tasks {sum(census.values())}"]
+        lines += [f"  {count:>8} {name}" for name, count in census.most_common()]
+        lines.append("loop lag " + " ".join(
+            f"{key} {value * 1000:.1f} ms" if value is not None else f"{key} -" for key, value in lag.items()))
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.memory_baseline = tracemalloc.take_snapshot()
+            lines.append("tracemalloc started, send SIGUSR2 again for top allocations")
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            lines.append("top allocations (size, growth since tracemalloc started)")
+            for stat in snapshot.compare_to(self.memory_baseline, 'lineno')[:20]:
+                lines.append(f"  {stat.size / 1024:>10.1f} KB {stat.size_diff / 1024:>+10.1f} KB  {stat.traceback}")
+        path = self.output_path("state")
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        busiest = ", ".join(f"{name} {count}" for name, count in census.most_common(5))
+        self.report(f"Tasks: {sum(census.values())} ({busiest}) - details in {path}", "profile")
@@ -0,0 +1,168 @@
+from aiohttp import ClientTimeout
+import asyncio, heapq
+import clock
+
+
+class ProxyHealth:
+    __slots__ = ("latency", "error_rate", "samples", "healthy", "last_probe")
+
+    def __init__(self):
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.samples = 0
+        self.healthy = True
+        self.last_probe = 0.0
+
+
+class ProxyPool:
+    """代理健康检查和故障转移
+
+    请求层和后台探测都会更新每个代理的 EWMA 延迟和错误率. 账户当前代理不健康时,
+    切换到负载未满且得分最好的健康代理(优先原代理, 其次备用池). 代理正常时分配保持不变.
+    """
+
+    def __init__(self, session_pool, spares=(), max_accounts=10, alpha=0.3, error_threshold=0.5,
+                 latency_threshold=10.0, min_samples=3, probe_url="https://api.aigaea.net/", probe_interval=60,
+                 probe_timeout=10, probe_concurrency=50, on_failover=None, slowest_count=5):
+        self.session_pool = session_pool
+        self.spares = list(dict.fromkeys(spares))
+        self.max_accounts = max_accounts
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.latency_threshold = latency_threshold
+        self.min_samples = min_samples
+        self.probe_url = probe_url
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.probe_concurrency = probe_concurrency
+        self.on_failover = on_failover
+        self.health = {proxy: ProxyHealth() for proxy in self.spares}
+        # 不健康代理数随状态变化增减; 延迟最高的代理每轮探测后排一次, 终端面板只读取这两项
+        self.unhealthy = 0
+        self.slowest_count = slowest_count
+        self.slowest = []
+        self.primary = {}
+        self.assigned = {}
+        self.load = {}
+
+    def register(self, uid: str, proxy):
+        """登记账户在 CSV 中的代理, 已切换到备用代理的账户保持当前分配"""
+        if not proxy:
+            self.unregister(uid)
+            return
+        previous = self.primary.get(uid)
+        self.primary[uid] = proxy
+        self.health.setdefault(proxy, ProxyHealth())
+        if self.assigned.get(uid) in (None, previous):
+            self._assign(uid, proxy)
+
+    def unregister(self, uid: str):
+        self.primary.pop(uid, None)
+        proxy = self.assigned.pop(uid, None)
+        if proxy:
+            self.load[proxy] -= 1
+
+    def _assign(self, uid, proxy):
+        previous = self.assigned.get(uid)
+        if previous:
+            self.load[previous] -= 1
+        self.assigned[uid] = proxy
+        self.load[proxy] = self.load.get(proxy, 0) + 1
+
+    def score(self, proxy):
+        health = self.health[proxy]
+        # 错误率权重远大于延迟
+        return health.error_rate * self.latency_threshold * 10 + health.latency
+
+    def current(self, uid: str):
+        """返回账户本次请求应使用的代理, 当前代理不健康时尝试故障转移"""
+        proxy = self.assigned.get(uid)
+        if proxy is None or self.health[proxy].healthy:
+            return proxy
+        primary = self.primary[uid]
+        candidates = [primary] if primary != proxy else []
+        candidates += [spare for spare in self.spares if spare != proxy]
+        candidates = [
+            candidate for candidate in candidates
+            if self.health[candidate].healthy and (candidate == primary or self.load.get(candidate, 0) < self.max_accounts)
+        ]
+        if not candidates:
+            # 没有可用的健康代理时继续使用当前代理
+            return proxy
+        replacement = min(candidates, key=lambda candidate: (candidate != primary, self.score(candidate)))
+        self._assign(uid, replacement)
+        if self.on_failover:
+            self.on_failover(uid, proxy, replacement)
+        return replacement
+
+    def record(self, proxy, latency: float, ok: bool):
+        health = self.health.get(proxy)
+        if health is None:
+            return
+        if health.samples == 0:
+            health.latency = latency
+        else:
+            health.latency += self.alpha * (latency - health.latency)
+        health.error_rate += self.alpha * ((0.0 if ok else 1.0) - health.error_rate)
+        health.samples += 1
+        if health.samples < self.min_samples:
+            return
+        healthy = health.healthy
+        if health.healthy:
+            health.healthy = health.error_rate < self.error_threshold and health.latency < self.latency_threshold
+        else:
+            # 恢复时使用更严格的阈值, 避免在临界值附近反复切换
+            health.healthy = health.error_rate < self.error_threshold / 2 and health.latency < self.latency_threshold / 2
+        if health.healthy != healthy:
+            self.unhealthy += -1 if health.healthy else 1
+
+    async def probe(self, proxy):
+        start = clock.monotonic()
+        try:
+            async with self.session_pool.session(proxy) as session:
+                async with session.get(self.probe_url, timeout=ClientTimeout(total=self.probe_timeout)) as response:
+                    # 任何 HTTP 响应都说明代理可用
+                    await response.read()
+            ok = True
+        except Exception:
+            ok = False
+        self.health[proxy].last_probe = clock.time()
+        self.record(proxy, clock.monotonic() - start, ok)
+
+    async def run(self):
+        semaphore = asyncio.Semaphore(self.probe_concurrency)
+
+        async def probe(proxy):
+            async with semaphore:
+                await self.probe(proxy)
+
+        while True:
+            # 只探测正在使用的代理和备用池
+            proxies = set(self.spares) | {proxy for proxy, load in self.load.items() if load} | set(self.primary.values())
+            await asyncio.gather(*(probe(proxy) for proxy in proxies))
+            self.slowest = heapq.nlargest(self.slowest_count, proxies, key=lambda proxy: self.health[proxy].latency)
+            await asyncio.sleep(self.probe_interval)
+
+    def snapshot(self):
+        return {
+            proxy: {'healthy': health.healthy, 'latency': health.latency, 'error_rate': health.error_rate,
+                    'accounts': self.load.get(proxy, 0)}
+            for proxy, health in self.health.items()
+        }
+
+    def summary(self):
+        """代理状态计数和最近一轮探测中最慢的代理, 开销与代理数无关"""
+        return {
+            'healthy': len(self.health) - self.unhealthy,
+            'unhealthy': self.unhealthy,
+            'slowest': {
+                proxy: {'healthy': self.health[proxy].healthy, 'latency': self.health[proxy].latency,
+                        'error_rate': self.health[proxy].error_rate, 'accounts': self.load.get(proxy, 0)}
+                for proxy in self.slowest
+            }
+        }
+
+
+def load_proxy_list(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
@@ -0,0 +1,165 @@
+import random
+import clock
+
+# 账户激活后立即发出的请求: /earn/info 和 /network/ping
+ACTIVATION_REQUESTS = 2
+
+
+def plain_rate(rate):
+    # 限速配置可以是每秒请求数或 (每秒请求数, 突发量)
+    return rate[0] if isinstance(rate, (tuple, list)) else rate
+
+
+def admission_limit(limits, share=0.5):
+    """按限速配置计算每秒最多激活的账户数, 只占用 share 比例的额度, 其余留给已运行的账户"""
+    if not limits:
+        return None
+    rates = []
+    global_rate = plain_rate(limits.get('global_rate'))
+    if global_rate:
+        rates.append(global_rate * share / ACTIVATION_REQUESTS)
+    endpoint_rates = limits.get('endpoint_rates') or {}
+    for endpoint in ("/earn/info", "/network/ping"):
+        rate = plain_rate(endpoint_rates.get(endpoint))
+        if rate:
+            rates.append(rate * share)
+    return min(rates) if rates else None
+
+
+class RampController:
+    """启动准入控制: 按速率逐个激活等待中的账户, 启动阶段错误率升高时降速
+
+    激活速率按本批账户数分散到至少 min_window 秒内, 且不超过 max_rate.
+    准入本身是调度器中的一个任务, 每 tick 秒激活一批, 没有等待的账户时停止.
+    """
+
+    KEY = "__ramp__"
+
+    def __init__(self, scheduler, max_rate=50.0, min_window=100.0, min_rate=0.5, tick=0.5,
+                 error_threshold=0.2, adjust_interval=5.0, min_samples=20, report_interval=30.0, on_progress=None):
+        self.scheduler = scheduler
+        self.max_rate = max_rate
+        self.min_window = min_window
+        self.min_rate = min_rate
+        self.tick_interval = tick
+        self.error_threshold = error_threshold
+        self.adjust_interval = adjust_interval
+        self.min_samples = min_samples
+        self.report_interval = report_interval
+        self.on_progress = on_progress
+        # UID -> 激活回调(参数为延迟秒数), 按加入顺序激活
+        self.pending = {}
+        self.running = False
+        self.batch = 0
+        self.admitted = 0
+        self.target = max_rate
+        # 错误率升高时减半, 恢复后逐步回到 1
+        self.factor = 1.0
+        self.error_rate = 0.0
+        self.ok = 0
+        self.errors = 0
+        self.credit = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self.last_tick = None
+        self.last_adjust = None
+        self.last_report = None
+
+    @property
+    def rate(self):
+        return max(self.min_rate, self.target * self.factor)
+
+    def window_rate(self, count: int):
+        if not self.min_window:
+            return self.max_rate
+        return max(self.min_rate, min(self.max_rate, count / self.min_window))
+
+    def add(self, uid: str, callback):
+        if uid not in self.pending:
+            self.batch += 1
+        self.pending[uid] = callback
+        if not self.running:
+            self.start()
+        self.target = max(self.target, self.window_rate(self.batch))
+
+    def replace(self, uid: str, callback):
+        if uid in self.pending:
+            self.pending[uid] = callback
+
+    def discard(self, uid: str):
+        if self.pending.pop(uid, None) is not None:
+            self.batch -= 1
+
+    def start(self):
+        now = clock.monotonic()
+        self.running = True
+        self.batch = len(self.pending)
+        self.admitted = 0
+        self.target = self.window_rate(self.batch)
+        self.factor = 1.0
+        self.error_rate = 0.0
+        self.ok = self.errors = 0
+        # 第一个账户立即激活
+        self.credit = 1.0
+        self.started_at = self.last_tick = self.last_adjust = self.last_report = now
+        self.finished_at = None
+        self.scheduler.schedule(self.KEY, "admit", self.tick)
+
+    def record(self, ok: bool):
+        """请求层每次尝试的结果, 只在启动阶段统计"""
+        if not self.running:
+            return
+        if ok:
+            self.ok += 1
+        else:
+            self.errors += 1
+
+    def adjust(self):
+        samples = self.ok + self.errors
+        if samples < self.min_samples:
+            return
+        self.error_rate = self.errors / samples
+        if self.error_rate > self.error_threshold:
+            self.factor = max(self.factor / 2, self.min_rate / self.target)
+        elif self.error_rate < self.error_threshold / 2:
+            self.factor = min(1.0, self.factor * 1.25)
+        self.ok = self.errors = 0
+
+    def eta(self):
+        return len(self.pending) / self.rate
+
+    async def tick(self):
+        now = clock.monotonic()
+        if now - self.last_adjust >= self.adjust_interval:
+            self.adjust()
+            self.last_adjust = now
+        # 积累的额度最多一个 tick, 调度延迟不会导致突发
+        self.credit = min(self.credit + (now - self.last_tick) * self.rate, max(1.0, self.rate * self.tick_interval))
+        self.last_tick = now
+        while self.credit >= 1 and self.pending:
+            uid = next(iter(self.pending))
+            callback = self.pending.pop(uid)
+            self.credit -= 1
+            self.admitted += 1
+            # 在本 tick 内打散, 避免同一时刻发出整批请求
+            callback(random.uniform(0, self.tick_interval))
+        if not self.pending:
+            self.running = False
+            self.finished_at = now
+            if self.on_progress:
+                self.on_progress(self, True)
+            return None
+        if self.on_progress and now - self.last_report >= self.report_interval:
+            self.last_report = now
+            self.on_progress(self, False)
+        return self.tick_interval
+
+    def snapshot(self):
+        return {
+            'running': self.running,
+            'admitted': self.admitted,
+            'pending': len(self.pending),
+            'rate': self.rate if self.running else 0.0,
+            'error_rate': self.error_rate,
+            'elapsed': ((self.finished_at or clock.monotonic()) - self.started_at) if self.started_at else 0.0
+        }
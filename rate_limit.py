@@ -0,0 +1,117 @@
+from contextlib import asynccontextmanager
+import asyncio
+import clock
+
+
+class TokenBucket:
+    """令牌桶: 允许透支, 等待时间按预约顺序排队, 不需要锁"""
+
+    def __init__(self, rate: float, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.tokens = self.burst
+        self.updated = clock.monotonic()
+
+    def reserve(self):
+        now = clock.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class QueueStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, waited: float):
+        self.count += 1
+        self.total += waited
+        if waited > self.max:
+            self.max = waited
+
+
+class RateLimiter:
+    """出站请求限速: 全局令牌桶 + 按接口令牌桶 + 每个代理的并发上限
+
+    endpoint_rates 的 key 为接口路径, 以 "/*" 结尾表示前缀匹配, 例如 "/reward/*".
+    值为每秒请求数或 (每秒请求数, 突发量).
+    """
+
+    def __init__(self, global_rate=None, endpoint_rates=None, proxy_concurrency=None):
+        self.global_bucket = self._bucket(global_rate)
+        self.endpoint_buckets = {}
+        self.prefix_buckets = []
+        for endpoint, rate in (endpoint_rates or {}).items():
+            bucket = self._bucket(rate)
+            if bucket is None:
+                continue
+            if endpoint.endswith("/*"):
+                self.prefix_buckets.append((endpoint[:-1], bucket))
+            else:
+                self.endpoint_buckets[endpoint] = bucket
+        self.proxy_concurrency = proxy_concurrency
+        self.proxy_semaphores = {}
+        self.queue_stats = {}
+        self._resolved = {}
+
+    def _bucket(self, rate):
+        if not rate:
+            return None
+        if isinstance(rate, (tuple, list)):
+            return TokenBucket(*rate)
+        return TokenBucket(rate)
+
+    def bucket_for(self, endpoint: str):
+        if endpoint not in self._resolved:
+            bucket = self.endpoint_buckets.get(endpoint)
+            if bucket is None:
+                bucket = next((bucket for prefix, bucket in self.prefix_buckets if endpoint.startswith(prefix)), None)
+            self._resolved[endpoint] = bucket
+        return self._resolved[endpoint]
+
+    def semaphore_for(self, proxy):
+        if not self.proxy_concurrency:
+            return None
+        semaphore = self.proxy_semaphores.get(proxy)
+        if semaphore is None:
+            semaphore = self.proxy_semaphores[proxy] = asyncio.Semaphore(self.proxy_concurrency)
+        return semaphore
+
+    @asynccontextmanager
+    async def limit(self, endpoint: str, proxy=None):
+        start = clock.monotonic()
+        if self.global_bucket:
+            await self.global_bucket.acquire()
+        bucket = self.bucket_for(endpoint)
+        if bucket:
+            await bucket.acquire()
+        semaphore = self.semaphore_for(proxy)
+        if semaphore:
+            await semaphore.acquire()
+        waited = clock.monotonic() - start
+        stats = self.queue_stats.get(endpoint)
+        if stats is None:
+            stats = self.queue_stats[endpoint] = QueueStats()
+        stats.add(waited)
+        try:
+            yield waited
+        finally:
+            if semaphore:
+                semaphore.release()
+
+    def snapshot(self):
+        return {
+            endpoint: {'count': stats.count, 'total': stats.total, 'max': stats.max}
+            for endpoint, stats in self.queue_stats.items()
+        }
@@ -0,0 +1,238 @@
+from aiohttp import (
+    ClientConnectorError,
+    ClientResponseError
+)
+from aiohttp_socks import ProxyError, ProxyConnectionError, ProxyTimeoutError
+from urllib.parse import urlsplit
+from enum import Enum
+from rate_limit import RateLimiter
+import codec
+import clock
+import asyncio, random
+
+
+class Outcome(Enum):
+    OK = "ok"
+    TOKEN_EXPIRED = "token_expired"
+    FORBIDDEN = "forbidden"
+    TRANSIENT = "transient"
+    FATAL = "fatal"
+
+
+class Result:
+    """一次 API 调用的最终结果"""
+    __slots__ = ("outcome", "data", "error")
+
+    def __init__(self, outcome: Outcome, data=None, error=None):
+        self.outcome = outcome
+        self.data = data
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.outcome is Outcome.OK
+
+    def __repr__(self):
+        return f"Result({self.outcome.name}, data={self.data!r}, error={self.error!r})"
+
+
+class EndpointPolicy:
+    """单个接口的重试策略: 去相关抖动的指数退避"""
+
+    def __init__(self, retries=2, base_delay=1.0, max_delay=30.0, idempotent=True):
+        # retries 是包括第一次请求在内的尝试次数
+        if retries < 1:
+            raise ValueError(f"retries must be at least 1 (number of attempts), got {retries}")
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idempotent = idempotent
+
+    def backoff(self, previous):
+        # decorrelated jitter: sleep = min(cap, random(base, prev * 3))
+        return min(self.max_delay, random.uniform(self.base_delay, max(previous, self.base_delay) * 3))
+
+
+class CircuitBreaker:
+    """连续失败达到阈值后熔断, 冷却后放行一次试探请求"""
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if clock.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def release(self):
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.threshold:
+            self.opened_at = clock.monotonic()
+
+
+# 请求尚未到达服务器的错误, 非幂等请求也可以安全重试
+CONNECT_ERRORS = (ClientConnectorError, ProxyConnectionError, ProxyTimeoutError, ProxyError)
+
+
+def classify_status(status: int):
+    if status == 401:
+        return Outcome.TOKEN_EXPIRED
+    if status == 403:
+        return Outcome.FORBIDDEN
+    if status == 429 or status >= 500:
+        return Outcome.TRANSIENT
+    return Outcome.FATAL
+
+
+def error_class(result, sent):
+    return result.outcome.value if sent else "connect"
+
+
+async def read_json(response):
+    result = codec.decode(await response.read())
+    if result.get("success") is not True:
+        return Result(Outcome.TRANSIENT, result, f"API returned unsuccessful response: {result.get('msg')}")
+    return Result(Outcome.OK, result)
+
+
+async def read_data(response):
+    result = await read_json(response)
+    if result.ok:
+        result.data = result.data['data']
+    return result
+
+
+class RequestEngine:
+    """所有 API 请求的统一执行层: 重试策略, 主机/代理熔断, 类型化结果"""
+
+    def __init__(self, session_pool, policies=None, default_policy=None,
+                 host_threshold=20, proxy_threshold=5, breaker_cooldown=30.0, limiter=None, metrics=None,
+                 proxy_pool=None, ramp=None):
+        self.session_pool = session_pool
+        self.limiter = limiter or RateLimiter()
+        # 可选的 metrics.Metrics, 记录每次尝试的延迟和重试/失败次数
+        self.metrics = metrics
+        # 可选的 proxy_pool.ProxyPool, 用每次请求的结果更新代理健康度
+        self.proxy_pool = proxy_pool
+        # 可选的 ramp.RampController, 启动阶段按请求结果调节账户激活速度
+        self.ramp = ramp
+        self.policies = policies or {}
+        self.default_policy = default_policy or EndpointPolicy()
+        self.thresholds = {"host": host_threshold, "proxy": proxy_threshold}
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers = {}
+
+    def breaker(self, key):
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(self.thresholds[key[0]], self.breaker_cooldown)
+        return breaker
+
+    def endpoint_of(self, url: str):
+        path = urlsplit(url).path
+        return path[4:] if path.startswith("/api/") else path
+
+    async def _attempt(self, endpoint, method, url, proxy, headers, data, parse):
+        """返回 (结果, 请求是否已发出, 主机/代理是否健康)"""
+        try:
+            async with self.limiter.limit(endpoint, proxy), self.session_pool.session(proxy) as session:
+                # 延迟不包含限速排队时间
+                start = clock.monotonic()
+                outcome = Outcome.TRANSIENT
+                responded = False
+                try:
+                    async with session.request(method, url, headers=headers, data=data) as response:
+                        responded = True
+                        response.raise_for_status()
+                        parse_start = clock.monotonic()
+                        result = await parse(response)
+                        if self.metrics:
+                            self.metrics.parse_time.observe(clock.monotonic() - parse_start, endpoint)
+                    outcome = result.outcome
+                    return result, True, True
+                except ClientResponseError as e:
+                    outcome = classify_status(e.status)
+                    raise
+                finally:
+                    elapsed = clock.monotonic() - start
+                    if self.metrics:
+                        self.metrics.request_latency.observe(elapsed, endpoint, outcome.value)
+                    if self.proxy_pool and proxy:
+                        self.proxy_pool.record(proxy, elapsed, responded)
+        except ClientResponseError as e:
+            outcome = classify_status(e.status)
+            return Result(outcome, error=str(e)), True, outcome is not Outcome.TRANSIENT
+        except CONNECT_ERRORS as e:
+            # 连接阶段失败, 请求没有发出
+            return Result(Outcome.TRANSIENT, error=str(e) or e.__class__.__name__), False, False
+        except Exception as e:
+            return Result(Outcome.TRANSIENT, error=str(e) or e.__class__.__name__), True, False
+
+    async def execute(self, method: str, url: str, proxy=None, headers=None, data=None, parse=read_json):
+        endpoint = self.endpoint_of(url)
+        policy = self.policies.get(endpoint, self.default_policy)
+        breakers = [self.breaker(("host", urlsplit(url).netloc))]
+        if proxy:
+            breakers.append(self.breaker(("proxy", proxy)))
+
+        delay = policy.base_delay
+        result = None
+        for attempt in range(policy.retries):
+            allowed = [breaker for breaker in breakers if breaker.allow()]
+            if len(allowed) < len(breakers):
+                for breaker in allowed:
+                    breaker.release()
+                if self.metrics:
+                    self.metrics.failures.inc(endpoint, "circuit_open")
+                return Result(Outcome.TRANSIENT, error=f"Circuit open for {endpoint}")
+
+            result, sent, healthy = await self._attempt(endpoint, method, url, proxy, headers, data, parse)
+            if self.ramp:
+                self.ramp.record(healthy)
+            for breaker in breakers:
+                if healthy:
+                    breaker.record_success()
+                elif sent or not proxy or breaker is not breakers[0]:
+                    # 代理连接失败只计入该代理的熔断器
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+
+            if result.outcome is not Outcome.TRANSIENT:
+                break
+            # 非幂等请求只在请求未发出时重试
+            if sent and not policy.idempotent:
+                break
+            if attempt < policy.retries - 1:
+                if self.metrics:
+                    self.metrics.retries.inc(endpoint, error_class(result, sent))
+                delay = policy.backoff(delay)
+                await asyncio.sleep(delay)
+        if self.metrics and not result.ok:
+            self.metrics.failures.inc(endpoint, error_class(result, sent))
+        return result
@@ -0,0 +1,92 @@
+from itertools import accumulate
+from types import MappingProxyType
+import json, random
+
+PING_VERSION = "3.0.19"
+
+BASE_HEADERS = {
+    "Accept": "*/*",
+    "Accept-Language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Origin": "https://app.aigaea.net",
+    "Referer": "https://app.aigaea.net/",
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "same-site"
+}
+
+PING_ORIGINS = {
+    "extension": ("chrome-extension://cpjicfogbgognnifjgmenmaldnmeeeib", "none"),
+    "web": ("https://app.aigaea.net", "same-site")
+}
+
+_user_agents = None
+
+
+def user_agent_for(uid: str):
+    """按 UID 确定性地选择 User-Agent, 同一账户重启后保持不变"""
+    global _user_agents
+    if _user_agents is None:
+        # 第一次使用时才导入并加载 User-Agent 数据, 按使用占比加权
+        from fake_useragent import FakeUserAgent
+        browsers = FakeUserAgent().data_browsers
+        _user_agents = ([browser['useragent'] for browser in browsers],
+                        list(accumulate(browser.get('percent') or 0.0001 for browser in browsers)))
+    agents, cum_weights = _user_agents
+    return random.Random(uid).choices(agents, cum_weights=cum_weights)[0]
+
+
+class RequestTemplate:
+    """账户加载时预先构造的请求头和 ping 请求体, 请求时直接复用"""
+
+    __slots__ = ("token", "browser_id", "user_agent", "api", "earning", "claim", "ping", "ping_prefix", "ping_suffix",
+                 "ping_length")
+
+    def __init__(self, token: str, browser_id: str, uid: str, user_agent=None):
+        self.user_agent = user_agent or user_agent_for(uid)
+        self.build(token, browser_id, uid)
+
+    def build(self, token: str, browser_id: str, uid: str):
+        """按新的 Token/Browser_ID 原地重建, 已调度的任务持有的模板随之更新"""
+        self.token = token
+        self.browser_id = browser_id
+        authorization = f"Bearer {token}"
+        api = {
+            **BASE_HEADERS,
+            "User-Agent": self.user_agent,
+            "Authorization": authorization,
+            "Content-Type": "application/json"
+        }
+        self.api = MappingProxyType({**api, "Priority": "u=1, i"})
+        self.earning = MappingProxyType({**self.api, "Accept-Language": "he"})
+        # 领奖请求体长度随奖励 ID 变化, Content-Length 交给 aiohttp 计算
+        self.claim = MappingProxyType(api)
+        # ping 请求体只有 timestamp 每次不同, 其余部分预先序列化
+        body = json.dumps({"browser_id": browser_id, "timestamp": 0, "uid": uid, "version": PING_VERSION})
+        self.ping_prefix, self.ping_suffix = body.split('"timestamp": 0')
+        self.ping_prefix += '"timestamp": '
+        # 10 位秒级时间戳, 请求体长度固定
+        self.ping_length = str(len(self.ping_prefix) + 10 + len(self.ping_suffix))
+        # ping 请求头按类型在第一次使用时构造, 正常运行只用到 extension
+        self.ping = {}
+
+    def ping_headers(self, ping_type: str):
+        headers = self.ping.get(ping_type)
+        if headers is None:
+            origin, site = PING_ORIGINS[ping_type]
+            headers = self.ping[ping_type] = MappingProxyType({
+                "Accept": "*/*",
+                "Accept-Language": "en-US",
+                "Authorization": self.api["Authorization"],
+                "Content-Length": self.ping_length,
+                "Content-Type": "application/json",
+                "Origin": origin,
+                "Priority": "u=1, i",
+                "Sec-Fetch-Dest": "empty",
+                "Sec-Fetch-Mode": "cors",
+                "Sec-Fetch-Site": site,
+                "User-Agent": self.user_agent
+            })
+        return headers
+
+    def ping_body(self, timestamp: int):
+        return f"{self.ping_prefix}{timestamp}{self.ping_suffix}"
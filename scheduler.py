@@ -0,0 +1,144 @@
+import asyncio, heapq, itertools, logging, random
+
+
+class Scheduler:
+    """集中调度器: 最小堆保存 (due_time, account, job), 由固定数量的 worker 执行到期任务
+
+    任务函数为无参协程工厂, 返回下一次执行的延迟秒数, 返回 None 表示不再调度.
+    jitter 为 {任务名: 秒数}, 这些任务的到期时间加上随机偏移, 错开大量账户的请求而不占用 worker.
+    """
+
+    def __init__(self, workers=256, jitter=None):
+        self.workers = workers
+        self.jitter = jitter or {}
+        self.heap = []
+        # (account, job) -> (seq, due, func), seq 不一致的堆条目视为已取消
+        self.jobs = {}
+        self.account_jobs = {}
+        self.running = {}
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._queue = None
+        # 可选回调 on_lateness(job, seconds): 任务开始时间比到期时间晚了多少
+        self.on_lateness = None
+
+    def time(self):
+        return asyncio.get_running_loop().time()
+
+    def schedule(self, account, job, func, delay=0):
+        seq = next(self._seq)
+        due = self.time() + max(delay, 0)
+        if job in self.jitter:
+            due += random.uniform(0, self.jitter[job])
+        self.jobs[(account, job)] = (seq, due, func)
+        self.account_jobs.setdefault(account, set()).add(job)
+        heapq.heappush(self.heap, (due, seq, account, job))
+        if self._wakeup is not None and self.heap[0][1] == seq:
+            self._wakeup.set()
+        return due
+
+    def cancel(self, account, job=None):
+        names = [job] if job else list(self.account_jobs.get(account, ()))
+        for name in names:
+            self.jobs.pop((account, name), None)
+            jobs = self.account_jobs.get(account)
+            if jobs is not None:
+                jobs.discard(name)
+                if not jobs:
+                    del self.account_jobs[account]
+
+    def replace(self, account, job, func):
+        """替换任务函数, 保留原来的到期时间"""
+        entry = self.jobs.get((account, job))
+        if entry is None:
+            return False
+        self.jobs[(account, job)] = (entry[0], entry[1], func)
+        return True
+
+    def reschedule(self, account, job, delay=0):
+        """提前或推迟已有任务, 任务函数不变"""
+        entry = self.jobs.get((account, job))
+        if entry is None:
+            return None
+        return self.schedule(account, job, entry[2], delay)
+
+    def next_due(self, account, job):
+        entry = self.jobs.get((account, job))
+        return entry[1] if entry else None
+
+    def backlog(self):
+        """已到期但尚未开始执行的任务数: 到期任务都已移入队列, 不需要扫描堆"""
+        return self._queue.qsize() if self._queue else 0
+
+    def _is_current(self, account, job, seq):
+        entry = self.jobs.get((account, job))
+        return entry is not None and entry[0] == seq
+
+    def _idle(self):
+        return not self.jobs and not self.running and (self._queue is None or self._queue.empty())
+
+    async def _worker(self):
+        while True:
+            account, job, seq, due, func = await self._queue.get()
+            try:
+                if not self._is_current(account, job, seq):
+                    continue
+                if self.on_lateness is not None:
+                    self.on_lateness(job, self.time() - due)
+                self.running[(account, job)] = seq
+                try:
+                    delay = await func()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"Scheduled job {job} for {account} failed: {e}")
+                    delay = 60
+                finally:
+                    self.running.pop((account, job), None)
+                # 任务执行期间可能被取消或被自身重新调度
+                if self._is_current(account, job, seq):
+                    if delay is None:
+                        self.cancel(account, job)
+                    else:
+                        # 执行期间任务函数可能已被 replace() 替换
+                        self.schedule(account, job, self.jobs[(account, job)][2], delay)
+            finally:
+                self._queue.task_done()
+                if self._idle() and self._wakeup is not None:
+                    self._wakeup.set()
+
+    async def run(self, stop_when_idle=True):
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        moved = 0
+        try:
+            while True:
+                while self.heap and not self._is_current(self.heap[0][2], self.heap[0][3], self.heap[0][1]):
+                    heapq.heappop(self.heap)
+                if not self.heap:
+                    if stop_when_idle and self._idle():
+                        return
+                    timeout = None
+                else:
+                    timeout = self.heap[0][0] - self.time()
+                    if timeout <= 0:
+                        due, seq, account, job = heapq.heappop(self.heap)
+                        func = self.jobs[(account, job)][2]
+                        # 到期任务全部移入队列, 排队数即积压数; 大批任务同时到期时每移动一批让出一次事件循环
+                        self._queue.put_nowait((account, job, seq, due, func))
+                        moved += 1
+                        if moved % self.workers == 0:
+                            await asyncio.sleep(0)
+                        continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._wakeup = None
+            self._queue = None
@@ -0,0 +1,84 @@
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from aiohttp_socks import ProxyConnector
+from contextlib import asynccontextmanager
+import asyncio, time
+
+
+class SessionPool:
+    """按代理地址共享的 ClientSession 连接池"""
+
+    def __init__(self, limit_per_proxy=100, keepalive_timeout=60, dns_ttl=300, idle_ttl=300, timeout=60):
+        self.limit_per_proxy = limit_per_proxy
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.idle_ttl = idle_ttl
+        self.timeout = ClientTimeout(total=timeout)
+        # key 为 check_proxy_schemes 规范化后的代理地址, 无代理时为 None
+        self.sessions = {}
+        self.last_used = {}
+        self.in_use = {}
+        self._evict_task = None
+        self._closed = False
+
+    def _create_session(self, proxy):
+        options = dict(
+            limit=self.limit_per_proxy,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        connector = ProxyConnector.from_url(proxy, **options) if proxy else TCPConnector(**options)
+        return ClientSession(connector=connector, timeout=self.timeout)
+
+    def _get(self, proxy):
+        if self._closed:
+            raise RuntimeError("Session pool is closed")
+        session = self.sessions.get(proxy)
+        if session is None or session.closed:
+            session = self._create_session(proxy)
+            self.sessions[proxy] = session
+        if self._evict_task is None:
+            self._evict_task = asyncio.create_task(self._evict_loop())
+        return session
+
+    @asynccontextmanager
+    async def session(self, proxy=None):
+        session = self._get(proxy)
+        self.in_use[proxy] = self.in_use.get(proxy, 0) + 1
+        try:
+            yield session
+        finally:
+            self.in_use[proxy] -= 1
+            self.last_used[proxy] = time.monotonic()
+
+    async def evict_idle(self):
+        now = time.monotonic()
+        idle = [
+            proxy for proxy in self.sessions
+            if not self.in_use.get(proxy) and now - self.last_used.get(proxy, now) >= self.idle_ttl
+        ]
+        for proxy in idle:
+            session = self.sessions.pop(proxy)
+            self.last_used.pop(proxy, None)
+            self.in_use.pop(proxy, None)
+            await session.close()
+        return len(idle)
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(max(self.idle_ttl / 2, 1))
+            try:
+                await self.evict_idle()
+            except Exception:
+                pass
+
+    async def close(self):
+        self._closed = True
+        if self._evict_task:
+            self._evict_task.cancel()
+            self._evict_task = None
+        sessions = list(self.sessions.values())
+        self.sessions.clear()
+        self.last_used.clear()
+        # in_use 不清空: 仍在进行的请求退出 session() 时还要减少计数
+        for session in sessions:
+            await session.close()
@@ -0,0 +1,401 @@
+from aiohttp import ClientResponseError, RequestInfo
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from multidict import CIMultiDict, CIMultiDictProxy
+from urllib.parse import urlsplit
+from yarl import URL
+import argparse, asyncio, csv, json, logging, math, os, random, selectors, sys, tempfile, time, pytz
+import clock, codec, mock_api
+
+DAY = 24 * 3600
+HOUR = 3600
+
+
+class VirtualClock:
+    """模拟时间: 事件循环没有就绪的 I/O 时直接跳到下一个定时器"""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.base = time.monotonic()
+        self.elapsed = 0.0
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        return self.base + self.elapsed
+
+    def advance(self, seconds: float):
+        self.elapsed += seconds
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """先不阻塞地检查 I/O(线程池回调等), 没有就绪事件时把虚拟时钟推进到下一个定时器, 不真正等待"""
+
+    def __init__(self, virtual: VirtualClock):
+        super().__init__()
+        self.virtual = virtual
+        # 线程池中尚未完成的任务数
+        self.busy = 0
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events:
+            return events
+        if timeout is None or (self.busy and timeout > 0):
+            # 没有任何定时器, 或线程池任务(如状态库提交)未完成时等待真实的 I/O, 线程中的工作不占用模拟时间
+            return super().select(None)
+        if timeout > 0:
+            self.virtual.advance(timeout)
+        return []
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, virtual: VirtualClock):
+        super().__init__(VirtualSelector(virtual))
+        self.virtual = virtual
+
+    def time(self):
+        return self.virtual.monotonic()
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self._selector.busy += 1
+        future.add_done_callback(self._executor_done)
+        return future
+
+    def _executor_done(self, future):
+        self._selector.busy -= 1
+
+    def call_at(self, when, callback, *args, context=None):
+        # 定时器至少晚 1 微秒: 极小的延迟在浮点时间上等于当前时间, 时间不前进, 等待方会反复重新等待
+        return super().call_at(max(when, self.time() + 1e-6), callback, *args, context=context)
+
+
+class SimulatedResponse:
+    __slots__ = ("method", "url", "status", "body")
+
+    def __init__(self, method: str, url: str, status: int, body: bytes):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.body = body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            url = URL(self.url)
+            info = RequestInfo(url, self.method, CIMultiDictProxy(CIMultiDict()), url)
+            raise ClientResponseError(info, (), status=self.status, message="simulated")
+
+    async def read(self):
+        return self.body
+
+
+class SimulatedSession:
+    __slots__ = ("api", "proxy")
+
+    def __init__(self, api, proxy):
+        self.api = api
+        self.proxy = proxy
+
+    @asynccontextmanager
+    async def request(self, method, url, headers=None, data=None, **kwargs):
+        yield await self.api.respond(self.proxy, method, str(url), headers or {})
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+
+class SimulatedApi(mock_api.MockApi):
+    """进程内的模拟 API, 代替 SessionPool 传给 AiGaea, 请求不经过网络, 延迟按虚拟时间计算
+
+    领奖和训练按 UTC 日记录状态(领取后 daily-list 返回 today=1, 重复训练返回 Training already completed).
+    统计每个接口每小时/每秒的请求数, 同时进行中的请求数, 以及每个账户两次成功 ping 的间隔.
+    """
+
+    def __init__(self, virtual: VirtualClock, uids: dict, ping_window: float, **options):
+        super().__init__(**options)
+        self.virtual = virtual
+        # Token -> UID
+        self.uids = uids
+        self.ping_window = ping_window
+        self.routes = {(method, path): data for method, path, data in mock_api.ROUTES}
+        # endpoint -> Counter(从开始算起的小时)
+        self.hourly = {}
+        # endpoint -> (当前秒, 计数), 只保留峰值, 内存与模拟时长无关
+        self.second = {}
+        self.peak_rate = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.proxy_in_flight = Counter()
+        self.peak_proxy_in_flight = 0
+        # (UTC 日, Token)
+        self.rewards = set()
+        self.trainings = set()
+        self.last_ping = {}
+        # uid -> [超过 ping_window 的间隔数, 最大间隔]
+        self.missed_pings = {}
+
+    @asynccontextmanager
+    async def session(self, proxy=None):
+        yield SimulatedSession(self, proxy)
+
+    async def close(self):
+        pass
+
+    def count(self, endpoint: str):
+        now = self.virtual.time()
+        hour = int((now - self.virtual.start) // HOUR)
+        second = int(now)
+        for key in (endpoint, "all"):
+            self.hourly.setdefault(key, Counter())[hour] += 1
+            last, count = self.second.get(key, (second, 0))
+            count = count + 1 if last == second else 1
+            self.second[key] = (second, count)
+            if count > self.peak_rate[key]:
+                self.peak_rate[key] = count
+
+    def check_gap(self, uid: str, gap: float):
+        if gap > self.ping_window:
+            missed = self.missed_pings.setdefault(uid, [0, 0.0])
+            missed[0] += 1
+            missed[1] = max(missed[1], gap)
+
+    def record_ping(self, token: str):
+        uid = self.uids.get(token, token)
+        now = self.virtual.time()
+        last = self.last_ping.get(uid)
+        if last is not None:
+            self.check_gap(uid, now - last)
+        self.last_ping[uid] = now
+
+    def finish(self, uids):
+        """模拟结束时检查最后一次 ping 到结束的间隔, 从未 ping 成功的账户也算错过"""
+        end = self.virtual.time()
+        for uid in uids:
+            last = self.last_ping.get(uid)
+            self.check_gap(uid, end - (last if last is not None else self.virtual.start))
+
+    def route(self, method: str, path: str, token: str):
+        data = self.routes.get((method, path))
+        if data is None:
+            return 404, {'success': False, 'code': 404, 'msg': 'not found'}
+        day = int(self.virtual.time() // DAY)
+        if path == "/api/network/ping":
+            self.record_ping(token)
+        elif path == "/api/reward/daily-list":
+            data = {**data, 'today': int((day, token) in self.rewards)}
+        elif path == "/api/reward/daily-complete":
+            self.rewards.add((day, token))
+        elif path == "/api/ai/complete":
+            if (day, token) in self.trainings:
+                return 200, {'success': False, 'code': 400, 'msg': 'Training already completed'}
+            self.trainings.add((day, token))
+        return 200, {'success': True, 'code': 200, 'msg': 'ok', 'data': data}
+
+    async def respond(self, proxy, method: str, url: str, headers):
+        path = urlsplit(url).path
+        self.count(path[4:] if path.startswith("/api/") else path)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if proxy:
+            self.proxy_in_flight[proxy] += 1
+            self.peak_proxy_in_flight = max(self.peak_proxy_in_flight, self.proxy_in_flight[proxy])
+        try:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+            if proxy:
+                self.proxy_in_flight[proxy] -= 1
+        self.requests[path] += 1
+        token = headers.get('Authorization', '').removeprefix('Bearer ')
+        status = self.injected_status(token)
+        if status:
+            body = {'success': False, 'code': status, 'msg': 'injected'}
+        else:
+            status, body = self.route(method, path, token)
+        self.responses[status] += 1
+        return SimulatedResponse(method, url, status, codec.dumps(body).encode())
+
+
+def write_accounts(path: str, count: int, proxies: int):
+    tokens = {}
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Browser_ID", "Token", "Proxy", "UID"])
+        for i in range(count):
+            uid = str(10_000_000 + i)
+            token = f"sim-token-{i:08d}"
+            proxy = f"http://sim-proxy-{i % proxies}:8080" if proxies else ""
+            writer.writerow([f"sim{i}", f"sim-browser-{i:08d}", token, proxy, uid])
+            tokens[token] = uid
+    return tokens
+
+
+def parse_start(text: str):
+    return pytz.UTC.localize(datetime.strptime(text, '%Y-%m-%d')).timestamp()
+
+
+async def run_bot(args, api: SimulatedApi, duration: float):
+    from bot import AiGaea
+    from log_pipeline import pipeline
+
+    # 不启动日志线程, 也不输出到控制台
+    pipeline.console = False
+    bot = AiGaea(watch=False, checkpoint_interval=0, history_interval=0, max_initial_delay=args.max_initial_delay,
+        ramp_rate=args.ramp_rate, daily_capacity=args.daily_capacity, session_pool=api)
+    bot.ping_interval = args.ping_interval
+    task = asyncio.create_task(bot.main(use_proxy=args.proxies > 0, trained=args.train, test_mode=False))
+    done, _ = await asyncio.wait([task], timeout=duration)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    if done:
+        # 所有账户都暂停时 main() 会提前结束, 否则说明运行出错
+        task.result()
+    return bot
+
+
+def simulate(args):
+    start = parse_start(args.start) if args.start else math.floor(time.time() / DAY) * DAY
+    duration = args.days * DAY
+    virtual = VirtualClock(start)
+    if args.seed is not None:
+        # 账户的执行时间(启动顺序, 每日计划)也可重现
+        random.seed(args.seed)
+    workdir = tempfile.TemporaryDirectory(prefix="aigaea-sim-")
+    cwd = os.getcwd()
+    loop = VirtualEventLoop(virtual)
+    previous_clock = clock.current
+    logging.disable(logging.CRITICAL)
+    try:
+        os.chdir(workdir.name)
+        uids = write_accounts("accounts.csv", args.accounts, args.proxies)
+        api = SimulatedApi(virtual, uids, args.ping_interval + args.ping_slack, latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, expired_rate=args.expired_rate, forbidden_rate=args.forbidden_rate, seed=args.seed)
+        clock.install(virtual)
+        asyncio.set_event_loop(loop)
+        started = time.monotonic()
+        bot = loop.run_until_complete(run_bot(args, api, duration))
+        wall = time.monotonic() - started
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+        clock.install(previous_clock)
+        logging.disable(logging.NOTSET)
+        os.chdir(cwd)
+        workdir.cleanup()
+    return report(args, api, bot, start, wall)
+
+
+def report(args, api: SimulatedApi, bot, start: float, wall: float):
+    end = api.virtual.time()
+    paused = bot.paused_uids()
+    active = [uid for uid in api.uids.values() if uid not in paused]
+    api.finish(active)
+    tokens = {uid: token for token, uid in api.uids.items()}
+    hours = math.ceil((end - start) / HOUR)
+
+    missed_daily = {}
+    # 只检查完整模拟的 UTC 日
+    for day in range(math.ceil(start / DAY), int(end // DAY)):
+        jobs = {'reward': api.rewards}
+        if args.train:
+            jobs['training'] = api.trainings
+        missed = {job: sorted(uid for uid in active if (day, tokens[uid]) not in done) for job, done in jobs.items()}
+        missed_daily[time.strftime('%Y-%m-%d', time.gmtime(day * DAY))] = missed
+
+    lateness = bot.metrics.job_lateness
+    worst = sorted(api.missed_pings.items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        'accounts': args.accounts,
+        'start': datetime.fromtimestamp(start, pytz.UTC).isoformat(),
+        'simulated_seconds': round(end - start, 3),
+        'wall_seconds': round(wall, 3),
+        'paused_accounts': len(paused),
+        'endpoints': {
+            endpoint: {
+                'requests': sum(counts.values()),
+                'average_per_second': sum(counts.values()) / max(1.0, end - start),
+                'peak_per_second': api.peak_rate[endpoint],
+                'hourly': [counts.get(hour, 0) for hour in range(hours)]
+            }
+            for endpoint, counts in sorted(api.hourly.items())
+        },
+        'responses': {str(status): count for status, count in sorted(api.responses.items())},
+        'peak_concurrency': api.peak_in_flight,
+        'peak_proxy_concurrency': api.peak_proxy_in_flight,
+        'ping_lateness_p99': lateness.quantile(0.99, job="send_ping"),
+        'ping_window': api.ping_window,
+        'missed_ping_accounts': len(api.missed_pings),
+        'long_ping_gaps': sum(missed[0] for missed in api.missed_pings.values()),
+        'worst_ping_gaps': [{'uid': uid, 'gaps': missed[0], 'max_gap': round(missed[1], 1)} for uid, missed in worst[:10]],
+        'missed_daily': missed_daily
+    }
+
+
+def has_misses(result):
+    return result['missed_ping_accounts'] > 0 or any(uids for missed in result['missed_daily'].values() for uids in missed.values())
+
+
+def print_result(result, rows=24):
+    total = result['endpoints'].get('all', {'requests': 0, 'hourly': []})
+    print(f"{result['accounts']} accounts, {result['simulated_seconds'] / HOUR:.1f}h simulated in {result['wall_seconds']:.1f}s "
+          f"({result['paused_accounts']} paused)")
+    print(f"  {'Endpoint':<24} {'Requests':>10} {'Avg/s':>8} {'Peak/s':>8}")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"  {endpoint:<24} {stats['requests']:>10} {stats['average_per_second']:>8.2f} {stats['peak_per_second']:>8}")
+
+    # 按时间分组的请求数直方图, 最多 rows 行
+    hourly = total['hourly']
+    size = max(1, math.ceil(len(hourly) / rows))
+    groups = [sum(hourly[i:i + size]) for i in range(0, len(hourly), size)]
+    start = datetime.fromisoformat(result['start']).timestamp()
+    print(f"  Requests per {size}h")
+    for i, count in enumerate(groups):
+        label = time.strftime('%m-%d %H:00', time.gmtime(start + i * size * HOUR))
+        bar = "#" * round(40 * count / max(groups)) if max(groups) else ""
+        print(f"  {label}  {count:>10}  {bar}")
+
+    print(f"  Peak concurrency {result['peak_concurrency']} requests, {result['peak_proxy_concurrency']} per proxy")
+    lateness = result['ping_lateness_p99']
+    print(f"  Ping lateness p99 {'-' if lateness is None else f'{lateness:.2f}s'}")
+    print(f"  Missed ping windows (gap > {result['ping_window']:.0f}s) in {result['missed_ping_accounts']} accounts, "
+          f"{result['long_ping_gaps']} gaps")
+    for gap in result['worst_ping_gaps']:
+        print(f"    {gap['uid']}: {gap['gaps']} gaps, longest {gap['max_gap']:.0f}s")
+    for day, missed in result['missed_daily'].items():
+        print(f"  {day} " + ", ".join(f"missed {job} {len(uids)}" for job, uids in missed.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate AiGaea on a virtual clock against an in-process mock API")
+    parser.add_argument("--accounts", type=int, default=1000, help="Number of synthetic accounts")
+    parser.add_argument("--days", type=float, default=1, help="Simulated duration in days (e.g. 7 for a week)")
+    parser.add_argument("--start", help="Simulated start date YYYY-MM-DD at 00:00 UTC (default: today)")
+    parser.add_argument("--proxies", type=int, default=0, help="Spread accounts over this many synthetic proxies (0: no proxy)")
+    parser.add_argument("--train", action="store_true", help="Also run the daily AI training job")
+    parser.add_argument("--max-initial-delay", type=float, default=100, help="Spread account start-up over at least this many seconds")
+    parser.add_argument("--ramp-rate", type=float, default=50, help="Maximum accounts started per second")
+    parser.add_argument("--daily-capacity", type=int, help="Maximum accounts planned per UTC hour for daily jobs")
+    parser.add_argument("--ping-interval", type=float, default=600, help="Ping interval in seconds")
+    parser.add_argument("--ping-slack", type=float, default=60, help="A gap longer than the ping interval plus this many seconds is a missed window")
+    parser.add_argument("--seed", type=int, help="Seed for the mock API latency and error injection")
+    parser.add_argument("--output", help="Also write the result as JSON to this file")
+    mock_api.add_arguments(parser)
+    args = parser.parse_args()
+
+    result = simulate(args)
+    print_result(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if has_misses(result):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+from datetime import datetime
+import argparse, asyncio, csv, os, sqlite3, time, pytz
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    uid TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    browser_id TEXT NOT NULL,
+    token TEXT NOT NULL,
+    proxy TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pause_events (
+    id INTEGER PRIMARY KEY,
+    uid TEXT NOT NULL,
+    token TEXT NOT NULL DEFAULT '',
+    reason TEXT NOT NULL,
+    paused_at REAL NOT NULL,
+    resumed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_pause_active ON pause_events (uid) WHERE resumed_at IS NULL;
+CREATE TABLE IF NOT EXISTS training_completions (
+    day TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    trained_at REAL NOT NULL,
+    PRIMARY KEY (day, uid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reward_claims (
+    day TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    reward_id INTEGER,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (day, uid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS earnings_snapshots (
+    uid TEXT NOT NULL,
+    ts REAL NOT NULL,
+    era_gaea REAL,
+    today_gaea REAL,
+    today_uptime REAL
+);
+CREATE INDEX IF NOT EXISTS idx_earnings_uid_ts ON earnings_snapshots (uid, ts);
+CREATE TABLE IF NOT EXISTS earnings_latest (
+    uid TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    ts REAL NOT NULL,
+    era_gaea REAL,
+    today_gaea REAL,
+    today_uptime REAL
+);
+CREATE INDEX IF NOT EXISTS idx_earnings_latest_day ON earnings_latest (day);
+"""
+
+
+def utc_day(ts=None):
+    return datetime.fromtimestamp(ts if ts is not None else time.time(), pytz.UTC).strftime('%Y-%m-%d')
+
+
+class StateStore:
+    """可选的 SQLite 状态存储: WAL 模式, 单个写入任务, 批量事务
+
+    读操作直接走索引查询, 写操作进入队列由 run() 批量提交.
+    """
+
+    def __init__(self, path="aigaea_state.db", batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.reader = self._connect()
+        self.reader.executescript(SCHEMA)
+        self.writer = self._connect(check_same_thread=False)
+        self.queue = None
+        self.pending = []
+
+    def _connect(self, check_same_thread=True):
+        # 多进程模式下各 worker 共用数据库, 写锁冲突时等待
+        conn = sqlite3.connect(self.path, check_same_thread=check_same_thread, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---- 写入 ----
+
+    def submit(self, sql, params=()):
+        if self.queue is None:
+            self.pending.append((sql, params))
+        else:
+            self.queue.put_nowait((sql, params))
+
+    def _commit(self, statements):
+        self.writer.execute("BEGIN")
+        try:
+            for sql, params in statements:
+                self.writer.execute(sql, params)
+            self.writer.execute("COMMIT")
+        except Exception:
+            self.writer.execute("ROLLBACK")
+            raise
+
+    def flush(self):
+        """同步提交尚未进入写入任务的语句"""
+        statements, self.pending = self.pending, []
+        if statements:
+            self._commit(statements)
+
+    async def run(self):
+        self.queue = asyncio.Queue()
+        for statement in self.pending:
+            self.queue.put_nowait(statement)
+        self.pending = []
+        stopping = False
+        while not stopping:
+            batch = []
+            item = await self.queue.get()
+            # 在短时间窗口内攒批, 一个事务提交
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                timeout = deadline - asyncio.get_running_loop().time()
+                if len(batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if batch:
+                try:
+                    await asyncio.to_thread(self._commit, batch)
+                except Exception as e:
+                    print(f"Error writing state store {self.path}: {e}")
+        self.queue = None
+
+    async def stop(self):
+        """提交队列中剩余的写入后结束 run()"""
+        if self.queue is not None:
+            self.queue.put_nowait(None)
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        self.reader.close()
+
+    def upsert_account(self, account: dict):
+        self.submit(
+            "INSERT INTO accounts (uid, name, browser_id, token, proxy, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(uid) DO UPDATE SET name=excluded.name, browser_id=excluded.browser_id, "
+            "token=excluded.token, proxy=excluded.proxy, updated_at=excluded.updated_at",
+            (account['UID'], account['Name'], account['Browser_ID'], account['Token'], account.get('Proxy') or '', time.time())
+        )
+
+    def record_pause(self, account: dict, reason: str, paused_at=None):
+        self.submit(
+            "INSERT INTO pause_events (uid, token, reason, paused_at) "
+            "SELECT ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM pause_events WHERE uid = ? AND resumed_at IS NULL)",
+            (account['UID'], account.get('Token') or '', reason, paused_at or time.time(), account['UID'])
+        )
+
+    def record_resume(self, uid: str):
+        self.submit("UPDATE pause_events SET resumed_at = ? WHERE uid = ? AND resumed_at IS NULL", (time.time(), uid))
+
+    def record_training(self, uid: str, day=None, trained_at=None):
+        self.submit(
+            "INSERT OR IGNORE INTO training_completions (day, uid, trained_at) VALUES (?, ?, ?)",
+            (day or utc_day(), uid, trained_at or time.time())
+        )
+
+    def record_reward(self, uid: str, reward_id=None):
+        self.submit(
+            "INSERT OR IGNORE INTO reward_claims (day, uid, reward_id, claimed_at) VALUES (?, ?, ?, ?)",
+            (utc_day(), uid, reward_id, time.time())
+        )
+
+    def record_earnings(self, uid: str, earning: dict):
+        now = time.time()
+        values = (earning.get('era_gaea'), earning.get('today_gaea'), earning.get('today_uptime'))
+        self.submit(
+            "INSERT INTO earnings_snapshots (uid, ts, era_gaea, today_gaea, today_uptime) VALUES (?, ?, ?, ?, ?)",
+            (uid, now, *values)
+        )
+        self.submit(
+            "INSERT INTO earnings_latest (uid, day, ts, era_gaea, today_gaea, today_uptime) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(uid) DO UPDATE SET day=excluded.day, ts=excluded.ts, era_gaea=excluded.era_gaea, "
+            "today_gaea=excluded.today_gaea, today_uptime=excluded.today_uptime",
+            (uid, utc_day(now), now, *values)
+        )
+
+    # ---- 查询 ----
+
+    def is_paused(self, uid: str):
+        return self.reader.execute(
+            "SELECT 1 FROM pause_events WHERE uid = ? AND resumed_at IS NULL", (uid,)
+        ).fetchone() is not None
+
+    def paused_uids(self):
+        return {row[0] for row in self.reader.execute("SELECT uid FROM pause_events WHERE resumed_at IS NULL")}
+
+    def paused_reasons(self):
+        return dict(self.reader.execute("SELECT reason, COUNT(*) FROM pause_events WHERE resumed_at IS NULL GROUP BY reason"))
+
+    def paused_accounts(self):
+        """uid -> {"Token", "reason"}, 与 paused_accounts.json 中记录的字段相同"""
+        return {
+            uid: {'Token': token, 'reason': reason}
+            for uid, token, reason in self.reader.execute("SELECT uid, token, reason FROM pause_events WHERE resumed_at IS NULL")
+        }
+
+    def trained_on(self, uid: str, day=None):
+        return self.reader.execute(
+            "SELECT 1 FROM training_completions WHERE day = ? AND uid = ?", (day or utc_day(), uid)
+        ).fetchone() is not None
+
+    def claimed_on(self, uid: str, day=None):
+        return self.reader.execute(
+            "SELECT 1 FROM reward_claims WHERE day = ? AND uid = ?", (day or utc_day(), uid)
+        ).fetchone() is not None
+
+    def untrained_uids(self, day=None):
+        return [row[0] for row in self.reader.execute(
+            "SELECT a.uid FROM accounts a "
+            "WHERE NOT EXISTS (SELECT 1 FROM training_completions t WHERE t.day = ? AND t.uid = a.uid) "
+            "AND NOT EXISTS (SELECT 1 FROM pause_events p WHERE p.uid = a.uid AND p.resumed_at IS NULL)",
+            (day or utc_day(),)
+        )]
+
+    def fleet_points(self, day=None):
+        row = self.reader.execute(
+            "SELECT COUNT(*), COALESCE(SUM(today_gaea), 0) FROM earnings_latest WHERE day = ?", (day or utc_day(),)
+        ).fetchone()
+        return {'accounts': row[0], 'today_gaea': row[1]}
+
+
+def parse_local_time(text):
+    # 旧文件中的时间格式为 '%x %X %Z' (WIB), 无法解析时使用当前时间
+    try:
+        return pytz.timezone('Asia/Jakarta').localize(datetime.strptime(text.rsplit(' ', 1)[0], '%x %X')).timestamp()
+    except Exception:
+        return time.time()
+
+
+def migrate(store: StateStore, accounts_file="accounts.csv", paused_file="paused_accounts.json", training_file="training_records.json"):
+    """将现有的 CSV/JSON 状态文件导入 SQLite"""
+    from journal import Journal
+
+    counts = {'accounts': 0, 'paused': 0, 'training': 0}
+    if os.path.exists(accounts_file):
+        with open(accounts_file, 'r', newline='') as file:
+            for account in csv.DictReader(file):
+                if account.get('UID'):
+                    store.upsert_account(account)
+                    counts['accounts'] += 1
+    if os.path.exists(paused_file) or os.path.exists(f"{paused_file}.journal"):
+        for uid, record in Journal(paused_file).load().items():
+            store.record_pause({'UID': uid, 'Token': record.get('Token')}, record.get('reason', 'Token Expired (401)'),
+                parse_local_time(record.get('paused_at', '')))
+            counts['paused'] += 1
+    if os.path.exists(training_file) or os.path.exists(f"{training_file}.journal"):
+        for uid, days in Journal(training_file).load().items():
+            for day, record in days.items():
+                store.record_training(uid, day, parse_local_time(record.get('trained_at', '')))
+                counts['training'] += 1
+    store.flush()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AiGaea SQLite state store")
+    parser.add_argument("--db", default="aigaea_state.db", help="SQLite database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="Import accounts.csv, paused_accounts.json and training_records.json")
+    query = sub.add_parser("query", help="Run a state query")
+    query.add_argument("what", choices=["paused", "untrained", "points"])
+    args = parser.parse_args()
+
+    store = StateStore(args.db)
+    try:
+        if args.command == "migrate":
+            counts = migrate(store)
+            print(f"Imported {counts['accounts']} accounts, {counts['paused']} paused accounts, {counts['training']} training records into {args.db}")
+        elif args.what == "paused":
+            print("\n".join(sorted(store.paused_uids())))
+        elif args.what == "untrained":
+            print("\n".join(store.untrained_uids()))
+        else:
+            points = store.fleet_points()
+            print(f"Accounts reporting today: {points['accounts']} - Fleet points today: {points['today_gaea']}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+from colorama import *
+import asyncio, multiprocessing, os, queue, signal, time
+
+
+def split_limits(limits, count: int):
+    """把集群总速率平均分给每个 worker, 每个代理的并发上限保持不变"""
+    if not limits:
+        return None
+    scale = lambda rate: rate / count if rate else rate
+    return {
+        'global_rate': scale(limits.get('global_rate')),
+        'endpoint_rates': {endpoint: scale(rate) for endpoint, rate in (limits.get('endpoint_rates') or {}).items()},
+        'proxy_concurrency': limits.get('proxy_concurrency')
+    }
+
+
+def worker_entry(index: int, count: int, options: dict, report):
+    """worker 进程入口: 只运行 shard_of(uid) == index 的账户"""
+    from bot import AiGaea
+    from log_pipeline import pipeline
+    logging_options = options.get('logging') or {}
+    log_file, ext = os.path.splitext(logging_options.get('log_file', 'aigaea.log'))
+    # 每个 worker 写自己的日志文件, 避免多进程同时轮转同一个文件
+    pipeline.start(log_file=f"{log_file}.worker{index}{ext}", quiet=logging_options.get('quiet', False),
+        debug=logging_options.get('debug', False))
+    try:
+        bot_options = dict(options.get('bot') or {})
+        limits = split_limits(bot_options.pop('limits', None), count)
+        metrics_port = bot_options.pop('metrics_port', None)
+        # 每个 worker 各自分配备用代理, 单个代理的账户上限按 worker 数平分
+        max_accounts_per_proxy = max(1, bot_options.pop('max_accounts_per_proxy', 10) // count)
+        ramp_rate = bot_options.pop('ramp_rate', 50) / count
+        bot_options['validate_concurrency'] = max(1, bot_options.get('validate_concurrency', 50) // count)
+        if bot_options.get('daily_capacity'):
+            bot_options['daily_capacity'] = max(1, bot_options['daily_capacity'] // count)
+        bot = AiGaea(**bot_options, shard=(index, count), limits=limits, ramp_rate=ramp_rate,
+            metrics_port=metrics_port + index if metrics_port else None, max_accounts_per_proxy=max_accounts_per_proxy)
+        # supervisor 结束时向 worker 发送 SIGTERM, worker 保存状态后退出
+        asyncio.run(bot.run(
+            use_proxy=options['use_proxy'],
+            trained=options['trained'],
+            test_mode=False,
+            report=report
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+
+
+class Supervisor:
+    """启动 N 个 worker 进程, 崩溃后自动重启, 并汇总各 worker 的计数器"""
+
+    def __init__(self, bot, workers: int, options: dict, report_interval=60, max_restart_delay=60):
+        self.bot = bot
+        self.workers = workers
+        self.options = options
+        self.report_interval = report_interval
+        self.max_restart_delay = max_restart_delay
+        self.context = multiprocessing.get_context("spawn")
+        self.report = self.context.Queue()
+        self.processes = {}
+        self.restart_delay = {}
+        self.restart_at = {}
+        self.finished = set()
+        self.stats = {}
+        self.stopping = False
+
+    def start_worker(self, index: int):
+        process = self.context.Process(
+            target=worker_entry,
+            args=(index, self.workers, self.options, self.report),
+            name=f"aigaea-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+        self.bot.log(f"{Fore.GREEN + Style.BRIGHT}Worker {index} started (pid {process.pid}){Style.RESET_ALL}")
+
+    def check_workers(self):
+        now = time.monotonic()
+        for index, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            del self.processes[index]
+            if process.exitcode == 0:
+                # 该分片所有账户都已暂停, 不需要重启
+                self.finished.add(index)
+                self.bot.log(f"{Fore.YELLOW + Style.BRIGHT}Worker {index} finished{Style.RESET_ALL}")
+                continue
+            delay = self.restart_delay.get(index, 1)
+            self.restart_delay[index] = min(delay * 2, self.max_restart_delay)
+            self.restart_at[index] = now + delay
+            self.bot.log(f"{Fore.RED + Style.BRIGHT}Worker {index} exited with code {process.exitcode}, restarting in {delay}s{Style.RESET_ALL}")
+        for index, due in list(self.restart_at.items()):
+            if now >= due:
+                del self.restart_at[index]
+                self.start_worker(index)
+
+    def drain_reports(self, timeout=1.0):
+        try:
+            index, pid, stats = self.report.get(timeout=timeout)
+        except queue.Empty:
+            return
+        self.stats[index] = stats
+        # worker 正常汇报后重置重启退避
+        self.restart_delay.pop(index, None)
+        while True:
+            try:
+                index, pid, stats = self.report.get_nowait()
+            except queue.Empty:
+                return
+            self.stats[index] = stats
+
+    def fleet_view(self):
+        totals = {}
+        for stats in self.stats.values():
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def print_fleet_view(self):
+        totals = self.fleet_view()
+        queue_average = totals.get('queue_wait_total', 0) / totals['queue_waits'] if totals.get('queue_waits') else 0
+        self.bot.log(
+            f"{Fore.CYAN + Style.BRIGHT}[ Fleet ]{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Workers: {len(self.processes)}/{self.workers} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Accounts: {totals.get('active', 0)}/{totals.get('accounts', 0)} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.GREEN + Style.BRIGHT} Pings OK: {totals.get('pings_ok', 0)} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.RED + Style.BRIGHT} Failed: {totals.get('pings_failed', 0)} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.YELLOW + Style.BRIGHT} Paused: {totals.get('paused', 0)} {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Points Today: {totals.get('points_today', 0)} PTS {Style.RESET_ALL}"
+            f"{Fore.MAGENTA + Style.BRIGHT}-{Style.RESET_ALL}"
+            f"{Fore.WHITE + Style.BRIGHT} Queue Avg: {queue_average * 1000:.0f} ms{Style.RESET_ALL}"
+        )
+
+    def stop(self, signum=None, frame=None):
+        """SIGTERM/SIGINT: 结束监控循环, 由 run() 终止并回收所有 worker"""
+        self.stopping = True
+
+    def run(self):
+        handlers = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        for index in range(self.workers):
+            self.start_worker(index)
+        next_report = time.monotonic() + self.report_interval
+        try:
+            while (self.processes or self.restart_at) and not self.stopping:
+                self.drain_reports()
+                self.check_workers()
+                if time.monotonic() >= next_report:
+                    next_report += self.report_interval
+                    self.print_fleet_view()
+            self.print_fleet_view()
+        finally:
+            # terminate() 向 worker 发送 SIGTERM, 超时仍未退出的强制结束
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+
+def run_supervisor(bot, workers: int, bot_options=None, logging_options=None, use_proxy=None, trained=None, test_mode=None):
+    """在主进程中完成交互选项, 再按 UID 哈希把账户分配给 worker 进程
+
+    bot_options 为传给每个 worker 的 AiGaea 参数, 限速和单代理账户上限按 worker 数平分.
+    use_proxy/trained/test_mode 已指定时(daemon 模式)不再提问.
+    """
+    interactive = use_proxy is None
+    if interactive:
+        use_proxy_choice, trained = bot.print_question()
+        use_proxy = use_proxy_choice == 1
+    if test_mode is None:
+        test_mode = bot.ask_test_mode()
+    if test_mode:
+        # 测试模式只测试第一个账户, 不需要启动 worker
+        asyncio.run(bot.main(use_proxy=use_proxy, trained=trained, test_mode=True))
+        return
+
+    if interactive:
+        bot.clear_terminal()
+        bot.welcome()
+    bot.log(
+        f"{Fore.GREEN + Style.BRIGHT}Supervisor Mode: {Style.RESET_ALL}"
+        f"{Fore.WHITE + Style.BRIGHT}{workers} Workers{Style.RESET_ALL}"
+    )
+    options = {'use_proxy': use_proxy, 'trained': trained, 'bot': bot_options, 'logging': logging_options}
+    Supervisor(bot, workers, options).run()
@@ -0,0 +1,30 @@
+import os, sys
+import pytest
+
+# 模块都在仓库根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clock
+
+
+class FakeClock:
+    def __init__(self, start=1_700_000_000.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock():
+    previous = clock.current
+    fake = FakeClock()
+    clock.install(fake)
+    yield fake
+    clock.install(previous)
@@ -0,0 +1,156 @@
+import asyncio, json, os, signal
+import pytest
+import clock
+from account import Account
+from bot import AiGaea
+from log_pipeline import pipeline
+from simulate import DAY, SimulatedApi, VirtualClock, VirtualEventLoop, write_accounts
+from state_store import StateStore
+
+START = 20000 * DAY
+
+
+@pytest.fixture
+def virtual(tmp_path, monkeypatch):
+    """在临时目录中用虚拟时钟运行, 卡住的协程在虚拟时间超时后失败而不是挂起"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "console", False)
+    virtual = VirtualClock(START)
+    loop = VirtualEventLoop(virtual)
+    previous = clock.current
+    clock.install(virtual)
+    asyncio.set_event_loop(loop)
+    yield virtual
+    asyncio.set_event_loop(None)
+    loop.close()
+    clock.install(previous)
+
+
+def run(virtual, coro, timeout=DAY):
+    return asyncio.get_event_loop().run_until_complete(asyncio.wait_for(coro, timeout))
+
+
+def expired_fleet(virtual, count=5):
+    uids = write_accounts("accounts.csv", count, 0)
+    api = SimulatedApi(virtual, uids, 660, latency=0.01, jitter=0, expired_rate=1.0, seed=1)
+    return api, set(uids.values())
+
+
+def make_bot(api, **options):
+    return AiGaea(watch=False, checkpoint_interval=0, history_interval=0, max_initial_delay=0, session_pool=api, **options)
+
+
+def test_state_db_shutdown_commits_pauses(virtual):
+    api, uids = expired_fleet(virtual)
+    bot = make_bot(api, state_db="state.db")
+    # 所有账户都因 401 暂停后 main() 结束, 写入任务提交队列中剩余的语句
+    run(virtual, bot.main(use_proxy=False, trained=False, test_mode=False))
+
+    store = StateStore("state.db")
+    try:
+        assert store.paused_uids() == uids
+    finally:
+        store.close()
+
+
+def test_sigterm_saves_checkpoint_before_exit(virtual):
+    uids = write_accounts("accounts.csv", 5, 0)
+    api = SimulatedApi(virtual, uids, 660, latency=0.01, jitter=0, seed=1)
+    bot = AiGaea(watch=False, checkpoint_interval=3 * 3600, history_interval=0, max_initial_delay=0, session_pool=api)
+    loop = asyncio.get_event_loop()
+    # 定期检查点写入之前收到 SIGTERM
+    loop.call_later(3600, os.kill, os.getpid(), signal.SIGTERM)
+    run(virtual, bot.run(use_proxy=False, trained=False, test_mode=False))
+
+    with open("checkpoint.json") as f:
+        assert set(json.load(f)['accounts']) == set(uids.values())
+
+
+def test_token_check_skips_accounts_paused_with_state_db(virtual):
+    api, uids = expired_fleet(virtual)
+    bot = make_bot(api, state_db="state.db", validate=True)
+    run(virtual, bot.main(use_proxy=False, trained=False, test_mode=False))
+
+    # 检查时已暂停的账户不再启动, 只有检查本身的收益查询
+    assert api.requests["/api/earn/info"] == len(uids)
+    assert api.requests["/api/network/ping"] == 0
+    assert bot.account_states() == {("active",): 0, ("starting",): 0, ("paused",): len(uids), ("forbidden",): 0}
+
+
+def test_dashboard_mode_still_writes_events_to_log_file(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "console", False)
+    bot = AiGaea(watch=False, checkpoint_interval=0, history_interval=0)
+    with caplog.at_level("INFO", logger="aigaea"):
+        bot.log("Startup: 1.00s", event="startup")
+        bot.log("console only")
+    assert [record.getMessage() for record in caplog.records] == ["Startup: 1.00s"]
+
+
+def test_checkpoint_keeps_resume_state_of_admitted_accounts_not_started_yet(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    row = {"Name": "a", "Browser_ID": "browser-a", "Token": "token-a", "Proxy": "", "UID": "1"}
+    saved = {'due': {"send_ping": 1_900_000_000.0}, 'points': 5000, 'idle_polls': 2, 'reward_day': "2030-01-01"}
+
+    async def checkpoint_mid_ramp():
+        bot = AiGaea(watch=False, history_interval=0)
+        bot.resume = {"1": dict(saved)}
+        # 准入后 start 任务还没执行
+        bot.admit_account(Account.from_row(row), None, 30)
+        bot.checkpoint.save()
+
+    asyncio.run(checkpoint_mid_ramp())
+
+    bot = AiGaea(watch=False, history_interval=0)
+    resume = bot.checkpoint.load()
+    assert resume["1"] == saved
+    account = Account.from_row(row)
+    bot.restore_account(account, resume["1"])
+    assert (account.points, account.idle_polls, account.reward_day) == (5000, 2, "2030-01-01")
+
+
+def test_state_db_pause_and_resume_are_visible_before_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "console", False)
+    account = Account.from_row({"Name": "a", "Browser_ID": "browser-a", "Token": "token-a", "Proxy": "", "UID": "1"})
+
+    async def main():
+        bot = AiGaea(watch=False, checkpoint_interval=0, history_interval=0, state_db="state.db")
+        bot.load_state()
+        bot.load_paused_counts()
+        writer = asyncio.create_task(bot.store.run())
+        await asyncio.sleep(0)
+        bot.save_paused_account(account, "Account Forbidden (403)")
+        # 写入任务还没有提交, 内存中的状态已经更新
+        assert bot.store.paused_uids() == set()
+        assert bot.paused_uids() == {"1"} and bot.paused_token("1") == "token-a"
+        assert bot.paused_counts['forbidden'] == 1
+        await bot.store.stop()
+        await writer
+        bot.store.close()
+
+    asyncio.run(main())
+
+    bot = AiGaea(watch=False, checkpoint_interval=0, history_interval=0, state_db="state.db")
+    bot.load_state()
+    assert bot.paused_accounts == {"1": {'Token': "token-a", 'reason': "Account Forbidden (403)"}}
+    bot.resume_account("1")
+    assert bot.paused_uids() == set()
+    bot.store.close()
+
+
+def test_unexpected_job_error_is_logged_once_with_error_field(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "console", False)
+    bot = AiGaea(watch=False, checkpoint_interval=0, history_interval=0)
+    account = Account.from_row({"Name": "a", "Browser_ID": "browser-a", "Token": "token-a", "Proxy": "", "UID": "1"})
+
+    async def broken(account, proxy=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(bot, "account_earning", broken)
+    with caplog.at_level("INFO", logger="aigaea"):
+        asyncio.run(bot.process_user_earning(account))
+    errors = [record for record in caplog.records if record.levelname == "ERROR"]
+    assert len(errors) == 1
+    assert (errors[0].account, errors[0].error) == ("a", "boom")
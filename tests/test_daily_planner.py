@@ -0,0 +1,63 @@
+from daily_planner import DAY, HOUR, DailyPlanner
+
+DAY_START = 20000 * DAY
+
+
+def test_capacity_is_respected_within_first_window():
+    planner = DailyPlanner(jobs={"reward": 24}, hourly_capacity=2)
+    times = [planner.plan(str(uid), "reward", now=DAY_START) for uid in range(40)]
+    hours = [int((at - DAY_START) // HOUR) for at in times]
+    # 最后 2 小时只留给重试
+    assert max(hours) < 22
+    assert all(hours.count(hour) <= 2 for hour in set(hours))
+    assert planner.snapshot(now=DAY_START)["reward"]["planned"] == 40
+
+
+def test_default_capacity_spreads_fleet_with_headroom():
+    planner = DailyPlanner(fleet_size=lambda: 1200)
+    # 训练只在 0~12 点首次尝试
+    assert planner.capacity("training") == 125
+    assert planner.capacity("reward") == 69
+
+
+def test_completed_today_is_planned_for_tomorrow():
+    planner = DailyPlanner(hourly_capacity=10)
+    tomorrow = planner.complete("1", "reward", now=DAY_START + HOUR)
+    assert DAY_START + DAY <= tomorrow < DAY_START + DAY + 22 * HOUR
+    assert planner.plan("1", "reward", now=DAY_START + 2 * HOUR) >= DAY_START + DAY
+
+
+def test_retry_inside_reserve_reports_at_risk_once():
+    reports = []
+    planner = DailyPlanner(hourly_capacity=10, retry_delay=(600, 600), on_risk=lambda *args: reports.append(args))
+    now = DAY_START + DAY - 90 * 60
+    at = planner.retry("1", "reward", now=now)
+    planner.retry("1", "reward", now=now + 60)
+
+    assert now < at < DAY_START + DAY
+    assert len(reports) == 1 and reports[0][:2] == ("1", "reward")
+    assert planner.snapshot(now=now)["reward"]["at_risk"] == 1
+
+
+def test_retry_past_deadline_is_missed_and_moves_to_tomorrow():
+    reports = []
+    planner = DailyPlanner(hourly_capacity=10, on_risk=lambda *args: reports.append(args))
+    now = DAY_START + DAY - 5 * 60
+    at = planner.retry("1", "reward", now=now)
+
+    assert at >= DAY_START + DAY
+    assert planner.snapshot(now=now)["reward"]["missed"] == 1
+    assert "missed" in reports[0][2]
+
+
+def test_skip_moves_to_tomorrow_without_risk_or_capacity():
+    reports = []
+    planner = DailyPlanner(hourly_capacity=1, on_risk=lambda *args: reports.append(args))
+    now = DAY_START + DAY - 30 * 60
+    planner.plan("1", "training", now=DAY_START)
+    at = planner.skip("1", "training", now=now)
+
+    assert DAY_START + DAY <= at < DAY_START + DAY + 12 * HOUR
+    today = planner.snapshot(now=now)["training"]
+    assert (today["planned"], today["skipped"], today["at_risk"], today["missed"]) == (0, 1, 0, 0)
+    assert not reports
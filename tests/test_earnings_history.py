@@ -0,0 +1,67 @@
+import os
+from earnings_history import DAY, HOUR, RECORD, EarningsHistory, growth, stalled
+
+START = 20000 * DAY
+
+
+def fill(history, days, accounts=3):
+    now = START
+    for step in range(days * 96):
+        now = START + step * 900
+        for i in range(accounts):
+            history.record(str(i), {'era_gaea': 1000 + step * (i + 1), 'today_gaea': step % 96, 'today_uptime': 15}, now)
+        if step % 4 == 3:
+            history._write(*history.take(), now)
+    history.save()
+    return now
+
+
+def test_downsampling_keeps_last_sample_per_bucket(tmp_path):
+    history = EarningsHistory(str(tmp_path / "earnings"), retention={"raw": 2 * DAY, "hourly": 3 * DAY})
+    now = fill(history, 6)
+    history.compact(now)
+
+    records = list(history.records("1"))
+    timestamps = [record[1] for record in records]
+    assert timestamps == sorted(timestamps) and len(set(timestamps)) == len(timestamps)
+    # 最旧的天只剩每天最后一条, 中间是每小时最后一条, 最近 2 天是原始记录
+    assert records[0][1] == START + DAY - 900
+    hourly = [ts for ts in timestamps if START + 3 * DAY <= ts < now - 2 * DAY - HOUR]
+    assert all(ts % HOUR == HOUR - 900 for ts in hourly)
+    assert sum(1 for ts in timestamps if ts >= now - 2 * DAY + HOUR) >= 2 * 96 - 8
+
+
+def test_growth_is_exact_after_downsampling(tmp_path):
+    history = EarningsHistory(str(tmp_path / "earnings"), retention={"raw": HOUR, "hourly": HOUR})
+    now = fill(history, 3)
+    before = growth([history], START)[1]
+    history.compact(now)
+    after = growth([history], START)[1]
+    assert {uid: stats[0] for uid, stats in after.items()} == {uid: stats[0] for uid, stats in before.items()}
+
+
+def test_reopen_repairs_partial_record_and_keeps_uids(tmp_path):
+    directory = str(tmp_path / "earnings")
+    history = EarningsHistory(directory)
+    history.record("a", {'era_gaea': 1}, START)
+    history.record("b", {'era_gaea': 2}, START)
+    history.save()
+    with open(history.path("raw"), 'ab') as f:
+        f.write(b"\x00" * (RECORD.size // 2))
+
+    reopened = EarningsHistory(directory)
+    assert os.path.getsize(reopened.path("raw")) == 2 * RECORD.size
+    reopened.record("b", {'era_gaea': 3}, START + 900)
+    reopened.record("c", {'era_gaea': 4}, START + 900)
+    reopened.save()
+    assert [(uid, era) for uid, _, era, _, _ in reopened.records()] == [("a", 1), ("b", 2), ("b", 3), ("c", 4)]
+
+
+def test_stalled_finds_accounts_without_growth(tmp_path):
+    history = EarningsHistory(str(tmp_path / "earnings"))
+    for step in range(48):
+        now = START + step * 900
+        history.record("growing", {'era_gaea': step}, now)
+        history.record("flat", {'era_gaea': 5 if step > 4 else step}, now)
+    history.save()
+    assert [item[0] for item in stalled([history], 6, now=now)] == ["flat"]
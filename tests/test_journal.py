@@ -0,0 +1,76 @@
+import json, os
+from journal import Journal
+
+
+def test_replay_restores_sets_and_deletes(tmp_path):
+    path = str(tmp_path / "paused.json")
+    journal = Journal(path)
+    journal.load()
+    journal.set(["1"], {"reason": "401"})
+    journal.set(["2"], {"reason": "403"})
+    journal.delete(["1"])
+    journal.set(["3", "2025-01-01"], {"trained_at": "x"})
+    journal.flush()
+
+    assert not os.path.exists(path)
+    assert Journal(path).load() == {"2": {"reason": "403"}, "3": {"2025-01-01": {"trained_at": "x"}}}
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / "paused.json")
+    journal = Journal(path)
+    journal.load()
+    journal.set(["1"], {"reason": "401"})
+    journal.flush()
+    with open(journal.journal_path, 'a') as f:
+        f.write('{"op":"set","path":["2"],"val')
+
+    assert Journal(path).load() == {"1": {"reason": "401"}}
+
+
+def test_compaction_writes_snapshot_and_empties_journal(tmp_path):
+    path = str(tmp_path / "paused.json")
+    journal = Journal(path, compact_every=3)
+    journal.load()
+    for uid in ("1", "2", "3"):
+        journal.set([uid], {"reason": "401"})
+    journal.flush()
+
+    with open(path) as f:
+        assert json.load(f) == {uid: {"reason": "401"} for uid in ("1", "2", "3")}
+    assert os.path.getsize(journal.journal_path) == 0
+
+    journal.delete(["2"])
+    journal.flush()
+    assert Journal(path).load() == {"1": {"reason": "401"}, "3": {"reason": "401"}}
+
+
+def test_replay_after_snapshot_is_idempotent(tmp_path):
+    path = str(tmp_path / "paused.json")
+    journal = Journal(path)
+    journal.load()
+    journal.set(["1"], {"reason": "401"})
+    journal.flush(compact=True)
+    # 快照已写入但 journal 尚未清空时崩溃: 重放同样的记录结果不变
+    with open(journal.journal_path, 'w') as f:
+        f.write(json.dumps({"op": "set", "path": ["1"], "value": {"reason": "401"}}) + "\n")
+
+    assert Journal(path).load() == {"1": {"reason": "401"}}
+
+
+def test_prune_runs_on_load_and_compaction(tmp_path):
+    path = str(tmp_path / "training.json")
+
+    def prune(data):
+        for uid in [uid for uid in data if uid.startswith("old")]:
+            del data[uid]
+
+    journal = Journal(path, prune=prune)
+    journal.load()
+    journal.set(["old-1"], {})
+    journal.set(["new-1"], {})
+    journal.flush(compact=True)
+
+    with open(path) as f:
+        assert json.load(f) == {"new-1": {}}
+    assert Journal(path, prune=prune).load() == {"new-1": {}}
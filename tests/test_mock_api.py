@@ -0,0 +1,69 @@
+import asyncio
+from aiohttp import ClientSession
+import benchmark, mock_api
+
+PORT = 8799
+
+
+def test_mock_api_serves_routes_and_injects_failures():
+    api = mock_api.MockApi(latency=0, jitter=0, expired_rate=0.5, seed=1)
+    tokens = [f"token-{i}" for i in range(40)]
+
+    async def main():
+        await api.start("127.0.0.1", PORT)
+        try:
+            statuses = {}
+            async with ClientSession() as session:
+                for token in tokens:
+                    async with session.get(f"http://127.0.0.1:{PORT}/api/earn/info",
+                                           headers={'Authorization': f"Bearer {token}"}) as response:
+                        statuses[token] = response.status
+                        body = await response.json()
+                        if response.status == 200:
+                            assert body['data']['era_gaea'] == 3000
+            return statuses
+        finally:
+            await api.stop()
+
+    statuses = asyncio.run(main())
+    # 过期账户按 Token 固定选中, 不随请求变化
+    assert set(statuses.values()) == {200, 401}
+    assert all((status == 401) == (api.injected_status(token) == 401) for token, status in statuses.items())
+    snapshot = api.snapshot()
+    assert snapshot['requests'] == {"/api/earn/info": len(tokens)}
+    assert sum(snapshot['responses'].values()) == len(tokens)
+
+
+def test_percentile_and_budget_check():
+    assert benchmark.percentile([], 0.5) is None
+    assert benchmark.percentile([3, 1, 2, 4], 0.5) == 3
+    result = {'accounts': benchmark.BUDGET_MIN_ACCOUNTS, 'rss_per_account': 2048, 'rss_budget': 1024}
+    assert benchmark.over_budget(result)
+    # 小规模运行不检查内存预算
+    assert not benchmark.over_budget({**result, 'accounts': 100})
+
+
+def test_steady_pings_starts_after_ramp_and_first_interval():
+    class Ramp:
+        running = True
+
+        def snapshot(self):
+            return {'running': self.running}
+
+    class Bot:
+        ramp = Ramp()
+        stats = {'pings_ok': 0}
+
+    bot = Bot()
+
+    async def main():
+        steady = asyncio.create_task(benchmark.steady_pings(bot, 0.05))
+        # 启动时的首次 ping 不计入
+        bot.stats['pings_ok'] = 100
+        await asyncio.sleep(0.1)
+        assert not steady.done()
+        bot.ramp.running = False
+        bot.stats['pings_ok'] = 120
+        return (await asyncio.wait_for(steady, 2))[1]
+
+    assert asyncio.run(main()) == 120
@@ -0,0 +1,32 @@
+from proxy_pool import ProxyPool
+
+
+def make_pool():
+    pool = ProxyPool(None, spares=["http://spare:1"], min_samples=1)
+    pool.register("1", "http://a:1")
+    pool.register("2", "http://b:1")
+    return pool
+
+
+def test_unhealthy_count_follows_state_changes():
+    pool = make_pool()
+    assert pool.summary()['healthy'] == 3
+
+    for _ in range(3):
+        pool.record("http://a:1", 0.1, False)
+    assert (pool.summary()['healthy'], pool.summary()['unhealthy']) == (2, 1)
+    # 已经不健康时继续失败不重复计数
+    pool.record("http://a:1", 0.1, False)
+    assert pool.unhealthy == 1
+
+    for _ in range(10):
+        pool.record("http://a:1", 0.1, True)
+    assert pool.unhealthy == 0
+
+
+def test_failover_moves_account_to_healthy_spare():
+    pool = make_pool()
+    for _ in range(3):
+        pool.record("http://a:1", 0.1, False)
+    assert pool.current("1") == "http://spare:1"
+    assert pool.load == {"http://a:1": 0, "http://b:1": 1, "http://spare:1": 1}
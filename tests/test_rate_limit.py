@@ -0,0 +1,41 @@
+import asyncio
+from rate_limit import RateLimiter, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_queues(fake_clock):
+    bucket = TokenBucket(10, burst=2)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.1, 0.2]
+
+
+def test_token_bucket_refills_up_to_burst(fake_clock):
+    bucket = TokenBucket(10, burst=2)
+    for _ in range(2):
+        bucket.reserve()
+    fake_clock.advance(60)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.1]
+
+
+def test_prefix_rates_apply_to_matching_endpoints(fake_clock):
+    limiter = RateLimiter(endpoint_rates={"/reward/*": 5, "/network/ping": (20, 40)})
+    assert limiter.bucket_for("/reward/daily-list") is limiter.bucket_for("/reward/daily-complete")
+    assert limiter.bucket_for("/network/ping").burst == 40
+    assert limiter.bucket_for("/earn/info") is None
+
+
+def test_proxy_concurrency_is_limited():
+    limiter = RateLimiter(proxy_concurrency=2)
+    active = []
+    peak = []
+
+    async def request():
+        async with limiter.limit("/network/ping", "http://proxy:1"):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) == 2
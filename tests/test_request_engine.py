@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from request_engine import EndpointPolicy, Outcome, RequestEngine
+from simulate import SimulatedApi, VirtualClock
+
+URL = "https://api.aigaea.net/api/network/ping"
+
+
+def failing_api():
+    return SimulatedApi(VirtualClock(0), {}, 660, latency=0, jitter=0, error_rate=1.0, seed=1)
+
+
+def test_policy_needs_at_least_one_attempt():
+    with pytest.raises(ValueError):
+        EndpointPolicy(retries=0)
+
+
+@pytest.mark.parametrize("retries", [1, 3])
+def test_transient_errors_are_retried_up_to_the_attempt_count(retries):
+    api = failing_api()
+    engine = RequestEngine(api, default_policy=EndpointPolicy(retries=retries, base_delay=0.001, max_delay=0.001))
+    result = asyncio.run(engine.execute("POST", URL))
+
+    assert result.outcome is Outcome.TRANSIENT
+    assert api.requests["/api/network/ping"] == retries
+
+
+def test_non_idempotent_request_is_not_resent():
+    api = failing_api()
+    engine = RequestEngine(api, default_policy=EndpointPolicy(retries=3, base_delay=0.001, idempotent=False))
+    asyncio.run(engine.execute("POST", URL))
+
+    assert api.requests["/api/network/ping"] == 1
@@ -0,0 +1,146 @@
+import asyncio
+from scheduler import Scheduler
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_jobs_run_in_due_order():
+    order = []
+
+    async def main():
+        scheduler = Scheduler(workers=4)
+
+        def job(name):
+            async def func():
+                order.append(name)
+            return func
+
+        for name, delay in (("c", 0.03), ("a", 0.01), ("b", 0.02)):
+            scheduler.schedule(name, "job", job(name), delay)
+        await asyncio.wait_for(scheduler.run(), 2)
+
+    run(main())
+    assert order == ["a", "b", "c"]
+
+
+def test_returned_delay_reschedules_until_none():
+    calls = []
+
+    async def main():
+        scheduler = Scheduler(workers=2)
+
+        async def func():
+            calls.append(1)
+            return 0.01 if len(calls) < 3 else None
+
+        scheduler.schedule("acct", "ping", func)
+        await asyncio.wait_for(scheduler.run(), 2)
+        assert not scheduler.jobs and not scheduler.account_jobs
+
+    run(main())
+    assert len(calls) == 3
+
+
+def test_cancelled_job_never_runs():
+    ran = []
+
+    async def main():
+        scheduler = Scheduler(workers=2)
+
+        async def func():
+            ran.append(1)
+
+        scheduler.schedule("acct", "ping", func, 0.01)
+        scheduler.schedule("acct", "earning", func, 0.01)
+        scheduler.cancel("acct")
+        await asyncio.wait_for(scheduler.run(), 2)
+
+    run(main())
+    assert ran == []
+
+
+def test_replace_keeps_due_and_reschedule_moves_it():
+    ran = []
+
+    async def main():
+        scheduler = Scheduler(workers=2)
+
+        async def old():
+            ran.append("old")
+
+        async def new():
+            ran.append("new")
+
+        due = scheduler.schedule("acct", "ping", old, 0.05)
+        assert scheduler.replace("acct", "ping", new)
+        assert scheduler.next_due("acct", "ping") == due
+        assert scheduler.reschedule("acct", "ping", 0) < due
+        assert scheduler.replace("other", "ping", new) is False
+        await asyncio.wait_for(scheduler.run(), 2)
+
+    run(main())
+    assert ran == ["new"]
+
+
+def test_failing_job_is_retried_after_a_minute():
+    async def main():
+        scheduler = Scheduler(workers=1)
+
+        async def func():
+            raise RuntimeError("boom")
+
+        scheduler.schedule("acct", "ping", func)
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        due = scheduler.next_due("acct", "ping")
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return due - asyncio.get_running_loop().time()
+
+    remaining = run(main())
+    assert 55 < remaining <= 60
+
+
+def test_backlog_counts_due_jobs_waiting_for_a_worker():
+    async def main():
+        scheduler = Scheduler(workers=1)
+        release = asyncio.Event()
+
+        async def blocking():
+            await release.wait()
+
+        async def quick():
+            pass
+
+        scheduler.schedule("a", "job", blocking)
+        for account in ("b", "c", "d"):
+            scheduler.schedule(account, "job", quick)
+        scheduler.schedule("e", "job", quick, 60)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        # 唯一的 worker 被占用, 另外 3 个到期任务积压, 未到期的不算
+        assert scheduler.backlog() == 3
+        scheduler.cancel("e")
+        release.set()
+        await asyncio.wait_for(runner, 2)
+        assert scheduler.backlog() == 0
+
+    run(main())
+
+
+def test_jitter_spreads_due_time_of_listed_jobs_only():
+    async def main():
+        scheduler = Scheduler(jitter={"send_ping": 3.0})
+
+        async def func():
+            pass
+
+        now = scheduler.time()
+        pings = [scheduler.schedule(str(i), "send_ping", func, 10) - now for i in range(50)]
+        admit = scheduler.schedule("ramp", "admit", func, 10) - now
+        assert all(10 <= delay <= 13 for delay in pings) and max(pings) - min(pings) > 0.5
+        assert abs(admit - 10) < 0.01
+
+    run(main())
@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+from session_pool import SessionPool
+
+
+def test_close_while_session_in_use():
+    async def main():
+        pool = SessionPool()
+        async with pool.session() as session:
+            await pool.close()
+            assert session.closed
+        assert pool.in_use == {None: 0}
+        with pytest.raises(RuntimeError):
+            async with pool.session():
+                pass
+
+    asyncio.run(main())
+
+
+def test_sessions_are_shared_per_proxy():
+    async def main():
+        pool = SessionPool()
+        try:
+            async with pool.session() as first, pool.session() as second:
+                assert first is second
+                assert pool.in_use[None] == 2
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
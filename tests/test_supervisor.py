@@ -0,0 +1,36 @@
+import os, signal, threading, time
+from supervisor import Supervisor, split_limits
+
+
+class QuietBot:
+    def log(self, message, **kwargs):
+        pass
+
+
+class SleepingSupervisor(Supervisor):
+    """worker 只是 sleep 的子进程, 只检查进程管理"""
+
+    def start_worker(self, index: int):
+        process = self.context.Process(target=time.sleep, args=(60,), daemon=True)
+        process.start()
+        self.processes[index] = process
+
+
+def test_split_limits_divides_rates_but_not_proxy_concurrency():
+    limits = {'global_rate': 100, 'endpoint_rates': {"/network/ping": 40, "/ai/*": None}, 'proxy_concurrency': 8}
+    assert split_limits(limits, 4) == {
+        'global_rate': 25, 'endpoint_rates': {"/network/ping": 10, "/ai/*": None}, 'proxy_concurrency': 8
+    }
+
+
+def test_sigterm_terminates_and_joins_workers():
+    supervisor = SleepingSupervisor(QuietBot(), 2, {})
+    timer = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    started = time.monotonic()
+    supervisor.run()
+    timer.join()
+
+    assert time.monotonic() - started < 30
+    assert supervisor.processes and all(not process.is_alive() for process in supervisor.processes.values())
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
@@ -0,0 +1,63 @@
+import asyncio
+import clock
+
+
+class SingleFlightCache:
+    """按 key 缓存协程结果 ttl 秒, 同一 key 的并发调用共享同一个进行中的请求
+
+    只缓存 accept(value) 为真的结果, 失败结果只在并发调用之间共享.
+    """
+
+    def __init__(self, ttl: float, accept=None):
+        self.ttl = ttl
+        self.accept = accept
+        # key -> (过期时间, 值)
+        self.entries = {}
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def peek(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= clock.monotonic():
+            del self.entries[key]
+            return None
+        return entry[1]
+
+    async def get(self, key, fetch):
+        """fetch 为无参协程工厂, 缓存未命中且没有进行中的请求时才调用"""
+        value = self.peek(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        task = self.inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = self.inflight[key] = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda task: self._done(key, task))
+        else:
+            self.shared += 1
+        # 单个调用方被取消时不影响其它等待同一请求的调用方
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        current = self.inflight.get(key) is task
+        if current:
+            del self.inflight[key]
+        # invalidate() 之后才完成的请求结果可能已过时, 不写入缓存
+        if not current or task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if self.accept is None or self.accept(value):
+            self.entries[key] = (clock.monotonic() + self.ttl, value)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+        self.inflight.pop(key, None)
+
+    def snapshot(self):
+        return {'entries': len(self.entries), 'inflight': len(self.inflight),
+                'hits': self.hits, 'misses': self.misses, 'shared': self.shared}